@@ -15,7 +15,6 @@
 - NormalFillStrategy: 普通模式填充
 """
 
-import re
 import time
 import threading
 from typing import Dict, List, Any, Optional, Callable, Set
@@ -23,6 +22,7 @@ from dataclasses import dataclass, field
 
 # 领域层
 from app.domain.entities import ElementFingerprint, FillProgress, FillRecord, PageState
+from app.domain.entities.element_fingerprint import TR_INDEX_RE
 
 # 核心模块（后续重构时可改为接口注入）
 from app.core.smart_form_analyzer import SmartFormAnalyzer
@@ -451,6 +451,8 @@ class FillSessionController:
     
     def setup_pagination(self, xpath: str):
         """设置翻页按钮"""
+        if self.pagination_controller:
+            self.pagination_controller.close()
         self.pagination_controller = PaginationController(self.tab)
         self.pagination_controller.set_next_button(xpath=xpath)
         self.config.pagination_xpath = xpath
@@ -594,25 +596,27 @@ class FillSessionController:
             self._log("锚点列没有有效的XPath", "error")
             return []
         
-        generic_xpath = re.sub(r'tr\[\d+\]', 'tr', xpath)
+        generic_xpath = TR_INDEX_RE.sub('tr', xpath)
         
         try:
             web_row_map = {}
-            elements = self.tab.eles(f'xpath:{generic_xpath}')
-            for idx, ele in enumerate(elements):
-                txt = (ele.text or ele.attr('value') or '').strip()
+            for idx, txt in enumerate(SmartFormFiller._read_column_texts(self.tab, generic_xpath)):
                 if txt:
                     web_row_map[txt] = idx
             
             self._log(f"   ✅ 网页锚点扫描完成，找到 {len(web_row_map)} 个唯一值")
             
             matched_rows = []
-            for idx, row in self.excel_data.iterrows():
-                excel_key = str(row.get(key_column, '')).strip()
+            # 按列取锚点值，只为匹配成功的行构造行对象
+            if key_column in self.excel_data.columns:
+                keys = [str(v).strip() for v in self.excel_data[key_column].tolist()]
+            else:
+                keys = [''] * len(self.excel_data)
+            for pos, (idx, excel_key) in enumerate(zip(self.excel_data.index, keys)):
                 if excel_key in web_row_map:
                     matched_rows.append({
                         'excel_idx': idx,
-                        'excel_data': row,
+                        'excel_data': self.excel_data.iloc[pos],
                         'web_row_idx': web_row_map[excel_key],
                         'anchor_value': excel_key
                     })
@@ -5,11 +5,11 @@
 适用于需要根据唯一标识定位行的场景（如病历号、患者ID）。
 """
 
-import re
 from typing import Any, List, Dict
 
 from app.application.orchestrator.strategies.base_strategy import BaseFillStrategy
 from app.core.smart_form_filler import SmartFormFiller
+from app.domain.entities.element_fingerprint import TR_INDEX_RE
 
 
 class AnchorFillStrategy(BaseFillStrategy):
@@ -94,6 +94,17 @@ class AnchorFillStrategy(BaseFillStrategy):
         self._log("本页填充完成")
         self.state.is_paused = True  # 等待用户翻页
     
+    def _column_keys(self, column: str) -> List[str]:
+        """
+        按列取出去空白的锚点值（整列一次 tolist，避免 iterrows 逐行构造 Series）
+        
+        Returns:
+            与 excel_data 行位置对齐的字符串列表；列不存在时全部为空串
+        """
+        if column not in self.excel_data.columns:
+            return [''] * len(self.excel_data)
+        return [str(v).strip() for v in self.excel_data[column].tolist()]
+    
     def _build_anchor_map(self, key_column: str) -> List[dict]:
         """构建锚点匹配映射"""
         self._log(f"⚓ 锚点模式：正在扫描网页锚点列...")
@@ -110,25 +121,23 @@ class AnchorFillStrategy(BaseFillStrategy):
             return []
         
         # 将具体行索引替换为通用匹配
-        generic_xpath = re.sub(r'tr\[\d+\]', 'tr', xpath)
+        generic_xpath = TR_INDEX_RE.sub('tr', xpath)
         
         try:
             web_row_map = {}
-            elements = self.tab.eles(f'xpath:{generic_xpath}')
-            for idx, ele in enumerate(elements):
-                txt = (ele.text or ele.attr('value') or '').strip()
+            for idx, txt in enumerate(SmartFormFiller._read_column_texts(self.tab, generic_xpath)):
                 if txt:
                     web_row_map[txt] = idx
             
             self._log(f"   ✅ 网页锚点扫描完成，找到 {len(web_row_map)} 个唯一值")
             
             matched_rows = []
-            for idx, row in self.excel_data.iterrows():
-                excel_key = str(row.get(key_column, '')).strip()
+            keys = self._column_keys(key_column)
+            for pos, (idx, excel_key) in enumerate(zip(self.excel_data.index, keys)):
                 if excel_key in web_row_map:
                     matched_rows.append({
                         'excel_idx': idx,
-                        'excel_data': row,
+                        'excel_data': self.excel_data.iloc[pos],
                         'web_row_idx': web_row_map[excel_key],
                         'anchor_value': excel_key
                     })
@@ -169,13 +178,9 @@ class AnchorFillStrategy(BaseFillStrategy):
             
             try:
                 # 将 xpath 中的具体行号替换为通用匹配
-                generic_xpath = re.sub(r'tr\[\d+\]', 'tr', pair.web_column_xpath)
-                elements = self.tab.eles(f'xpath:{generic_xpath}')
-                
-                col_data = {}
-                for row_idx, ele in enumerate(elements):
-                    txt = (ele.text or ele.attr('value') or '').strip()
-                    col_data[row_idx] = txt
+                generic_xpath = TR_INDEX_RE.sub('tr', pair.web_column_xpath)
+                texts = SmartFormFiller._read_column_texts(self.tab, generic_xpath)
+                col_data = dict(enumerate(texts))
                 
                 web_column_data[pair.excel_column] = col_data
                 self._log(f"      ✅ 找到 {len(col_data)} 个值")
@@ -192,38 +197,32 @@ class AnchorFillStrategy(BaseFillStrategy):
         
         self._log(f"   📊 网页表格共 {max_web_rows} 行")
         
-        # 匹配 Excel 行与网页行
+        # 网页行按锚定列值组合建立索引（同一组合保留第一行）
+        anchor_cols = list(dict.fromkeys(pair.excel_column for pair in enabled_anchors))
+        web_index = {}
+        for web_row_idx in range(max_web_rows):
+            web_key = tuple(web_column_data.get(col, {}).get(web_row_idx, '') for col in anchor_cols)
+            web_index.setdefault(web_key, web_row_idx)
+        
+        # 匹配 Excel 行与网页行：按列取值，只为匹配成功的行构造行对象
+        excel_columns = [self._column_keys(col) for col in anchor_cols]
         matched_rows = []
         
-        for excel_idx, excel_row in self.excel_data.iterrows():
+        for pos, excel_idx in enumerate(self.excel_data.index):
             # 提取 Excel 中所有锚定列的值
-            excel_anchor_values = {}
-            for pair in enabled_anchors:
-                val = str(excel_row.get(pair.excel_column, '')).strip()
-                excel_anchor_values[pair.excel_column] = val
+            excel_anchor_values = {col: values[pos] for col, values in zip(anchor_cols, excel_columns)}
             
             # 在网页中查找所有锚定列值都匹配的行
-            for web_row_idx in range(max_web_rows):
-                all_match = True
-                
-                for col_name, excel_val in excel_anchor_values.items():
-                    web_val = web_column_data.get(col_name, {}).get(web_row_idx, '')
-                    
-                    if excel_val != web_val:
-                        all_match = False
-                        break
-                
-                if all_match:
-                    # 找到完全匹配的行
-                    anchor_values_str = ', '.join(excel_anchor_values.values())
-                    matched_rows.append({
-                        'excel_idx': excel_idx,
-                        'excel_data': excel_row,
-                        'web_row_idx': web_row_idx,
-                        'anchor_value': anchor_values_str,
-                        'anchor_values': excel_anchor_values  # 保留详细值
-                    })
-                    break  # 找到第一个匹配即可
+            web_row_idx = web_index.get(tuple(excel_anchor_values.values()))
+            if web_row_idx is not None:
+                anchor_values_str = ', '.join(excel_anchor_values.values())
+                matched_rows.append({
+                    'excel_idx': excel_idx,
+                    'excel_data': self.excel_data.iloc[pos],
+                    'web_row_idx': web_row_idx,
+                    'anchor_value': anchor_values_str,
+                    'anchor_values': excel_anchor_values  # 保留详细值
+                })
         
         # 按网页行索引排序
         matched_rows.sort(key=lambda x: x['web_row_idx'])
@@ -130,6 +130,8 @@ class PaginationService:
             xpath: XPath 选择器
             selector: CSS 选择器
         """
+        if self.controller:
+            self.controller.close()
         self.controller = PaginationController(self.tab)
         self.controller.set_next_button(selector=selector, xpath=xpath)
     
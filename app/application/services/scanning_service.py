@@ -8,6 +8,7 @@ from typing import List, Any, Optional
 
 from app.domain.entities import ElementFingerprint
 from app.core.smart_form_analyzer import SmartFormAnalyzer
+from app.utils.polling import poll
 
 
 class ScanningService:
@@ -66,30 +67,25 @@ class ScanningService:
         Returns:
             是否稳定
         """
-        import time
-        
+        # 页面无可见加载动画且 readyState 为 complete 时视为稳定
         js_check = """
-        (() => {
-            const loaders = document.querySelectorAll(
-                '.loading, .spinner, .ant-spin-spinning, .el-loading-mask'
-            );
-            for (let loader of loaders) {
-                const style = window.getComputedStyle(loader);
-                if (style.display !== 'none' && style.visibility !== 'hidden') {
-                    return false;
-                }
+        const loaders = document.querySelectorAll(
+            '.loading, .spinner, .ant-spin-spinning, .el-loading-mask'
+        );
+        for (const loader of loaders) {
+            const style = window.getComputedStyle(loader);
+            if (style.display !== 'none' && style.visibility !== 'hidden') {
+                return false;
             }
-            return document.readyState === 'complete';
-        })();
+        }
+        return document.readyState === 'complete';
         """
         
-        start_time = time.time()
-        while time.time() - start_time < timeout:
+        def check():
             try:
-                if self.tab.run_js(js_check):
-                    return True
-            except:
-                pass
-            time.sleep(0.2)
+                return bool(self.tab.run_js(js_check))
+            except Exception:
+                return False
         
-        return False
+        # 单调时钟 + 截止时间，最后一次等待不会越过超时
+        return poll(check, timeout=timeout, interval=0.2, backoff=1.0, until=bool).ok
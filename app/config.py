@@ -30,6 +30,7 @@ class ScannerConfig:
     stable_count_threshold: int = 3 # 稳定性检测阈值（连续N次一致）
     iframe_scan_depth: int = 2      # Iframe 扫描深度
     shadow_dom_depth: int = 2       # Shadow DOM 扫描深度
+    print_traceback: bool = False   # 扫描异常时是否打印完整堆栈
 
 
 @dataclass
@@ -58,6 +59,7 @@ class FillerConfig:
     retry_count: int = 3            # 失败重试次数
     healing_max_attempts: int = 5   # 自愈最大尝试次数
     wait_after_fill: float = 0.05   # 填充后等待时间(秒)
+    coalesce_change_events: bool = False  # 单据模式批量填充时 change 事件在全部赋值后统一派发（仅无级联的表单）
 
 
 @dataclass
@@ -107,6 +109,14 @@ def _get_env_int(key: str, default: int) -> int:
     return default
 
 
+def _get_env_bool(key: str, default: bool) -> bool:
+    """从环境变量获取布尔配置（1/true/yes/on 为真）"""
+    value = os.environ.get(key)
+    if value:
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return default
+
+
 # ============================================================
 # 全局配置实例
 # ============================================================
@@ -115,6 +125,7 @@ def _get_env_int(key: str, default: int) -> int:
 scanner_config = ScannerConfig(
     max_wait=_get_env_float('WEAVER_SCAN_MAX_WAIT', 15.0),
     poll_interval=_get_env_float('WEAVER_SCAN_POLL_INTERVAL', 0.8),
+    print_traceback=_get_env_bool('WEAVER_DEBUG', False),
 )
 
 # 匹配器配置
@@ -126,6 +137,7 @@ matcher_config = MatcherConfig(
 filler_config = FillerConfig(
     element_timeout=_get_env_float('WEAVER_FILL_TIMEOUT', 0.3),
     fill_delay=_get_env_float('WEAVER_FILL_DELAY', 0.1),
+    coalesce_change_events=_get_env_bool('WEAVER_FILL_COALESCE_EVENTS', False),
 )
 
 # 翻页配置
@@ -150,6 +162,7 @@ def reload_config():
     scanner_config = ScannerConfig(
         max_wait=_get_env_float('WEAVER_SCAN_MAX_WAIT', 15.0),
         poll_interval=_get_env_float('WEAVER_SCAN_POLL_INTERVAL', 0.8),
+        print_traceback=_get_env_bool('WEAVER_DEBUG', False),
     )
     
     matcher_config = MatcherConfig(
@@ -159,4 +172,5 @@ def reload_config():
     filler_config = FillerConfig(
         element_timeout=_get_env_float('WEAVER_FILL_TIMEOUT', 0.3),
         fill_delay=_get_env_float('WEAVER_FILL_DELAY', 0.1),
+        coalesce_change_events=_get_env_bool('WEAVER_FILL_COALESCE_EVENTS', False),
     )
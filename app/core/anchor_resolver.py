@@ -46,14 +46,15 @@ class AnchorResolver:
             FillQueue: 填充任务队列
         """
         tasks = []
+        # 一次性转为行字典，避免 iterrows 逐行构造 Series 再 to_dict
+        rows = list(zip(excel_data.index, excel_data.to_dict('records')))
         
         if anchor_column and anchor_column in fingerprint_mappings:
             # 有锚点模式：需要匹配网页中的锚点值
             web_anchor_map = self._scan_web_anchors(fingerprint_mappings[anchor_column])
             
-            for excel_idx, row in excel_data.iterrows():
-                anchor_value = str(row.get(anchor_column, '')).strip()
-                row_data = row.to_dict()
+            for excel_idx, row_data in rows:
+                anchor_value = str(row_data.get(anchor_column, '')).strip()
                 
                 if anchor_value in web_anchor_map:
                     web_idx = web_anchor_map[anchor_value]
@@ -77,11 +78,11 @@ class AnchorResolver:
         else:
             # 无锚点模式：顺序对应
             # 使用 enumerate 获取从 0 开始的顺序索引，确保 Excel 第1行 → 网页第1个输入框
-            for seq_idx, (excel_idx, row) in enumerate(excel_data.iterrows()):
+            for seq_idx, (excel_idx, row_data) in enumerate(rows):
                 task = FillTask(
                     excel_row_idx=excel_idx,
                     web_row_idx=seq_idx,  # 使用从0开始的顺序索引
-                    row_data=row.to_dict()
+                    row_data=row_data
                 )
                 tasks.append(task)
                 print(f"[AnchorResolver] Task: Excel行{excel_idx} → 网页输入框{seq_idx}")
@@ -89,11 +89,19 @@ class SmartFormFiller:
         Returns:
             填充是否成功
         """
+        # 在 Python 端选定唯一的定位策略: ID (O(1)) > CSS > XPath
+        selectors = fingerprint.selectors
+        elem_id = (selectors.get('id') or '').lstrip('#')
+        if elem_id:
+            strategy = ('id', elem_id)
+        elif selectors.get('css'):
+            strategy = ('css', selectors['css'])
+        else:
+            strategy = ('xpath', selectors.get('xpath') or '')
+        
         return EventSimulator.fill_with_events(
             tab,
-            elem_id=fingerprint.selectors.get('id', ''),
-            xpath=fingerprint.selectors.get('xpath', ''),
-            css_selector=fingerprint.selectors.get('css', ''),
+            strategy=strategy,
             value=str(value),
             elem_type=fingerprint.raw_data.get('type', 'text'),
             tag_name=fingerprint.raw_data.get('tagName', 'input')
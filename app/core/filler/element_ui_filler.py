@@ -10,7 +10,12 @@ Element UI 专用填充器
 - 触发 Vue 事件链 (input -> change -> blur)
 """
 
-from typing import Optional, Dict, Any, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
+from weakref import WeakKeyDictionary
+
+
+# Iframe 列表缓存: tab -> (url, iframes)，同一页面内批量填充只查询一次
+_IFRAME_CACHE: 'WeakKeyDictionary[Any, Tuple[str, List[Any]]]' = WeakKeyDictionary()
 
 
 class ElementUIFiller:
@@ -118,13 +123,22 @@ class ElementUIFiller:
             填充是否成功
         """
         try:
-            # 获取 Iframe
-            iframes = tab.eles('tag:iframe')
+            iframes = cls._get_iframes(tab)
             if not iframes or len(iframes) <= iframe_index:
                 print(f"   ⚠️ 未找到 Iframe[{iframe_index}]")
                 return False
             
-            frame = tab.get_frame(iframes[iframe_index])
+            try:
+                frame = tab.get_frame(iframes[iframe_index])
+            except Exception:
+                # 缓存的 iframe 元素已失效（页面局部刷新），重新查询一次
+                _IFRAME_CACHE.pop(tab, None)
+                iframes = cls._get_iframes(tab)
+                if len(iframes) <= iframe_index:
+                    print(f"   ⚠️ 未找到 Iframe[{iframe_index}]")
+                    return False
+                frame = tab.get_frame(iframes[iframe_index])
+            
             if not frame:
                 print(f"   ⚠️ 无法获取 Iframe 对象")
                 return False
@@ -134,3 +148,31 @@ class ElementUIFiller:
         except Exception as e:
             print(f"   ❌ Iframe 填充异常: {e}")
             return False
+    
+    @staticmethod
+    def _get_iframes(tab) -> List[Any]:
+        """
+        获取 tab 中的 Iframe 元素列表（按 URL 缓存）
+        
+        同一 URL 下复用上次的查询结果，URL 变化（导航）时自动重新查询。
+        
+        Args:
+            tab: DrissionPage 的 tab 对象
+            
+        Returns:
+            Iframe 元素列表
+        """
+        url = tab.url
+        try:
+            cached = _IFRAME_CACHE.get(tab)
+        except TypeError:
+            # tab 不支持弱引用时不缓存
+            return tab.eles('tag:iframe')
+        
+        if cached is not None and cached[0] == url:
+            return cached[1]
+        
+        iframes = tab.eles('tag:iframe')
+        if iframes:
+            _IFRAME_CACHE[tab] = (url, iframes)
+        return iframes
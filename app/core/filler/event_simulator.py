@@ -11,7 +11,7 @@
 5. Blur 阶段: focusout -> blur
 """
 
-from typing import Optional, Dict, Any, Union
+from typing import Optional, Dict, Any, Tuple, Union
 
 
 class EventSimulator:
@@ -25,9 +25,7 @@ class EventSimulator:
     @staticmethod
     def fill_with_events(
         tab_or_frame,
-        elem_id: str = '',
-        xpath: str = '',
-        css_selector: str = '',
+        strategy: Tuple[str, str],
         value: Union[str, int, float] = '',
         elem_type: str = 'text',
         tag_name: str = 'input'
@@ -39,9 +37,7 @@ class EventSimulator:
         
         Args:
             tab_or_frame: DrissionPage 的 tab 或 frame 对象
-            elem_id: 元素 ID
-            xpath: XPath 选择器
-            css_selector: CSS 选择器
+            strategy: 定位策略 (类型, 选择器)，类型为 'id' / 'css' / 'xpath'
             value: 要填充的值
             elem_type: 元素类型 (text, checkbox, radio, select 等)
             tag_name: 标签名
@@ -53,9 +49,7 @@ class EventSimulator:
         
         try:
             js_code = get_fill_with_events_js(
-                elem_id=elem_id,
-                xpath=xpath,
-                css_selector=css_selector,
+                strategy=strategy,
                 value=str(value),
                 elem_type=elem_type,
                 tag_name=tag_name
@@ -2,18 +2,38 @@
 翻页控制器 - 管理分页填充的翻页逻辑
 支持用户指定翻页按钮、页面变化检测、自动翻页执行
 """
+import re
+import sys
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
 from dataclasses import dataclass, field
-from typing import Optional, Callable
+from typing import Optional, Callable, Tuple
 from datetime import datetime
 
+from app.core.smart_form_analyzer import _driver_lock
+from app.infrastructure.js.script_store import ScriptStore
+from app.utils.polling import poll
 
-@dataclass
+
+# 翻页按钮禁用类名（Python 回退检测与 JS 检测共用同一份定义）
+_DISABLED_RE = re.compile(
+    r'\b(disabled|ant-pagination-disabled|el-button--disabled|btn-disabled|is-disabled|pagination-disabled)\b',
+    re.I
+)
+
+# slots 参数需要 Python 3.10+，旧版本退化为普通 dataclass
+_DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_DATACLASS_SLOTS)
 class PageState:
     """页面状态快照"""
     page_number: int = 1
     url: str = ""
     content_hash: str = ""
+    page_hash: str = ""
     element_count: int = 0
     timestamp: datetime = field(default_factory=datetime.now)
 
@@ -29,6 +49,123 @@ class PaginationController:
     - 等待新页面加载完成
     """
     
+    # 页面状态快照脚本: 按优先级探测分页指示器 -> 表格首行序号 -> 首个输入框 -> 内容哈希，
+    # 并一并返回内容哈希与可交互元素数量
+    _SNAPSHOT_JS = ScriptStore.PAGE_HASH_FN + """
+    const textOf = (el) => (el.innerText || el.textContent || '').trim();
+    const hint = arguments[0];
+    const indicators = [
+        '#current-page-display',
+        '.current-page-display',
+        '.page-num.current',
+        '.pagination .active',
+        '.ant-pagination-item-active',
+        '.el-pager .active'
+    ];
+    // 上次在该 URL 命中的指示器优先探测
+    if (hint && indicators.includes(hint)) {
+        indicators.splice(indicators.indexOf(hint), 1);
+        indicators.unshift(hint);
+    }
+    let indicator = null;
+    const rows = ['.row-num', 'table tbody tr td:first-child'];
+    let hash = '';
+    for (const sel of indicators) {
+        const el = document.querySelector(sel);
+        if (el) { hash = 'page:' + textOf(el); indicator = sel; break; }
+    }
+    if (!hash) {
+        for (const sel of rows) {
+            const el = document.querySelector(sel);
+            if (el) { hash = 'row:' + textOf(el); break; }
+        }
+    }
+    if (!hash) {
+        const el = document.querySelector('table tbody input');
+        if (el) hash = 'input:' + (el.value || el.getAttribute('placeholder') || '');
+    }
+    
+    // 页面内容指纹（与 ScriptStore.PAGE_HASH 同一算法）
+    const pageHash = weaverPageHash();
+    if (!hash) hash = 'hash:' + pageHash;
+    
+    return {
+        hash: hash,
+        page_hash: pageHash,
+        indicator: indicator,
+        count: document.querySelectorAll('input, select, textarea').length
+    };
+    """
+    
+    # 翻页按钮禁用检测脚本（需为 function 声明，run_js 才会把按钮作为参数传入）
+    _DISABLED_JS = """
+    function(el) {
+        const disabledAttr = el.getAttribute('disabled');
+        if (el.disabled || (disabledAttr !== null && disabledAttr !== 'false')) return true;
+        if (el.getAttribute('aria-disabled') === 'true') return true;
+        const disabledClass = /""" + _DISABLED_RE.pattern + """/i;
+        if (disabledClass.test(el.getAttribute('class') || '')) return true;
+        const style = window.getComputedStyle(el);
+        if (style.pointerEvents === 'none') return true;
+        if (parseFloat(style.opacity) < 0.5) return true;
+        return false;
+    }
+    """
+    
+    # 页面就绪等待脚本: 已就绪立即返回，否则监听 DOM 变化直到加载指示器消失或超时
+    _READY_JS = """
+    const timeoutMs = arguments[0];
+    const isReady = () => {
+        if (document.readyState !== 'complete') return false;
+        // 检查常见加载指示器
+        const loaders = document.querySelectorAll(
+            '.loading, .spinner, .ant-spin-spinning, .el-loading-mask'
+        );
+        for (const loader of loaders) {
+            const style = window.getComputedStyle(loader);
+            if (style.display !== 'none' && style.visibility !== 'hidden') return false;
+        }
+        return true;
+    };
+    if (isReady()) return true;
+    
+    return new Promise(resolve => {
+        let pending = false;
+        let timer = null;
+        const observer = new MutationObserver(() => schedule());
+        const finish = (value) => {
+            observer.disconnect();
+            clearTimeout(timer);
+            document.removeEventListener('readystatechange', schedule);
+            resolve(value);
+        };
+        // 合并密集的 DOM 变化，最多每 50ms 检查一次
+        const schedule = () => {
+            if (pending) return;
+            pending = true;
+            setTimeout(() => {
+                pending = false;
+                if (isReady()) finish(true);
+            }, 50);
+        };
+        observer.observe(document.documentElement, {
+            subtree: true,
+            childList: true,
+            attributes: true,
+            attributeFilter: ['class', 'style']
+        });
+        document.addEventListener('readystatechange', schedule);
+        timer = setTimeout(() => finish(isReady()), timeoutMs);
+    });
+    """
+    
+    # 点击后只比较 URL 的时间窗口（秒），之后开始比较内容特征；
+    # 与 wait_after 无关，同 URL 的 SPA 表格翻页不必等满 wait_after 才被识别
+    _URL_ONLY_WAIT = 0.5
+    
+    # 选择器缓存容量: (url, 用途) -> 命中的选择器
+    _SELECTOR_CACHE_SIZE = 128
+    
     def __init__(self, tab):
         """
         初始化翻页控制器
@@ -42,6 +179,10 @@ class PaginationController:
         self.current_page: int = 1
         self.last_page_state: Optional[PageState] = None
         self.page_change_callbacks: list[Callable] = []
+        self._callbacks_frozen: Optional[Tuple[Callable, ...]] = None  # 回调快照，注册时失效
+        self._selector_cache: 'OrderedDict[Tuple[str, str], str]' = OrderedDict()
+        # 后台任务线程池（随控制器生命周期复用，线程按需创建）
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='pagctl')
         
     def set_next_button(self, selector: str = None, xpath: str = None):
         """
@@ -53,11 +194,25 @@ class PaginationController:
         """
         self.next_button_selector = selector
         self.next_button_xpath = xpath
+        self._selector_cache.clear()
         print(f"✅ 翻页按钮已设置: {selector or xpath}")
         
+    def capture_url_only(self) -> PageState:
+        """
+        仅捕获页面 URL（单次属性读取，用于翻页检测的快速路径）
+        
+        Returns:
+            PageState: 只含 URL 的页面状态
+        """
+        try:
+            return PageState(page_number=self.current_page, url=self.tab.url or "")
+        except Exception as e:
+            print(f"⚠️ 捕获页面 URL 失败: {e}")
+            return PageState(page_number=self.current_page)
+    
     def capture_page_state(self) -> PageState:
         """
-        捕获当前页面状态
+        捕获当前页面完整状态（URL + 内容特征）
         
         Returns:
             PageState: 页面状态快照
@@ -66,50 +221,26 @@ class PaginationController:
             # 获取页面URL
             url = self.tab.url or ""
             
-            # 使用DrissionPage原生方法获取页面特征
-            content_hash = ""
-            
-            # 方法1: 获取分页指示器
-            selectors = [
-                '#current-page-display',
-                '.current-page-display', 
-                '.page-num.current',
-                '.pagination .active',
-                '.ant-pagination-item-active',
-                '.el-pager .active'
-            ]
-            for sel in selectors:
-                el = self.tab.ele(sel, timeout=0.5)
-                if el:
-                    content_hash = f"page:{el.text}"
-                    break
-            
-            # 方法2: 获取表格首行序号
-            if not content_hash:
-                row_selectors = ['.row-num', 'table tbody tr td:first-child']
-                for sel in row_selectors:
-                    el = self.tab.ele(sel, timeout=0.5)
-                    if el:
-                        content_hash = f"row:{el.text}"
-                        break
-            
-            # 方法3: 获取第一个输入框的值
-            if not content_hash:
-                el = self.tab.ele('table tbody input', timeout=0.5)
-                if el:
-                    content_hash = f"input:{el.value or el.attr('placeholder') or ''}"
+            # 单次 JS 调用完成所有探测（指示器/首行/输入框/元素计数），避免逐个选择器往返 CDP
+            # run_js 不接受 None 参数，未命中时传空字符串
+            hint = self._cache_get(url, 'page_indicator') or ''
+            snapshot = self.tab.run_js(self._SNAPSHOT_JS, hint) or {}
+            content_hash = snapshot.get('hash') or ""
+            if snapshot.get('indicator'):
+                self._cache_put(url, 'page_indicator', snapshot['indicator'])
             
-            # 方法4: 使用时间戳（备用）
+            # 备用: 使用时间戳（仅在快照脚本未返回结果时）
             if not content_hash:
                 content_hash = f"time:{self.tab.url}:{time.time()}"
             
             # 获取可交互元素数量
-            element_count = len(self.tab.eles('input, select, textarea')) if hasattr(self.tab, 'eles') else 0
+            element_count = int(snapshot.get('count') or 0)
             
             return PageState(
                 page_number=self.current_page,
                 url=url,
                 content_hash=content_hash,
+                page_hash=snapshot.get('page_hash') or "",
                 element_count=element_count,
                 timestamp=datetime.now()
             )
@@ -159,11 +290,7 @@ class PaginationController:
                 old_state = self.capture_page_state()
                 
                 # 尝试查找翻页按钮
-                button = None
-                if self.next_button_selector:
-                    button = self.tab.ele(self.next_button_selector, timeout=3)
-                if not button and self.next_button_xpath:
-                    button = self.tab.ele(f'xpath:{self.next_button_xpath}', timeout=3)
+                button = self._find_next_button()
                 
                 if not button:
                     print("❌ 未找到翻页按钮")
@@ -179,30 +306,29 @@ class PaginationController:
                 button.click()
                 print(f"🔄 点击翻页按钮，等待页面加载... (尝试 {retry + 1}/{max_retries})")
                 
-                # 等待页面变化
-                time.sleep(wait_after)
-                
-                # 检测页面是否变化
-                max_wait = 5  # 最大等待5秒
-                start_time = time.time()
+                # 点击后立即在后台探测页面变化（不再先固定等待 wait_after），
+                # 快速渲染的页面可提前检测到；最长等待时间不变
+                max_wait = 5  # wait_after 之后最多再等 5 秒
+                new_state = self._wait_for_page_change(old_state, wait_after, max_wait)
                 
-                while time.time() - start_time < max_wait:
-                    new_state = self.capture_page_state()
-                    if self.detect_page_change(old_state, new_state):
-                        self.current_page += 1
-                        self.last_page_state = new_state
-                        print(f"✅ 翻页成功，当前第 {self.current_page} 页")
-                        
-                        # 触发回调
-                        for callback in self.page_change_callbacks:
+                if new_state is not None:
+                    self.current_page += 1
+                    self.last_page_state = new_state
+                    print(f"✅ 翻页成功，当前第 {self.current_page} 页")
+                    
+                    # 触发回调
+                    callbacks = self._callbacks_frozen
+                    if callbacks is None:
+                        callbacks = self._callbacks_frozen = tuple(self.page_change_callbacks)
+                    if callbacks:
+                        page = self.current_page
+                        for callback in callbacks:
                             try:
-                                callback(self.current_page, new_state)
+                                callback(page, new_state)
                             except Exception as e:
                                 print(f"⚠️ 页面变化回调执行失败: {e}")
-                        
-                        return True
                     
-                    time.sleep(0.3)
+                    return True
                 
                 # 页面未变化，准备重试
                 if retry < max_retries - 1:
@@ -221,58 +347,145 @@ class PaginationController:
         print("⚠️ 多次尝试后页面仍未变化，确认已是最后一页")
         return False
     
+    def _wait_for_page_change(self, old_state: PageState, wait_after: float, max_wait: float) -> Optional[PageState]:
+        """
+        在后台线程中轮询页面变化并等待结果
+        
+        轮询在点击后立即开始（指数退避: 0.1, 0.15, 0.22... 上限 0.8 秒），
+        前 0.5 秒只比较 URL，之后比较内容特征。主线程最多等待 wait_after + max_wait
+        （另留 1 秒余量）；超时后先等进行中的那次探测返回再交还 Driver，
+        避免与主线程随后的 CDP 调用并发。
+        
+        Args:
+            old_state: 点击前的页面状态
+            wait_after: 原点击后固定等待时间（秒）
+            max_wait: 其后的最长等待时间（秒）
+            
+        Returns:
+            变化后的页面状态，超时返回 None
+        """
+        total_wait = wait_after + max_wait
+        url_only_window = self._URL_ONLY_WAIT
+        start_time = time.monotonic()
+        stop = threading.Event()
+        
+        def probe():
+            # 持锁探测，且停止后不再发送：超时返回后主线程会继续在同一 Driver 上操作
+            with _driver_lock(self.tab):
+                if stop.is_set():
+                    return None
+                return self._probe_page_change(
+                    old_state, url_only=time.monotonic() - start_time < url_only_window
+                )
+        
+        future = self._executor.submit(
+            poll,
+            probe,
+            timeout=total_wait,
+            interval=0.1,
+            max_interval=0.8,
+            until=lambda state: state is not None or stop.is_set()
+        )
+        
+        try:
+            # 额外 1 秒留给正在进行的最后一次探测
+            result = future.result(timeout=total_wait + 1)
+        except FuturesTimeout:
+            stop.set()
+            # 等待进行中的探测结束（Driver._send 不是线程安全的），之后后台线程不再发送 CDP 调用
+            with _driver_lock(self.tab):
+                pass
+            return None
+        return result.value if result.ok else None
+    
+    def _probe_page_change(self, old_state: PageState, url_only: bool) -> Optional[PageState]:
+        """
+        探测一次页面是否已变化
+        
+        点击后的短时间内只比较 URL（多数分页为 ?page=N 跳转），之后再比较内容特征。
+        
+        Args:
+            old_state: 点击前的页面状态
+            url_only: 是否只比较 URL
+            
+        Returns:
+            变化后的页面状态，未变化返回 None
+        """
+        if url_only:
+            new_state = self.capture_url_only()
+            if new_state.url == old_state.url:
+                return None
+            # 仅在需要回调时补全内容特征
+            return self.capture_page_state() if self.page_change_callbacks else new_state
+        
+        new_state = self.capture_page_state()
+        return new_state if self.detect_page_change(old_state, new_state) else None
+    
+    def _find_next_button(self):
+        """
+        查找翻页按钮
+        
+        优先使用该 URL 上次命中的定位方式，避免每页都先等待失效的候选超时。
+        
+        Returns:
+            按钮元素，未找到返回 None
+        """
+        url = self.tab.url or ""
+        candidates = []
+        if self.next_button_selector:
+            candidates.append(self.next_button_selector)
+        if self.next_button_xpath:
+            candidates.append(f'xpath:{self.next_button_xpath}')
+        
+        cached = self._cache_get(url, 'next_button')
+        if cached in candidates:
+            candidates.remove(cached)
+            candidates.insert(0, cached)
+        
+        for locator in candidates:
+            button = self.tab.ele(locator, timeout=3)
+            if button:
+                self._cache_put(url, 'next_button', locator)
+                return button
+        return None
+    
+    def _cache_get(self, url: str, purpose: str) -> Optional[str]:
+        """读取选择器缓存（命中时移到末尾，维持 LRU 顺序）"""
+        key = (url, purpose)
+        hit = self._selector_cache.get(key)
+        if hit is not None:
+            self._selector_cache.move_to_end(key)
+        return hit
+    
+    def _cache_put(self, url: str, purpose: str, selector: str):
+        """写入选择器缓存，超出容量时淘汰最久未用的条目"""
+        key = (url, purpose)
+        self._selector_cache[key] = selector
+        self._selector_cache.move_to_end(key)
+        if len(self._selector_cache) > self._SELECTOR_CACHE_SIZE:
+            self._selector_cache.popitem(last=False)
+    
     def _check_button_disabled(self, button) -> bool:
         """
         检查按钮是否被禁用
         
-        检测方式：
+        检测方式（单次 JS 调用完成）：
         1. disabled 属性
         2. aria-disabled="true"
         3. 特定禁用类名 (ant-pagination-disabled, disabled, el-button--disabled 等)
+        4. 计算样式 (pointer-events: none / 低透明度)
         
         Returns:
             bool: 是否禁用
         """
         try:
-            # 方法1: 检查 disabled 属性
-            disabled_attr = button.attr('disabled')
-            if disabled_attr is not None and disabled_attr != 'false':
-                return True
-            
-            # 方法2: 检查 aria-disabled
-            aria_disabled = button.attr('aria-disabled')
-            if aria_disabled == 'true':
-                return True
-            
-            # 方法3: 检查类名
-            class_name = button.attr('class') or ''
-            disabled_classes = [
-                'disabled', 'ant-pagination-disabled', 'el-button--disabled',
-                'btn-disabled', 'is-disabled', 'pagination-disabled'
-            ]
-            for dc in disabled_classes:
-                if dc in class_name.lower():
-                    return True
-            
-            # 方法4: 使用 JS 进一步检测
-            js_check = """
-            (el) => {
-                if (el.disabled) return true;
-                if (el.getAttribute('aria-disabled') === 'true') return true;
-                const style = window.getComputedStyle(el);
-                if (style.pointerEvents === 'none') return true;
-                if (style.opacity < 0.5) return true;
-                return false;
-            }
-            """
-            try:
-                result = self.tab.run_js(js_check, button)
-                if result:
-                    return True
-            except:
-                pass
-            
-            return False
+            return bool(self.tab.run_js(self._DISABLED_JS, button))
+        except Exception as e:
+            print(f"⚠️ JS 检查按钮状态失败: {e}")
+        
+        # 回退: 仅检查类名
+        try:
+            return bool(_DISABLED_RE.search(button.attr('class') or ''))
         except Exception as e:
             print(f"⚠️ 检查按钮状态失败: {e}")
             return False
@@ -281,6 +494,8 @@ class PaginationController:
         """
         等待页面加载完成
         
+        在页内用 MutationObserver 等待加载指示器消失，只需一次 CDP 往返。
+        
         Args:
             timeout: 超时时间（秒）
             
@@ -288,30 +503,7 @@ class PaginationController:
             bool: 是否加载完成
         """
         try:
-            ready_js = """
-            (() => {
-                // 检查常见加载指示器
-                const loaders = document.querySelectorAll(
-                    '.loading, .spinner, .ant-spin-spinning, .el-loading-mask'
-                );
-                for (let loader of loaders) {
-                    const style = window.getComputedStyle(loader);
-                    if (style.display !== 'none' && style.visibility !== 'hidden') {
-                        return false;
-                    }
-                }
-                return document.readyState === 'complete';
-            })();
-            """
-            
-            start_time = time.time()
-            while time.time() - start_time < timeout:
-                if self.tab.run_js(ready_js):
-                    return True
-                time.sleep(0.2)
-            
-            return False
-            
+            return bool(self.tab.run_js(self._READY_JS, int(timeout * 1000), timeout=timeout + 0.5))
         except Exception as e:
             print(f"⚠️ 检查页面就绪状态失败: {e}")
             return True  # 失败时假设已就绪
@@ -324,9 +516,15 @@ class PaginationController:
             callback: 回调函数 (page_number, page_state) -> None
         """
         self.page_change_callbacks.append(callback)
+        self._callbacks_frozen = None
+    
+    def close(self):
+        """释放后台线程池（控制器不再使用时调用）"""
+        self._executor.shutdown(wait=False)
     
     def reset(self):
         """重置翻页状态"""
         self.current_page = 1
         self.last_page_state = None
+        self._selector_cache.clear()
         print("🔄 翻页状态已重置")
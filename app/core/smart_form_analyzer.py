@@ -6,7 +6,74 @@
   - 精度: 视觉坐标匹配（左侧/上方标题）
   - 深度: 表格 row_index、Shadow DOM、自定义控件
 """
+import copy
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple
+from weakref import WeakKeyDictionary
+
+from app import config
 from app.core.element_fingerprint import ElementFingerprint
+from app.utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+
+# 已注册 Page.addScriptToEvaluateOnNewDocument 的 CDP 连接（值为是否注册成功）
+_NEW_DOCUMENT_REGISTRY: 'WeakKeyDictionary[Any, bool]' = WeakKeyDictionary()
+
+# 主文档扫描结果缓存: (url, 主文档内容哈希) -> 原始元素数据列表（LRU，不含 iframe）
+_SCAN_CACHE: 'OrderedDict[Tuple[str, str], List[dict]]' = OrderedDict()
+_SCAN_CACHE_SIZE = 16
+_SCAN_CACHE_LOCK = threading.Lock()
+
+# CDP 连接 -> 调用锁。DrissionPage 的 Driver._send 自增消息 id 时未加锁，
+# 同一 Driver 上的并发调用可能拿到相同 id 而收到彼此的响应（或一直等到超时）
+_DRIVER_LOCKS: 'WeakKeyDictionary[Any, threading.Lock]' = WeakKeyDictionary()
+_DRIVER_LOCKS_GUARD = threading.Lock()
+
+
+def _cdp_owner(target):
+    """
+    取 target 实际使用的 CDP 连接及其所属页面
+    
+    同源 frame 的 run_js 经 doc_ele 走所在页面的 Driver，需沿 _target_page 上溯；
+    跨域 frame 有独立 Driver。
+    
+    Returns:
+        tuple: (所属 tab 或跨域 frame, Driver；无 Driver 属性时为对象本身)
+    """
+    while getattr(target, '_is_diff_domain', None) is False:
+        target = target._target_page
+    return target, getattr(target, '_driver', None) or target
+
+
+def _driver_lock(target) -> threading.Lock:
+    """取 target 实际使用的 CDP 连接对应的锁（跨域 frame 可与其它连接并发）"""
+    _, driver = _cdp_owner(target)
+    with _DRIVER_LOCKS_GUARD:
+        lock = _DRIVER_LOCKS.get(driver)
+        if lock is None:
+            lock = _DRIVER_LOCKS[driver] = threading.Lock()
+        return lock
+
+
+@lru_cache(maxsize=1024, typed=True)
+def _transform_value(value, input_type):
+    """suggest_data_transformation 的实现（按值与控件类型缓存）"""
+    if value is None:
+        return ""
+        
+    value = str(value).strip()
+    
+    # 日期处理
+    if 'date' in str(input_type).lower():
+        if '/' in value:
+            return value.replace('/', '-')
+        
+    return value
 
 
 class SmartFormAnalyzer:
@@ -15,8 +82,19 @@ class SmartFormAnalyzer:
     采用「空间几何 + JS 快照」模式
     """
     
-    @staticmethod
-    def get_analysis_js():
+    # 分析脚本缓存（首次加载后复用，轮询/Iframe 扫描不再重复获取）
+    _ANALYSIS_JS: Optional[str] = None
+    _INSTALL_JS: Optional[str] = None
+    
+    # 页内常驻扫描函数: 注入一次后每次只传输调用桩
+    _MISSING = '__weaver_missing__'
+    _SCAN_CALL_JS = (
+        "return window.__weaverScan ? window.__weaverScan(arguments[0]) "
+        ": '__weaver_missing__';"
+    )
+    
+    @classmethod
+    def get_analysis_js(cls):
         """
         获取高性能 JS 分析脚本
         
@@ -33,91 +111,153 @@ class SmartFormAnalyzer:
         Returns:
             JavaScript 代码字符串
         """
-        from app.infrastructure.js.script_store import ScriptStore
-        return ScriptStore.get_form_analyzer_js()
+        if cls._ANALYSIS_JS is None:
+            from app.infrastructure.js.script_store import ScriptStore
+            cls._ANALYSIS_JS = ScriptStore.get_form_analyzer_js()
+        return cls._ANALYSIS_JS
 
 
+    @classmethod
+    def get_install_js(cls) -> str:
+        """
+        获取扫描函数注入脚本
+        
+        将分析脚本包装为 window.__weaverScan(opts)，脚本体中的
+        arguments[0] / return 语义保持不变。
+        
+        Returns:
+            JavaScript 代码字符串（同一字符串对象复用）
+        """
+        if cls._INSTALL_JS is None:
+            # 已注入时跳过：新文档脚本与按需注入可能在同一文档中先后执行
+            cls._INSTALL_JS = (
+                "if (!window.__weaverScan) {\nwindow.__weaverScan = function() {\n"
+                + cls.get_analysis_js() + "\n};\n}"
+            )
+        return cls._INSTALL_JS
+    
+    @classmethod
+    def run_analysis(cls, target, opts: Optional[dict] = None, **kwargs):
+        """
+        在 tab 或 frame 上执行分析脚本
+        
+        首次使用时通过 CDP Page.addScriptToEvaluateOnNewDocument 注册注入脚本，
+        此后每次扫描只调用 window.__weaverScan()；当前文档尚未注入
+        （首次扫描 / 跨域 frame / 注册失败）时先注入再重试。
+        
+        Args:
+            target: DrissionPage 的 tab 或 frame 对象
+            opts: 传给扫描脚本的参数（如 untilStable）
+            **kwargs: 透传给 run_js（如 timeout）
+            
+        Returns:
+            扫描脚本返回值
+        """
+        cls._register_on_new_document(target)
+        
+        args = (opts,) if opts is not None else ()
+        result = target.run_js(cls._SCAN_CALL_JS, *args, **kwargs)
+        if result == cls._MISSING:
+            target.run_js(cls.get_install_js())
+            result = target.run_js(cls._SCAN_CALL_JS, *args, **kwargs)
+        return result
+    
+    @classmethod
+    def _register_on_new_document(cls, target):
+        """
+        为 target 所用的 CDP 连接注册新文档注入脚本（每个连接只尝试一次）
+        
+        同源 frame 与所在 tab 共用会话，且注册的脚本本就会在该 tab 的每个 frame 中执行；
+        翻页/跳转后 frame 对象会重建，按对象登记会在同一 tab 上重复注册。
+        因此只在 tab 与跨域 frame 上注册，并按 Driver 登记。
+        """
+        owner, driver = _cdp_owner(target)
+        try:
+            if driver in _NEW_DOCUMENT_REGISTRY:
+                return
+        except TypeError:
+            # 不支持弱引用的对象不做注册，依赖按需注入
+            return
+        
+        try:
+            owner.run_cdp('Page.addScriptToEvaluateOnNewDocument', source=cls.get_install_js())
+            _NEW_DOCUMENT_REGISTRY[driver] = True
+        except Exception:
+            _NEW_DOCUMENT_REGISTRY[driver] = False
+
     @staticmethod
-    def deep_scan_page(tab, max_wait=8, poll_interval=0.4):
+    def deep_scan_page(tab, max_wait=8, poll_interval=0.8):
         """
         深度扫描网页 - JS 快照模式 + 智能稳定性检测
         
         核心机制:
         - 加载探测: 检测 Ant Design/ElementUI 等加载动画
-        - 稳定性算法: 连续2次元素数量一致才认为渲染稳定
+        - 稳定性算法: 页内连续3次元素数量一致才认为渲染稳定（scanUntilStable）
         - 静默环境: 自动劫持 alert/confirm 防止阻塞
         
         Args:
             tab: DrissionPage 的 tab 对象
             max_wait: 最大等待时间（秒），默认15秒
-            poll_interval: 轮询间隔（秒），默认0.8秒
+            poll_interval: 页内采样间隔上限（秒），默认0.8秒；从 0.1 秒起指数退避
             
         Returns:
             list[ElementFingerprint]: 元素指纹列表
         """
-        import time
-        
         print("\n=== 🚀 启动 JS 快照扫描（v3.0 稳定性增强模式） ===")
         
         fingerprints = []
-        last_count = -1
-        stable_count = 0
-        best_result = None
-        max_polls = int(max_wait / poll_interval)
+        
+        # 页面 URL 与内容均未变化（如翻页后回到已扫描的页面）时直接复用上次结果
+        cache_key = SmartFormAnalyzer._page_cache_key(tab)
+        if cache_key is not None:
+            with _SCAN_CACHE_LOCK:
+                cached = _SCAN_CACHE.get(cache_key)
+                if cached is not None:
+                    _SCAN_CACHE.move_to_end(cache_key)
+            if cached is not None:
+                # 缓存的是主文档原始元素数据，每次重建指纹，避免带回上次映射会话的修改
+                print(f"♻️ 主文档未变化，复用上次扫描结果: {len(cached)} 个元素")
+                fingerprints = ElementFingerprint.from_batch(copy.deepcopy(cached))
+                return SmartFormAnalyzer._append_iframe_fingerprints(tab, fingerprints)
         
         try:
-            for poll_idx in range(max_polls):
-                # 执行 JS 扫描脚本
-                if poll_idx == 0:
-                    print("🔄 正在执行 JS 批量扫描...")
-                
-                js_result = tab.run_js(SmartFormAnalyzer.get_analysis_js())
-                
-                # 检查错误
-                if isinstance(js_result, dict):
-                    if 'error' in js_result:
-                        print(f"⚠️ JS 扫描出错: {js_result['error']}")
-                        print("🔄 回退到原生扫描模式...")
-                        return SmartFormAnalyzer._fallback_native_scan(tab)
-                    
-                    # 检查加载状态
-                    if js_result.get('status') == 'loading':
-                        loader = js_result.get('loader', 'unknown')
-                        if poll_idx == 0:
-                            print(f"⏳ 检测到加载动画: {loader}，等待页面就绪...")
-                        time.sleep(poll_interval)
-                        continue
-                    
-                    # 如果返回的是包含 elements 的对象
-                    if 'elements' in js_result:
-                        js_result = js_result['elements']
-                
-                if not isinstance(js_result, list):
-                    print(f"⚠️ JS 返回格式异常: {type(js_result)}")
-                    time.sleep(poll_interval)
-                    continue
-                
-                current_count = len(js_result)
-                
-                # 稳定性检测
-                if current_count == last_count and current_count > 0:
-                    stable_count += 1
-                    if stable_count >= 2:
-                        # 连续2次数量相同，认为稳定（从3次降为2次）
-                        print(f"✅ 页面稳定 (连续 {stable_count} 次检测到 {current_count} 个元素)")
-                        best_result = js_result
-                        break
-                else:
-                    stable_count = 0
-                    if current_count > 0:
-                        best_result = js_result  # 保存最新有效结果
-                
-                last_count = current_count
-                
-                if poll_idx > 0 and poll_idx % 3 == 0:
-                    print(f"   轮询 {poll_idx+1}/{max_polls}: {current_count} 个元素...")
-                
-                time.sleep(poll_interval)
+            # 稳定性检测在页内完成（连续 3 次元素数量一致），只需一次 CDP 往返
+            print("🔄 正在执行 JS 批量扫描...")
+            js_result = SmartFormAnalyzer.run_analysis(
+                tab,
+                {
+                    'untilStable': True,
+                    'pollMs': int(poll_interval * 1000),
+                    'maxMs': int(max_wait * 1000),
+                    'streak': 3,
+                    'fastCount': 20,
+                    'compact': True,
+                },
+                timeout=max_wait + 5
+            )
+            
+            # 检查错误
+            if not isinstance(js_result, dict):
+                print(f"⚠️ JS 返回格式异常: {type(js_result)}")
+                return SmartFormAnalyzer._fallback_native_scan(tab)
+            
+            if 'error' in js_result:
+                print(f"⚠️ JS 扫描出错: {js_result['error']}")
+                print("🔄 回退到原生扫描模式...")
+                return SmartFormAnalyzer._fallback_native_scan(tab)
+            
+            best_result = SmartFormAnalyzer._unpack_elements(js_result.get('elements'))
+            status = js_result.get('status')
+            elapsed = js_result.get('elapsed_ms', 0) / 1000
+            
+            if status == 'stable' and js_result.get('quiet'):
+                print(f"✅ 页面稳定 (DOM 已静默，检测到 {len(best_result)} 个元素, 耗时 {elapsed:.1f}s)")
+            elif status == 'stable':
+                print(f"✅ 页面稳定 (连续 {js_result.get('stable_streak')} 次检测到 {len(best_result)} 个元素, 耗时 {elapsed:.1f}s)")
+            elif status == 'loading':
+                print(f"⏳ 加载动画持续到超时: {js_result.get('loader', 'unknown')}")
+            else:
+                print(f"⏱️ 等待稳定超时 ({elapsed:.1f}s)，使用最新结果: {len(best_result)} 个元素")
             
             # 超时或稳定后处理
             if best_result is None or len(best_result) == 0:
@@ -126,42 +266,92 @@ class SmartFormAnalyzer:
             
             print(f"📊 JS 扫描完成，发现 {len(best_result)} 个可交互元素")
             
-            # 转换为 ElementFingerprint 对象
-            for item in best_result:
-                try:
-                    fp = ElementFingerprint(item)
-                    fingerprints.append(fp)
-                except Exception as e:
-                    # 静默跳过单个元素错误
-                    continue
-            
-            # 统计信息
-            table_count = sum(1 for fp in fingerprints if fp.raw_data.get('is_table_cell'))
-            visual_count = sum(1 for fp in fingerprints if fp.raw_data.get('visual_label'))
-            shadow_count = sum(1 for fp in fingerprints if fp.raw_data.get('shadow_depth', 0) > 0)
+            # 转换为 ElementFingerprint 对象（单个元素错误静默跳过）
+            fingerprints = ElementFingerprint.from_batch(best_result)
             
             print(f"✅ 主文档扫描完成！发现 {len(fingerprints)} 个多维指纹")
-            print(f"   表格元素: {table_count} 个")
-            print(f"   视觉匹配: {visual_count} 个")
-            print(f"   Shadow DOM: {shadow_count} 个")
             
-            # ===== 新增: Iframe 递归扫描（政府级 Vue 站点专用） =====
-            iframe_fingerprints = SmartFormAnalyzer._scan_iframes(tab)
-            if iframe_fingerprints:
-                fingerprints.extend(iframe_fingerprints)
-                print(f"   📦 Iframe 内元素: {len(iframe_fingerprints)} 个")
+            # 分类统计由扫描脚本在页内顺带算好，这里只读取
+            stats = js_result.get('stats') or {}
+            logger.debug("   表格元素: %d 个", stats.get('tables', 0))
+            logger.debug("   视觉匹配: %d 个", stats.get('visual', 0))
+            logger.debug("   Shadow DOM: %d 个", stats.get('shadow', 0))
             
-            print(f"\\n🎯 总计: {len(fingerprints)} 个可操作元素")
+            # 以扫描完成（页面已稳定）时的内容哈希缓存主文档结果；
+            # 哈希只覆盖主文档，iframe 内容每次重新扫描
+            cache_key = SmartFormAnalyzer._page_cache_key(tab)
+            if cache_key is not None:
+                snapshot = copy.deepcopy(best_result)
+                with _SCAN_CACHE_LOCK:
+                    _SCAN_CACHE[cache_key] = snapshot
+                    _SCAN_CACHE.move_to_end(cache_key)
+                    if len(_SCAN_CACHE) > _SCAN_CACHE_SIZE:
+                        _SCAN_CACHE.popitem(last=False)
             
-            return fingerprints
+            return SmartFormAnalyzer._append_iframe_fingerprints(tab, fingerprints)
             
         except Exception as e:
             print(f"❌ JS 扫描严重失败: {e}")
-            import traceback
-            traceback.print_exc()
+            if config.scanner_config.print_traceback:
+                import traceback
+                traceback.print_exc()
             print("🔄 尝试回退到原生扫描...")
             return SmartFormAnalyzer._fallback_native_scan(tab)
 
+    @staticmethod
+    def _append_iframe_fingerprints(tab, fingerprints: List[ElementFingerprint]) -> List[ElementFingerprint]:
+        """
+        追加 iframe 内的元素指纹（政府级 Vue 站点专用）
+        
+        Args:
+            tab: DrissionPage 的 tab 对象
+            fingerprints: 主文档指纹列表（原地追加）
+            
+        Returns:
+            list[ElementFingerprint]: 追加后的指纹列表
+        """
+        iframe_fingerprints = SmartFormAnalyzer._scan_iframes(tab)
+        if iframe_fingerprints:
+            fingerprints.extend(iframe_fingerprints)
+            print(f"   📦 Iframe 内元素: {len(iframe_fingerprints)} 个")
+        
+        print(f"\\n🎯 总计: {len(fingerprints)} 个可操作元素")
+        return fingerprints
+
+    @staticmethod
+    def _page_cache_key(tab) -> Optional[Tuple[str, str]]:
+        """
+        计算主文档扫描缓存键 (url, 页面内容哈希)
+        
+        Returns:
+            缓存键，无法计算时返回 None
+        """
+        from app.infrastructure.js.script_store import ScriptStore
+        try:
+            page_hash = tab.run_js(ScriptStore.PAGE_HASH)
+            if not page_hash:
+                return None
+            return (tab.url or "", page_hash)
+        except Exception:
+            return None
+
+    @staticmethod
+    def _unpack_elements(packed) -> List[dict]:
+        """
+        还原 packElements 压缩的元素列表
+        
+        Args:
+            packed: { schemas, rows } 压缩结构；普通列表原样返回
+            
+        Returns:
+            list[dict]: 元素数据字典列表
+        """
+        if not isinstance(packed, dict):
+            return packed or []
+        
+        schemas = packed.get('schemas') or []
+        return [dict(zip(schemas[row[0]], row[1:])) for row in packed.get('rows') or []]
+    
     @staticmethod
     def _fallback_native_scan(tab):
         """
@@ -172,89 +362,21 @@ class SmartFormAnalyzer:
         fingerprints = []
         
         try:
-            # 获取所有输入元素
-            inputs = tab.eles('xpath://input[not(@type="hidden") and not(@type="button") and not(@type="submit") and not(@type="reset") and not(@type="image") and not(@type="file")]')
-            selects = tab.eles('tag:select')
-            textareas = tab.eles('tag:textarea')
+            # 一次 JS 调用返回所有元素的属性、标签与 XPath
+            from app.infrastructure.js.script_store import ScriptStore
+            items = (tab.run_js(ScriptStore.get_fallback_scan_js()) or {}).get('items') or []
+            print(f"   发现 {len(items)} 个可交互元素")
             
-            all_uielems = inputs + selects + textareas
-            print(f"   发现 {len(all_uielems)} 个可交互元素")
-            
-            for idx, el in enumerate(all_uielems):
-                try:
-                    attrs = el.attrs or {}
-                    tag = el.tag
-                    elem_type = attrs.get('type', tag)
-                    elem_name = attrs.get('name', '')
-                    elem_id = attrs.get('id', '')
-                    placeholder = attrs.get('placeholder', '')
-                    
-                    found_label = ""
-                    
-                    # 表格表头分析
-                    try:
-                        parent_td = el.parent('tag:td')
-                        if parent_td:
-                            prev_siblings = parent_td.prevs('tag:td')
-                            col_index = len(prev_siblings)
-                            
-                            table = parent_td.parent('tag:table')
-                            if table:
-                                th = table.ele(f'xpath:.//thead//tr/th[{col_index + 1}]', timeout=0.1)
-                                if th:
-                                    found_label = th.text.strip()
-                                else:
-                                    first_row_th = table.ele(f'xpath:.//tr[1]/th[{col_index + 1}]', timeout=0.1)
-                                    if first_row_th:
-                                        found_label = first_row_th.text.strip()
-                                    else:
-                                        first_row_td = table.ele(f'xpath:.//tr[1]/td[{col_index + 1}]', timeout=0.1)
-                                        if first_row_td:
-                                            found_label = first_row_td.text.strip()
-                    except:
-                        pass
-                    
-                    # 常规 Label
-                    if not found_label and elem_id:
-                        try:
-                            label_ele = tab.ele(f'tag:label@for={elem_id}', timeout=0.1)
-                            if label_ele:
-                                found_label = label_ele.text.strip()
-                        except:
-                            pass
-                    
-                    if not found_label:
-                        found_label = placeholder or elem_name or elem_id
-                    
-                    data = {
-                        'index': idx,
-                        'tagName': tag,
-                        'type': elem_type,
-                        'name': elem_name,
-                        'className': attrs.get('class', ''),
-                        'placeholder': placeholder,
-                        'id': elem_id,
-                        'id_selector': f"#{elem_id}" if elem_id else None,
-                        'xpath': el.xpath,
-                        'label_text': found_label,
-                        'nearby_text': found_label,
-                        'rect': {'x': 0, 'y': 0, 'width': 10, 'height': 10}
-                    }
-                    
-                    fp = ElementFingerprint(data)
-                    fp.raw_element = el
-                    fingerprints.append(fp)
-                    
-                except Exception as e:
-                    continue
+            fingerprints = ElementFingerprint.from_batch(items)
             
             print(f"✅ 原生扫描完成！共提取 {len(fingerprints)} 个多维指纹")
             return fingerprints
             
         except Exception as e:
             print(f"❌ 原生扫描失败: {e}")
-            import traceback
-            traceback.print_exc()
+            if config.scanner_config.print_traceback:
+                import traceback
+                traceback.print_exc()
             return []
 
     @staticmethod
@@ -272,17 +394,39 @@ class SmartFormAnalyzer:
         Returns:
             转换后的值
         """
-        if value is None:
-            return ""
-            
-        value = str(value).strip()
+        # 批量填充时同一列常出现大量重复值，命中缓存即可跳过转换
+        try:
+            return _transform_value(value, input_type)
+        except TypeError:
+            # 不可哈希的值无法进入缓存
+            return _transform_value.__wrapped__(value, input_type)
+
+    @staticmethod
+    def _list_useful_iframes(target):
+        """
+        列出值得进入的 iframe
+        
+        尺寸过滤在页内一次完成，只对保留下来的 iframe 取元素对象，
+        避免逐个读取 .rect 的 CDP 往返。
         
-        # 日期处理
-        if 'date' in str(input_type).lower():
-            if '/' in value:
-                return value.replace('/', '-')
+        Args:
+            target: DrissionPage 的 tab 或 frame 对象
             
-        return value
+        Returns:
+            list[tuple]: (原始索引, src, iframe 元素) 列表
+        """
+        from app.infrastructure.js.script_store import ScriptStore
+        
+        useful = (target.run_js(ScriptStore.USEFUL_IFRAMES) or {}).get('items') or []
+        if not useful:
+            return []
+        
+        elements = target.eles('tag:iframe')
+        return [
+            (info['i'], info.get('src', ''), elements[info['i']])
+            for info in useful
+            if info.get('i') is not None and info['i'] < len(elements)
+        ]
 
     @staticmethod
     def _scan_iframes(tab):
@@ -296,73 +440,47 @@ class SmartFormAnalyzer:
            - 对重型业务 iframe 自动延长等待时间
         3. 递归穿透所有同源 iframe
         """
-        import time
-        from app.infrastructure.js.script_store import ScriptStore
+        import copy
+        from concurrent.futures import ThreadPoolExecutor
         
         all_iframe_fingerprints = []
         MAX_DEPTH = 3  # 防止无限递归
         
-        def process_frame(frame_obj, depth=0, parent_path=""):
-            """递归处理 frame 及其子 frame"""
-            nonlocal all_iframe_fingerprints
+        # (src, depth) -> 该 frame 自身的指纹列表；并发分支共享。
+        # 每个 key 一把锁：同 src 的 frame 在不同分支同时出现时，后到者等待先到者的结果，
+        # 而不是重复执行页内等待+扫描
+        results_cache = {}
+        key_locks = {}
+        
+        def scan_frame_elements(frame_obj, depth, parent_path, src):
+            """等待 frame 内容就绪并扫描其自身元素（不含子 frame）"""
+            own = []
             
-            if depth > MAX_DEPTH:
-                return
-
-            # 1. 智能等待：基于内容的通用判断
-            # 这里的逻辑适用任何网站：如果页面没内容，就等多一会；有内容，就立即扫
-            start_wait = time.time()
+            # 智能等待 + 扫描在同一次 run_js 中完成：
+            # 页内先等内容就绪（加载完成且有输入框/表格/文本），就绪后立即扫描
             max_wait_time = 8.0 # 通用最大等待时间
-            is_ready = False
-            
-            # 简易探针：检测是否有可见元素
-            probe_js = """
-            (function() {
-                // 1. 检查加载状态
-                if (document.readyState !== 'complete') return { status: 'loading' };
-                
-                // 2. 检查是否有实质内容 (Input/Table/Form)
-                const inputs = document.querySelectorAll('input, select, textarea');
-                if (inputs.length > 0) return { status: 'ready', count: inputs.length, type: 'input' };
-                
-                const table = document.querySelector('table, .el-table, .ant-table');
-                if (table) return { status: 'ready', count: 1, type: 'table' };
-                
-                // 3. 检查文本量 (排除空白页)
-                if (document.body.innerText.trim().length > 50) return { status: 'ready', count: 0, type: 'text' };
-                
-                return { status: 'empty' };
-            })();
-            """
             
             try:
-                # 动态轮询
-                for i in range(10): # 最多轮询 10 次
-                    res = frame_obj.run_js(probe_js)
-                    if isinstance(res, dict) and res.get('status') == 'ready':
-                        is_ready = True
-                        if i > 1: # 如果等待了才加载出来，打印一下
-                            print(f"      ⏳ Iframe 内容就绪 (等待 {time.time()-start_wait:.1f}s): 发现 {res.get('type')}")
-                        break
-                    
-                    if time.time() - start_wait > max_wait_time:
-                        break
-                        
-                    time.sleep(0.5 + (i * 0.2)) # 指数退避: 0.5, 0.7, 0.9...
-            
-            except Exception as e:
-                # 可能是跨域或 frame 销毁
-                pass
-
-            # 2. 执行扫描 (如果 ready 或者 已经超时但可能部分加载)
-            try:
-                # 在 frame 对象上执行全量分析脚本
-                js_result = frame_obj.run_js(SmartFormAnalyzer.get_analysis_js())
+                with _driver_lock(frame_obj):
+                    js_result = SmartFormAnalyzer.run_analysis(
+                        frame_obj,
+                        {
+                            'untilStable': True,
+                            'requireContent': True,
+                            'compact': True,
+                            'pollMs': 800,
+                            'maxMs': int(max_wait_time * 1000),
+                        },
+                        timeout=max_wait_time + 5
+                    )
+                
+                if isinstance(js_result, dict) and js_result.get('elapsed_ms', 0) > 500: # 如果等待了才加载出来，打印一下
+                    logger.debug("      ⏳ Iframe 内容就绪 (等待 %.1fs)", js_result['elapsed_ms'] / 1000)
                 
                 # 获取结果
                 found_elements = []
                 if isinstance(js_result, dict) and 'elements' in js_result:
-                    found_elements = js_result['elements']
+                    found_elements = SmartFormAnalyzer._unpack_elements(js_result['elements'])
                 elif isinstance(js_result, list):
                     found_elements = js_result
                     
@@ -376,31 +494,56 @@ class SmartFormAnalyzer:
                         item['frame_path'] = f"{parent_path}"
                         item['in_iframe'] = True
                         item['frame_depth'] = depth
-                        try:
-                            all_iframe_fingerprints.append(ElementFingerprint(item))
-                        except: 
-                            pass
+                        item['frame_src'] = src
+                    own = ElementFingerprint.from_batch(found_elements)
                             
             except Exception as e:
                 pass # 静默失败，继续尝试子frame
+            
+            return own
+        
+        def relocate(fp, parent_path):
+            """复制缓存的指纹并改写 frame_path（共享其余只读数据）"""
+            clone = copy.copy(fp)
+            clone.raw_data = dict(fp.raw_data, frame_path=parent_path)
+            clone.frame_info = dict(fp.frame_info, frame_path=parent_path)
+            return clone
+        
+        def process_frame(frame_obj, depth=0, parent_path="", results=None, src=""):
+            """递归处理 frame 及其子 frame，结果追加到 results"""
+            if depth > MAX_DEPTH:
+                return
+            
+            # 相同 src 且同深度的 iframe（重复嵌入的公共组件）只扫描一次
+            cache_key = (src, depth) if src and src != 'about:blank' else None
+            if cache_key:
+                with key_locks.setdefault(cache_key, threading.Lock()):
+                    cached = results_cache.get(cache_key)
+                    if cached is None:
+                        own = scan_frame_elements(frame_obj, depth, parent_path, src)
+                        results_cache[cache_key] = own
+                if cached is not None:
+                    if cached:
+                        logger.debug("      ♻️ [深度%d] 复用相同 Iframe 扫描结果: %d 个元素", depth, len(cached))
+                    results.extend(relocate(fp, parent_path) for fp in cached)
+                else:
+                    results.extend(own)
+            else:
+                results.extend(scan_frame_elements(frame_obj, depth, parent_path, src))
 
-            # 3. 递归寻找子 Iframes
+            # 3. 递归寻找子 Iframes（已在页内过滤不可见或过小的 iframe）
             try:
-                child_iframes = frame_obj.eles('tag:iframe')
-                if child_iframes:
-                    for i, child_frame_ele in enumerate(child_iframes):
-                        try:
-                            # 过滤不可见或过小的 iframe (广告/像素点)
-                            rect = child_frame_ele.rect
-                            if rect.size[0] < 50 or rect.size[1] < 50:
-                                continue
-                                
+                with _driver_lock(frame_obj):
+                    children = SmartFormAnalyzer._list_useful_iframes(frame_obj)
+                for i, child_src, child_frame_ele in children:
+                    try:
+                        with _driver_lock(frame_obj):
                             child_frame_obj = frame_obj.get_frame(child_frame_ele)
-                            if child_frame_obj:
-                                new_path = f"{parent_path}iframe[{i}]->" if parent_path else f"iframe[{i}]->"
-                                process_frame(child_frame_obj, depth + 1, new_path)
-                        except:
-                            pass
+                        if child_frame_obj:
+                            new_path = f"{parent_path}iframe[{i}]->" if parent_path else f"iframe[{i}]->"
+                            process_frame(child_frame_obj, depth + 1, new_path, results, child_src)
+                    except:
+                        pass
             except:
                 pass
 
@@ -409,36 +552,53 @@ class SmartFormAnalyzer:
             print(f"\\n📦 开始递归 Iframe 扫描 (通用智能模式)...")
             
             try:
-                top_iframe_elements = tab.eles('tag:iframe')
+                top_iframes = SmartFormAnalyzer._list_useful_iframes(tab)
             except:
-                top_iframe_elements = []
+                top_iframes = []
             
-            if not top_iframe_elements:
+            if not top_iframes:
                 print("   未检测到 Iframe")
                 return []
 
-            print(f"   检测到 {len(top_iframe_elements)} 个顶层 Iframe")
+            print(f"   检测到 {len(top_iframes)} 个顶层 Iframe")
             
-            for i, frame_ele in enumerate(top_iframe_elements):
+            def scan_top_frame(i, src, frame_ele):
+                """扫描单个顶层 Iframe（含其子 Iframe），返回该分支的指纹列表"""
+                results = []
                 try:
-                    # 获取基本信息用于日志
-                    frame_desc = f"Iframe[{i}]"
-                    frame_obj = tab.get_frame(frame_ele)
+                    with _driver_lock(tab):
+                        frame_obj = tab.get_frame(frame_ele)
                     
                     if frame_obj:
-                        process_frame(frame_obj, depth=1, parent_path=f"iframe[{i}]")
+                        process_frame(frame_obj, depth=1, parent_path=f"iframe[{i}]", results=results, src=src)
                     else:
                         print(f"      ⚠️ 无法获取 frame 对象")
                         
                 except Exception as e:
                     print(f"   ⚠️ 顶层 Iframe[{i}] 无法进入: {e}")
+                return results
+            
+            # 顶层 Iframe 互不依赖，并发扫描；子 Iframe 仍在各自分支内顺序处理，以限制并发量。
+            # DrissionPage 的 Driver 分配消息 id 不加锁，同一 Driver 上的并发调用并不安全：
+            # 每次 CDP 调用都按所用 Driver 加锁（_driver_lock）。同源 frame 共用 tab 的 Driver，
+            # 实际上串行执行；只有拥有独立 Driver 的跨域 frame 才真正并发
+            max_workers = min(8, len(top_iframes))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [
+                    executor.submit(scan_top_frame, i, src, frame_ele)
+                    for i, src, frame_ele in top_iframes
+                ]
+                # 按 Iframe 顺序合并，保证结果顺序稳定
+                for future in futures:
+                    all_iframe_fingerprints.extend(future.result())
                     
             return all_iframe_fingerprints
             
         except Exception as e:
             print(f"❌ 递归扫描总控失败: {e}")
-            import traceback
-            traceback.print_exc()
+            if config.scanner_config.print_traceback:
+                import traceback
+                traceback.print_exc()
             return []
 
 
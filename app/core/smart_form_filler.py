@@ -7,11 +7,36 @@
 - Element UI 专用方法已提取到 app.core.filler.element_ui_adapter
 - 本模块保留核心填充逻辑和自愈机制
 """
-import time
-from typing import Any, Dict, Optional, Callable
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Callable, Tuple
 
+from app import config
 from app.core.smart_form_analyzer import SmartFormAnalyzer
 from app.core.filler.element_ui_adapter import ElementUIAdapter
+from app.domain.entities.element_fingerprint import TR_INDEX_RE
+from app.infrastructure.js.script_store import ScriptStore
+from app.utils.logger import get_logger
+from app.utils.throttle import ProgressThrottle
+
+logger = get_logger(__name__)
+
+
+# frame_path 中的 iframe 索引: "iframe[0]->..."
+_IFRAME_INDEX_RE = re.compile(r'iframe\[(\d+)\]')
+
+# 锚点列扫描缓存: {(id(tab), generic_xpath): (dom_generation, web_row_map)}
+# dom_generation 由页内 MutationObserver 维护，页面有任何变动或跳转后即失效
+_ANCHOR_CACHE: 'OrderedDict[Tuple[int, str], Tuple[str, Dict[str, int]]]' = OrderedDict()
+_ANCHOR_CACHE_SIZE = 16
+_ANCHOR_CACHE_LOCK = threading.Lock()
+
+# 选择器命中记录: {(id, css, xpath): 'id' | 'css' | 'xpath'}
+# 记录上次实际定位成功的选择器，重试/重新打开同一页面时页内优先尝试它
+_SELECTOR_HITS: 'OrderedDict[Tuple[str, str, str], str]' = OrderedDict()
+_SELECTOR_HITS_SIZE = 10000
+_SELECTOR_HITS_LOCK = threading.Lock()
 
 
 class SmartFormFiller:
@@ -21,6 +46,79 @@ class SmartFormFiller:
     fill_element_ui_input = staticmethod(ElementUIAdapter.fill_by_placeholder)
     fill_element_ui_by_label = staticmethod(ElementUIAdapter.fill_by_label)
     
+    # 加载遮罩检测：无遮罩立即返回；有遮罩时由 MutationObserver / ResizeObserver
+    # 驱动重新检测，遮罩消失或超时后 resolve（单次 run_js 往返）
+    _LOADING_WAIT_JS = """
+    const timeoutMs = arguments[0];
+    
+    const visible = (el) => el && el.offsetParent !== null;
+    const check = () => {
+        // Element UI 加载遮罩
+        const elLoading = document.querySelector('.el-loading-mask');
+        if (visible(elLoading)) {
+            const style = window.getComputedStyle(elLoading);
+            if (style.display !== 'none' && style.visibility !== 'hidden') return 'el-loading-mask';
+        }
+        
+        // Ant Design 旋转加载
+        if (visible(document.querySelector('.ant-spin-spinning'))) return 'ant-spin';
+        
+        // Ant Design 模糊遮罩
+        if (document.querySelector('.ant-spin-container.ant-spin-blur')) return 'ant-spin-blur';
+        
+        // iView/View UI
+        if (visible(document.querySelector('.ivu-spin-fix'))) return 'ivu-spin';
+        
+        // 通用 loading 类（排除小型 loading 图标）
+        const generic = document.querySelector('[class*="loading"]:not(input):not(button)');
+        if (visible(generic)) {
+            const style = window.getComputedStyle(generic);
+            if (style.display !== 'none' && style.opacity !== '0') {
+                const rect = generic.getBoundingClientRect();
+                if (rect.width > 100 && rect.height > 100) return 'generic';
+            }
+        }
+        return null;
+    };
+    
+    const first = check();
+    if (!first) return { loading: false };
+    
+    return new Promise(resolve => {
+        let timer = null;
+        let mo = null;
+        let ro = null;
+        const finish = (loading) => {
+            if (mo) mo.disconnect();
+            if (ro) ro.disconnect();
+            clearTimeout(timer);
+            resolve({ loading: loading, type: first });
+        };
+        const recheck = () => { if (!check()) finish(false); };
+        
+        mo = new MutationObserver(recheck);
+        mo.observe(document.documentElement, {
+            subtree: true, childList: true, attributes: true,
+            attributeFilter: ['class', 'style', 'hidden', 'aria-hidden']
+        });
+        // 布局变化（如遮罩尺寸收缩）不一定产生 DOM 变更
+        if (window.ResizeObserver && document.body) {
+            ro = new ResizeObserver(recheck);
+            ro.observe(document.body);
+        }
+        timer = setTimeout(() => finish(!!check()), timeoutMs);
+    });
+    """
+    
+    # 检测函数按页面注入一次（window.__weaverWaitLoading），之后每次只发送调用桩；
+    # 页面跳转后函数丢失时调用桩返回 _MISSING，重新注入即可
+    _MISSING = '__weaver_missing__'
+    _LOADING_INSTALL_JS = "window.__weaverWaitLoading = function() {\n" + _LOADING_WAIT_JS + "\n};"
+    _LOADING_CALL_JS = (
+        "return window.__weaverWaitLoading ? window.__weaverWaitLoading(arguments[0]) "
+        ": '__weaver_missing__';"
+    )
+    
     @staticmethod
     def _wait_for_loading_complete(tab, timeout=1):
         """
@@ -36,81 +134,144 @@ class SmartFormFiller:
         Returns:
             bool: True 表示加载完成，False 表示超时
         """
-        start = time.time()
-        check_count = 0
+        timeout_ms = int(timeout * 1000)
+        try:
+            result = tab.run_js(SmartFormFiller._LOADING_CALL_JS, timeout_ms, timeout=timeout + 1)
+            if result == SmartFormFiller._MISSING:
+                tab.run_js(SmartFormFiller._LOADING_INSTALL_JS)
+                result = tab.run_js(SmartFormFiller._LOADING_CALL_JS, timeout_ms, timeout=timeout + 1)
+        except Exception:
+            return False
         
-        while time.time() - start < timeout:
-            try:
-                js_check = """
-                (function() {
-                    // Element UI 加载遮罩
-                    const elLoading = document.querySelector('.el-loading-mask');
-                    if (elLoading && elLoading.offsetParent !== null) {
-                        const style = window.getComputedStyle(elLoading);
-                        if (style.display !== 'none' && style.visibility !== 'hidden') {
-                            return { loading: true, type: 'el-loading-mask' };
-                        }
-                    }
-                    
-                    // Ant Design 旋转加载
-                    const antSpin = document.querySelector('.ant-spin-spinning');
-                    if (antSpin && antSpin.offsetParent !== null) {
-                        return { loading: true, type: 'ant-spin' };
-                    }
-                    
-                    // Ant Design 模糊遮罩
-                    const antBlur = document.querySelector('.ant-spin-container.ant-spin-blur');
-                    if (antBlur) {
-                        return { loading: true, type: 'ant-spin-blur' };
-                    }
-                    
-                    // iView/View UI
-                    const ivuSpin = document.querySelector('.ivu-spin-fix');
-                    if (ivuSpin && ivuSpin.offsetParent !== null) {
-                        return { loading: true, type: 'ivu-spin' };
-                    }
-                    
-                    // 通用 loading 类
-                    const genericLoading = document.querySelector('[class*="loading"]:not(input):not(button)');
-                    if (genericLoading && genericLoading.offsetParent !== null) {
-                        const style = window.getComputedStyle(genericLoading);
-                        if (style.display !== 'none' && style.opacity !== '0') {
-                            // 排除小型 loading 图标
-                            const rect = genericLoading.getBoundingClientRect();
-                            if (rect.width > 100 && rect.height > 100) {
-                                return { loading: true, type: 'generic' };
-                            }
-                        }
-                    }
-                    
-                    return { loading: false };
-                })();
-                """
-                
-                result = tab.run_js(js_check)
-                
-                if result and isinstance(result, dict):
-                    if not result.get('loading'):
-                        # 首次检测无加载动画，立即返回（快速路径）
-                        return True
-                    else:
-                        if check_count == 0:
-                            print(f"   ⏳ 检测到加载动画: {result.get('type')}, 等待中...")
-                        check_count += 1
-                        
-            except Exception as e:
-                pass
-            
-            time.sleep(0.3)
+        if not isinstance(result, dict):
+            return False
+        
+        if result.get('type'):
+            print(f"   ⏳ 检测到加载动画: {result.get('type')}, 等待中...")
+        
+        if not result.get('loading'):
+            return True
         
         print(f"   ⚠️ 等待加载超时 ({timeout}s)")
         return False
 
     
+    # 页面 DOM 代数：首次调用时安装 MutationObserver，之后每次变动计数 +1；
+    # 返回 "页面随机 id:计数"，页面跳转后 id 变化，避免计数归零后误命中
+    _DOM_GEN_JS = """
+    if (!window.__weaverDomGen) {
+        const gen = window.__weaverDomGen = { id: Math.random().toString(36).slice(2), n: 0 };
+        new MutationObserver(() => { gen.n++; }).observe(document.documentElement, {
+            childList: true, subtree: true, characterData: true
+        });
+    }
+    return window.__weaverDomGen.id + ':' + window.__weaverDomGen.n;
+    """
+    
+    @staticmethod
+    def _read_column_texts(tab, generic_xpath):
+        """
+        读取 XPath 匹配的全部单元格文本（单次 run_js，替代逐元素读取 .text）
+        
+        Args:
+            tab: DrissionPage tab 对象
+            generic_xpath: 去掉行号的列 XPath
+            
+        Returns:
+            list: 按文档顺序排列的去空白文本
+        """
+        result = tab.run_js(ScriptStore.COLUMN_TEXTS, generic_xpath)
+        return (result or {}).get('texts') or []
+    
+    @staticmethod
+    def _scan_anchor_column(tab, generic_xpath):
+        """
+        扫描锚点列，构建 {单元格文本: 网页行号}
+        
+        结果按 (tab, generic_xpath) 缓存，页面 DOM 未变化时（如继续填充）直接复用。
+        
+        Args:
+            tab: DrissionPage tab 对象
+            generic_xpath: 去掉行号的锚点列 XPath
+            
+        Returns:
+            dict: {anchor_text: row_index (0-based)}
+        """
+        cache_key = (id(tab), generic_xpath)
+        try:
+            dom_gen = tab.run_js(SmartFormFiller._DOM_GEN_JS)
+        except Exception:
+            dom_gen = None
+        
+        if dom_gen:
+            with _ANCHOR_CACHE_LOCK:
+                cached = _ANCHOR_CACHE.get(cache_key)
+                if cached and cached[0] == dom_gen:
+                    _ANCHOR_CACHE.move_to_end(cache_key)
+                    print(f"   ♻️ 页面未变化，复用锚点索引: {generic_xpath}")
+                    return dict(cached[1])
+        
+        # 一次 run_js 取回整列文本
+        print(f"   正在扫描锚点数据: {generic_xpath}")
+        web_row_map = {}
+        for idx, txt in enumerate(SmartFormFiller._read_column_texts(tab, generic_xpath)):
+            if txt:
+                # 记录: 值 -> 相对行号 (0-based)
+                # 如果模板是 tr[1]，那么 row_idx=0 对应 tr[1]；
+                # 扫描出来的第一个元素就是 tr[1]，两者一致
+                web_row_map[txt] = idx
+        
+        if dom_gen:
+            with _ANCHOR_CACHE_LOCK:
+                _ANCHOR_CACHE[cache_key] = (dom_gen, dict(web_row_map))
+                _ANCHOR_CACHE.move_to_end(cache_key)
+                if len(_ANCHOR_CACHE) > _ANCHOR_CACHE_SIZE:
+                    _ANCHOR_CACHE.popitem(last=False)
+        return web_row_map
+    
+    # 表格行数探测：按 get_selector_for_row 的规则把 tr[N] 替换为 tr[n+1]，
+    # 任一字段模板能定位到元素即视为第 n 行存在；到达 limit 或首个空行为止
+    _COUNT_ROWS_JS = """
+    const a = arguments[0];
+    const exists = (xp) => {
+        try {
+            return !!document.evaluate(xp, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        } catch (e) {
+            return false;
+        }
+    };
+    let n = 0;
+    while (n < a.limit && a.templates.some(t => exists(t.replace(/tr\\[\\d+\\]/g, 'tr[' + (n + 1) + ']')))) {
+        n++;
+    }
+    return n;
+    """
+    
+    @staticmethod
+    def _count_table_rows(tab, templates, limit):
+        """
+        单次 run_js 探测网页表格的可填充行数
+        
+        Args:
+            tab: DrissionPage tab 对象
+            templates: 含 tr[N] 的字段 XPath 列表
+            limit: 最多探测的行数
+            
+        Returns:
+            int | None: 可填充行数；无模板或探测失败返回 None
+        """
+        if not templates or limit <= 0:
+            return None
+        try:
+            count = tab.run_js(SmartFormFiller._COUNT_ROWS_JS, {'templates': list(templates), 'limit': int(limit)})
+        except Exception:
+            return None
+        return count if isinstance(count, int) and not isinstance(count, bool) else None
+    
     @staticmethod
     def fill_form_with_healing(tab, excel_data, fingerprint_mappings, 
                                fill_mode='single_form', key_column=None, progress_callback=None,
-                               start_row_idx=0):
+                               start_row_idx=0, end_row_idx=None):
         """
         自愈式表单填写
         
@@ -122,15 +283,20 @@ class SmartFormFiller:
             key_column: 锚点列名 (仅用于表格模式)
             progress_callback: 进度回调
             start_row_idx: 从第几行开始填充（0-indexed），用于单条录入的继续功能
+            end_row_idx: 填充到第几行为止（不含），None 表示到末尾；用于多 tab 分段填充
             
         Returns:
             dict: 填写结果统计
         """
         total_rows = len(excel_data)
         success_count = 0
+        # 逐行进度合并转发（错误/警告与最终进度不受影响）
+        progress_callback = ProgressThrottle(progress_callback)
         error_count = 0
         errors = []
         healed_count = 0
+        # 单据模式批量填充时是否合并 change 事件（仅适用于无级联逻辑的表单）
+        coalesce_events = config.filler_config.coalesce_change_events
         
         print(f"\n=== 🚀 启动智能填表 (模式: {fill_mode}, 锚点: {key_column}) ===")
         print(f"总行数: {total_rows}")
@@ -175,45 +341,72 @@ class SmartFormFiller:
                 # 获取该列选择器 (假设是 xpath)
                 xpath = key_fp.selectors.get('xpath')
                 if xpath:
-                    import re
                     # 尝试泛化 XPath: .../tr[1]/td[2] -> .../tr/td[2]
                     # 我们需要找到所有同列元素
                     # 简单策略：替换 tr[\d+] 为 tr
-                    generic_xpath = re.sub(r'tr\[\d+\]', 'tr', xpath)
-                    
-                    # 查找所有元素
-                    print(f"   正在扫描锚点数据: {generic_xpath}")
-                    elements = tab.eles(f'xpath:{generic_xpath}')
-                    
-                    for idx, ele in enumerate(elements):
-                        txt = ele.text.strip()
-                        if txt:
-                            # 记录: 值 -> 相对行号 (0-based)
-                            # 注意: idx 通常对应 row_idx (0, 1, 2...)
-                            # 但如果表头也被算进去了，可能需要调整。
-                            # 这里的 idx 是相对于 elements 列表的。
-                            # get_selector_for_row 需要的是 "相对于第一行(模板行)" 的偏移?
-                            # 不，get_selector_for_row 需要的是 "绝对行号" 或 "增量"。
-                            # 如果模板是 tr[1]，那么 row_idx=0 对应 tr[1]。
-                            # 如果扫描出来的 elements 第一个就是 tr[1]，那么 idx=0 对应 tr[1]。
-                            # 应该是匹配的。
-                            web_row_map[txt] = idx
-                            # print(f"   Found key: {txt} -> row {idx}")
+                    generic_xpath = TR_INDEX_RE.sub('tr', xpath)
                     
+                    web_row_map = SmartFormFiller._scan_anchor_column(tab, generic_xpath)
                     print(f"✅ 锚点扫描完成，索引了 {len(web_row_map)} 行数据")
             except Exception as e:
                 print(f"❌ 锚点扫描失败: {e}")
 
+        # 按列一次性完成清洗与数据转换，避免 iterrows 逐行构造 Series
+        column_values = SmartFormFiller._prepare_column_values(excel_data, fingerprint_mappings)
+        key_values = None
+        if fill_mode == 'batch_table' and key_column and key_column in excel_data.columns:
+            key_values = [str(v).strip() for v in excel_data[key_column].tolist()]
+        
+        # 同一次填充内按 frame_path 复用 iframe 对象
+        frame_targets = {}
+        # 每个映射的行 → XPath 只展开一次
+        resolved_mappings = {
+            excel_col: SmartFormFiller._flatten_fingerprint(fingerprint)
+            for excel_col, fingerprint in fingerprint_mappings.items()
+        }
+        
+        # --- 表格模式（非锚点）: 预先探测网页表格行数，超出的行不再逐字段尝试 ---
+        if fill_mode == 'batch_table' and not web_row_map:
+            templates = []
+            for excel_col, fingerprint in fingerprint_mappings.items():
+                if excel_col == key_column or resolved_mappings[excel_col]['has_related']:
+                    continue
+                xpath = fingerprint.selectors.get('xpath')
+                if not xpath or not TR_INDEX_RE.search(xpath):
+                    # 存在非 tr[N] 定位的字段时无法可靠计数，保持逐行判定
+                    templates = []
+                    break
+                templates.append(xpath)
+            web_row_count = SmartFormFiller._count_table_rows(tab, templates, effective_total_rows)
+            if web_row_count is not None and web_row_count < effective_total_rows:
+                print(f"📊 网页表格共 {web_row_count} 行，Excel 超出部分不再填充")
+                effective_total_rows = web_row_count
+        
+        # --- 表格模式: 每列各行的动态选择器只生成一次（行循环内直接按行号取）---
+        row_selectors = {}
+        if fill_mode == 'batch_table':
+            row_span = max(web_row_map.values()) + 1 if web_row_map else effective_total_rows
+            if end_row_idx is not None and not web_row_map:
+                row_span = min(row_span, end_row_idx)
+            for excel_col, fingerprint in fingerprint_mappings.items():
+                if excel_col == key_column or resolved_mappings[excel_col]['has_related']:
+                    continue
+                row_selectors[excel_col] = [fingerprint.get_selector_for_row(i) for i in range(row_span)]
+        
         # 记录最后处理的行索引
         last_processed_row_idx = start_row_idx
         
-        for row_idx, row_data in excel_data.iterrows():
+        for pos, row_idx in enumerate(excel_data.index):
             row_num = row_idx + 1
             
             # ===== 跳过已处理的行（用于继续填充）=====
             if row_idx < start_row_idx:
                 continue
             
+            # ===== 分段填充：到达本段末尾 =====
+            if end_row_idx is not None and row_idx >= end_row_idx:
+                break
+            
             # ===== 单条录入模式：只填充 1 行 =====
             if fill_mode == 'single_form' and row_idx > start_row_idx:
                 print(f"\n📋 单条录入模式完成 (第 {row_num - 1} 行)")
@@ -231,7 +424,7 @@ class SmartFormFiller:
                     progress_callback(row_num, effective_total_rows, 
                                    f"📝 正在填写第 {row_num}/{effective_total_rows} 行", "info")
                 
-                print(f"\n--- 填写第 {row_num} 行 ---")
+                logger.debug("--- 填写第 %d 行 ---", row_num)
                 filled_fields = 0
                 
                 # --- 锚点匹配逻辑 ---
@@ -239,10 +432,10 @@ class SmartFormFiller:
                 
                 if fill_mode == 'batch_table' and key_column:
                     # 获取Excel中的Key值
-                    key_val = str(row_data.get(key_column, '')).strip()
+                    key_val = key_values[pos] if key_values is not None else ''
                     if key_val in web_row_map:
                         target_web_row_idx = web_row_map[key_val]
-                        print(f"   ⚓ 锚点匹配成功: '{key_val}' -> 网页第 {target_web_row_idx+1} 行")
+                        logger.debug("   ⚓ 锚点匹配成功: '%s' -> 网页第 %d 行", key_val, target_web_row_idx + 1)
                     else:
                         print(f"   ⚠️ 锚点匹配失败: '{key_val}' 未在网页中找到，跳过此行")
                         if progress_callback:
@@ -251,6 +444,20 @@ class SmartFormFiller:
                         error_count += 1
                         continue # 跳过此行
                 
+                # 按行号定位的文本字段（表格动态行 / related_inputs）整行一次 run_js 填充
+                row_prefilled = SmartFormFiller._prefill_table_row(
+                    tab, fingerprint_mappings, resolved_mappings, column_values,
+                    pos, row_idx, target_web_row_idx, key_column, fill_mode, row_selectors
+                )
+                
+                # 单据模式: 常规字段按 iframe 分组，一次 run_js 完成 JS 事件填充
+                js_prefilled = {}
+                if fill_mode == 'single_form':
+                    js_prefilled = SmartFormFiller._prefill_row_with_js(
+                        tab, fingerprint_mappings, resolved_mappings, column_values,
+                        pos, key_column, frame_targets, coalesce_events
+                    )
+                
                 attempted_count = 0
                 current_row_errors = []
                 for excel_col, fingerprint in fingerprint_mappings.items():
@@ -259,50 +466,34 @@ class SmartFormFiller:
                         continue
                         
                     try:
-                        # 获取Excel值
-                        cell_value = row_data[excel_col]
-                        # ... (rest of logic)
-                        if cell_value is None or (isinstance(cell_value, float) and str(cell_value) == 'nan'):
-                            continue
-                        
-                        cell_value = str(cell_value).strip()
-                        if not cell_value:
+                        # 获取预处理后的Excel值（空值为 None）
+                        values = column_values.get(excel_col)
+                        if values is None:
+                            raise KeyError(excel_col)
+                        transformed_value = values[pos]
+                        if transformed_value is None:
                             continue
                             
                         # 只要有有效数据，就视为尝试过填充
                         attempted_count += 1
                         
-                        # 智能数据转换
-                        transformed_value = SmartFormAnalyzer.suggest_data_transformation(
-                            cell_value, 
-                            fingerprint.features.get('type', '')
-                        )
-                        
                         # --- 核心逻辑: 批量输入框处理（遵循批量填充原则）---
-                        # 检查 fingerprint 是否有 related_inputs (批量选择模式)
-                        related_inputs = getattr(fingerprint, 'related_inputs', None)
+                        # 有 related_inputs (批量选择模式) 时按行号取预先展开的 XPath:
+                        # Excel 行 0 → 主元素，行 N → related_inputs[N-1]
+                        xpath_by_row = resolved_mappings[excel_col]['xpath_by_row']
                         
-                        if related_inputs and len(related_inputs) > 0:
-                            # 批量模式：根据 row_idx 选择对应的输入框
-                            # Excel 行 0 → 主元素（fingerprint 本身）
-                            # Excel 行 1 → related_inputs[0]
-                            # Excel 行 2 → related_inputs[1]
-                            # 依此类推...
-                            
-                            if row_idx == 0:
-                                # 第一行使用主元素
-                                target_xpath = fingerprint.selectors.get('xpath', '')
-                            elif row_idx - 1 < len(related_inputs):
-                                # 后续行使用 related_inputs
-                                target_input = related_inputs[row_idx - 1]
-                                target_xpath = target_input.get('xpath', '') if isinstance(target_input, dict) else getattr(target_input, 'xpath', '')
+                        if len(xpath_by_row) > 1:
+                            if row_idx < len(xpath_by_row):
+                                target_xpath = xpath_by_row[row_idx] or ''
                             else:
                                 # 超出了可用输入框数量
                                 print(f"  ⚠️ 列 [{excel_col}]: Excel 行数超过网页输入框数量，跳过第 {row_num} 行")
                                 continue
                             
                             # 使用目标 xpath 填充
-                            if target_xpath:
+                            if target_xpath and row_prefilled.get(excel_col):
+                                filled_fields += 1
+                            elif target_xpath:
                                 try:
                                     ele = tab.ele(f'xpath:{target_xpath}', timeout=0.1)
                                     if ele:
@@ -327,7 +518,9 @@ class SmartFormFiller:
                             
                             # 尝试生成动态选择器
                             # 我们假设映射的是第1行，所以 offset = row_idx
-                            dyn_sel = fingerprint.get_selector_for_row(target_web_row_idx)
+                            dyn_sel = SmartFormFiller._selector_for_row(
+                                row_selectors, excel_col, fingerprint, target_web_row_idx
+                            )
                             if dyn_sel:
                                 use_dynamic_selector = True
                                 dynamic_selector = dyn_sel
@@ -340,8 +533,11 @@ class SmartFormFiller:
                         # 执行填充
                         success = False
                         
-                        if use_dynamic_selector:
-                            # 动态选择器模式
+                        if use_dynamic_selector and row_prefilled.get(excel_col):
+                            # 已在整行批量填充中完成
+                            success = True
+                        elif use_dynamic_selector:
+                            # 动态选择器模式（整行批量未覆盖的控件，如下拉/复选框）
                             sel_type, sel_str = dynamic_selector
                             try:
                                 if sel_type == 'xpath':
@@ -355,25 +551,29 @@ class SmartFormFiller:
                                     success = True
                             except:
                                 success = False
+                        elif js_prefilled.get(excel_col):
+                            # 已在批量 JS 填充中完成
+                            success = True
                         else:
                             # 常规/单据模式
                             success = SmartFormFiller._fill_with_fallback(
-                                tab, fingerprint, transformed_value
+                                tab, fingerprint, transformed_value, frame_targets,
+                                skip_js=excel_col in js_prefilled
                             )
                         
                         if success:
-                            # print(f"  ✓ [{excel_col}] = {transformed_value}") # 简化日志
+                            logger.debug("  ✓ [%s] = %s", excel_col, transformed_value)
                             filled_fields += 1
                         else:
                             # 失败处理
                             if fill_mode == 'single_form':
                                 # 单据模式才尝试高级自愈，表格模式的自愈太复杂暂时跳过
-                                print(f"  ⚠️ 元素定位失败，尝试自愈...")
+                                logger.debug("  ⚠️ [%s] 元素定位失败，尝试自愈...", excel_col)
                                 healed = SmartFormFiller._try_heal_and_fill(
                                     tab, fingerprint, transformed_value
                                 )
                                 if healed:
-                                    print(f"  ✅ 自愈成功!")
+                                    logger.debug("  ✅ [%s] 自愈成功", excel_col)
                                     filled_fields += 1
                                     healed_count += 1
                                 else:
@@ -392,7 +592,7 @@ class SmartFormFiller:
                          stop_msg = f"⛔ 检测到网页表格行已结束 (第{row_num}行无匹配元素)，停止填充。"
                          print(f"  {stop_msg}")
                          if progress_callback:
-                             progress_callback(row_num, total_rows, "✅ 录入完成 (表格行结束)", "success")
+                             progress_callback.emit(row_num, total_rows, "✅ 录入完成 (表格行结束)", "success")
                          break # 退出循环，丢弃 current_row_errors
                     
                     msg = f"第 {row_num} 行未能填充任何字段"
@@ -413,7 +613,7 @@ class SmartFormFiller:
                         print(f"  ✗ {err.split(': ', 1)[1]}")
                     errors.extend(current_row_errors)
                 
-                print(f"  ✅ 第{row_num}行完成，填充 {filled_fields} 个字段")
+                logger.debug("  ✅ 第%d行完成，填充 %d 个字段", row_num, filled_fields)
                 
                 # 行后操作
                 if fill_mode == 'single_form' and row_num < total_rows:
@@ -440,6 +640,8 @@ class SmartFormFiller:
                     progress_callback(row_num, total_rows,
                                    f"❌ {error_msg}", "error")
         
+        progress_callback.flush()
+        
         result = {
             'total': total_rows,
             'success': success_count,
@@ -452,9 +654,522 @@ class SmartFormFiller:
         print(f"\n=== 填表完成 ===")
         print(f"成功: {success_count}/{total_rows}")
         print(f"失败: {error_count}/{total_rows}")
+        if healed_count:
+            print(f"自愈: {healed_count} 个字段")
         
         return result
     
+    @staticmethod
+    def _prepare_column_values(excel_data, fingerprint_mappings):
+        """
+        按列预处理映射字段的 Excel 值
+        
+        空值判断使用 notna 整列完成，每列只做一次 tolist，
+        并按列对应的控件类型完成数据转换。
+        
+        Args:
+            excel_data: pandas DataFrame
+            fingerprint_mappings: dict {excel_col: ElementFingerprint对象}
+            
+        Returns:
+            dict: {excel_col: [转换后的值或 None, ...]}，按行位置对齐
+        """
+        prepared = {}
+        for excel_col, fingerprint in fingerprint_mappings.items():
+            if excel_col not in excel_data.columns:
+                continue
+            series = excel_data[excel_col]
+            input_type = fingerprint.features.get('type', '')
+            values = []
+            append = values.append
+            for value, present in zip(series.tolist(), series.notna().tolist()):
+                text = str(value).strip() if present else ''
+                append(SmartFormAnalyzer.suggest_data_transformation(text, input_type) if text else None)
+            prepared[excel_col] = values
+        return prepared
+    
+    @staticmethod
+    def _prefill_table_row(tab, fingerprint_mappings, resolved_mappings, column_values,
+                           pos, row_idx, web_row_idx, key_column, fill_mode, row_selectors=None):
+        """
+        整行批量填充按行号定位的字段（一次 run_js）
+        
+        覆盖 related_inputs 批量列与表格模式下 tr[N] 动态 XPath 的字段；
+        非文本控件或定位失败的字段结果为 False，由逐字段流程继续处理。
+        
+        Returns:
+            dict: {excel_col: 是否成功}，只包含实际尝试过的字段
+        """
+        cols, ops = [], []
+        for excel_col, fingerprint in fingerprint_mappings.items():
+            values = column_values.get(excel_col)
+            if excel_col == key_column or values is None or values[pos] is None:
+                continue
+            
+            xpath_by_row = resolved_mappings[excel_col]['xpath_by_row']
+            xpath = None
+            if len(xpath_by_row) > 1:
+                if row_idx < len(xpath_by_row):
+                    xpath = xpath_by_row[row_idx]
+            elif fill_mode == 'batch_table':
+                dyn_sel = SmartFormFiller._selector_for_row(
+                    row_selectors, excel_col, fingerprint, web_row_idx
+                )
+                if dyn_sel and dyn_sel[0] == 'xpath':
+                    xpath = dyn_sel[1]
+            
+            if xpath:
+                cols.append(excel_col)
+                ops.append({'xpath': xpath, 'value': str(values[pos])})
+        
+        ok = SmartFormFiller._fill_row_batch(tab, ops)
+        if ok is None:
+            return {}  # 批量调用失败，交给逐字段流程
+        return {excel_col: bool(o) for excel_col, o in zip(cols, ok)}
+    
+    @staticmethod
+    def _selector_for_row(row_selectors, excel_col, fingerprint, web_row_idx):
+        """
+        取预先生成的第 N 行动态选择器；未预生成（超出范围）时现算
+        
+        Returns:
+            tuple | None: ('xpath'|'css', selector) 或 None
+        """
+        selectors = (row_selectors or {}).get(excel_col)
+        if selectors is not None and 0 <= web_row_idx < len(selectors):
+            return selectors[web_row_idx]
+        return fingerprint.get_selector_for_row(web_row_idx)
+    
+    @staticmethod
+    def _prefill_row_with_js(tab, fingerprint_mappings, resolved_mappings, column_values,
+                             pos, key_column, frames, coalesce_events=False):
+        """
+        单据模式下批量 JS 事件填充一行的常规字段
+        
+        只处理走 _fill_with_fallback 的字段（非 related_inputs 批量列、非锚点列、有值）；
+        同一 iframe 的字段合并为一次 run_js。coalesce_events 见 _fill_many_with_js_events。
+        
+        Returns:
+            dict: {excel_col: 是否成功}，只包含实际尝试过的字段
+        """
+        groups = {}
+        for excel_col, fingerprint in fingerprint_mappings.items():
+            resolved = resolved_mappings[excel_col]
+            values = column_values.get(excel_col)
+            if excel_col == key_column or resolved['has_related'] or values is None:
+                continue
+            value = values[pos]
+            if value is None:
+                continue
+            job = SmartFormFiller._selector_job(
+                fingerprint.raw_data.get('id', ''),
+                fingerprint.selectors.get('xpath', ''),
+                fingerprint.selectors.get('css', ''),
+                str(value),
+            )
+            groups.setdefault(resolved['frame_path'], []).append((excel_col, job))
+        
+        prefilled = {}
+        for frame_path, items in groups.items():
+            target = SmartFormFiller._frame_target(tab, frame_path, frames)
+            results = SmartFormFiller._fill_many_with_js_events(
+                target, [job for _, job in items], coalesce_events
+            )
+            if results is None:
+                continue  # 批量调用失败，交给逐字段流程
+            for (excel_col, _), ok in zip(items, results):
+                prefilled[excel_col] = ok
+        return prefilled
+    
+    @staticmethod
+    def fill_form_parallel(tabs, excel_data, fingerprint_mappings, fill_mode='batch_table',
+                           key_column=None, progress_callback=None):
+        """
+        多 tab 并发填充（表格模式，实验性）
+        
+        将 Excel 行按连续区间平均分给各 tab（各 tab 打开同一页面），每个 tab 在独立线程中
+        执行 fill_form_with_healing。仅适用于行之间互不影响、逐行保存的表格；
+        锚点模式下各 tab 按锚点值各自定位网页行。
+        
+        注意: 目前界面流程尚未调用此方法，需由调用方自行准备多个 tab。
+        
+        Args:
+            tabs: DrissionPage tab 对象列表（互不相同）
+            excel_data: pandas DataFrame
+            fingerprint_mappings: dict {excel_col: ElementFingerprint对象}
+            fill_mode: 仅支持 'batch_table'；单据模式退化为单 tab 填充
+            key_column: 锚点列名
+            progress_callback: 进度回调；工作线程的进度经队列汇总、统一节流后
+                只在调用线程中执行（可直接传入 Tk 界面回调，但调用线程须为界面线程）
+            
+        Returns:
+            dict: 合并后的填写结果统计（结构同 fill_form_with_healing）
+        """
+        import queue
+        from concurrent.futures import ThreadPoolExecutor, wait
+        
+        # 去重：同一 tab 不能被两个线程同时驱动
+        unique_tabs = list({id(tab): tab for tab in tabs}.values())
+        if not unique_tabs:
+            raise ValueError("至少需要一个 tab")
+        total_rows = len(excel_data)
+        workers = min(len(unique_tabs), total_rows)
+        
+        if fill_mode != 'batch_table' or workers <= 1:
+            return SmartFormFiller.fill_form_with_healing(
+                unique_tabs[0], excel_data, fingerprint_mappings,
+                fill_mode=fill_mode, key_column=key_column, progress_callback=progress_callback
+            )
+        
+        # 按行位置切分为连续区间（行号保持原值，便于错误定位）
+        labels = list(excel_data.index)
+        chunk = -(-total_rows // workers)
+        ranges = []
+        for i in range(workers):
+            lo = i * chunk
+            if lo >= total_rows:
+                break
+            hi = min(lo + chunk, total_rows)
+            ranges.append((labels[lo], labels[hi] if hi < total_rows else None))
+        
+        print(f"\n=== ⚡ 并发填表: {len(ranges)} 个 tab，共 {total_rows} 行 ===")
+        
+        # 工作线程只把进度放入队列，由调用线程按同一个节流器转发：
+        # 界面回调（Tk）不是线程安全的，且各线程各自节流时合计频率不受限制
+        updates = queue.SimpleQueue()
+        progress = ProgressThrottle(progress_callback)
+        worker_callback = (lambda *args: updates.put(args)) if progress else None
+        
+        def drain():
+            while True:
+                try:
+                    args = updates.get_nowait()
+                except queue.Empty:
+                    return
+                progress(*args)
+        
+        def run(tab, start, end):
+            return SmartFormFiller.fill_form_with_healing(
+                tab, excel_data, fingerprint_mappings, fill_mode=fill_mode,
+                key_column=key_column, progress_callback=worker_callback,
+                start_row_idx=start, end_row_idx=end
+            )
+        
+        with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+            futures = [
+                executor.submit(run, tab, start, end)
+                for tab, (start, end) in zip(unique_tabs, ranges)
+            ]
+            pending = set(futures)
+            while pending:
+                _, pending = wait(pending, timeout=0.05)
+                drain()
+            results = [f.result() for f in futures]
+        progress.flush()
+        
+        # 续填起点取第一个未填满本段的区间：取各段最大值会跳过提前停止的段中未填的行
+        next_row_idx = labels[-1] + 1
+        for (start, end), r in zip(ranges, results):
+            if r['next_row_idx'] < (end if end is not None else labels[-1] + 1):
+                next_row_idx = r['next_row_idx']
+                break
+        
+        return {
+            'total': total_rows,
+            'success': sum(r['success'] for r in results),
+            'error': sum(r['error'] for r in results),
+            'healed': sum(r['healed'] for r in results),
+            'errors': [e for r in results for e in r['errors']],
+            'next_row_idx': next_row_idx,
+        }
+    
+    # 批量定位：按 XPath 列表在页内一次取回元素（未找到为 null）
+    # 只返回命中标记：返回节点数组时 DrissionPage 需 getProperties + 逐个 describeNode（N+1 次往返）
+    _LOCATE_BATCH_JS = """
+    const xpaths = arguments[0].xpaths;
+    return {hits: xpaths.map(xp => {
+        try {
+            return !!document.evaluate(xp, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        } catch (e) {
+            return false;
+        }
+    })};
+    """
+    
+    @staticmethod
+    def _locate_batch(tab, xpaths):
+        """
+        批量定位元素
+        
+        一次 run_js 判断全部 XPath 是否存在，只对命中的 XPath 调用 tab.ele() 取元素，
+        未命中的字段不再逐个查找并等满超时。
+        
+        Args:
+            tab: DrissionPage tab 对象
+            xpaths: XPath 列表
+            
+        Returns:
+            list | None: 与 xpaths 等长的元素列表（未找到为 None）；批量定位失败返回 None
+        """
+        if not xpaths:
+            return []
+        try:
+            result = tab.run_js(SmartFormFiller._LOCATE_BATCH_JS, {'xpaths': list(xpaths)})
+        except Exception:
+            return None
+        hits = result.get('hits') if isinstance(result, dict) else None
+        if not isinstance(hits, list) or len(hits) != len(xpaths):
+            return None
+        return [tab.ele(f'xpath:{xp}', timeout=0) if hit else None for xp, hit in zip(xpaths, hits)]
+    
+    # 页内 XPath 编译缓存：createExpression 结果按表达式 LRU 复用（上限 500 条），
+    # 重试/自愈同一字段时不再重复解析；随填充函数一起注入
+    _XPATH_CACHE_JS = """
+    if (!window.__weaverXp) {
+        const cache = new Map();
+        window.__weaverXp = function(xp) {
+            let expr = cache.get(xp);
+            if (expr) {
+                cache.delete(xp);
+            } else {
+                expr = document.createExpression(xp, null);
+                if (cache.size >= 500) cache.delete(cache.keys().next().value);
+            }
+            cache.set(xp, expr);
+            return expr.evaluate(document, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        };
+    }
+    """
+    
+    # 整行批量填充：原生 setter 赋值后派发单个 InputEvent 及 change/blur（Vue/React 可感知，
+    # 与 __weaverFillEl 相同，不再先清空再派发两次 input）
+    # 仅处理文本类 input/textarea；其余控件（select/checkbox/只读/禁用）返回 false 由 Python 侧逐个回退
+    _FILL_ROW_JS = """
+    const ops = arguments[0].ops;
+    const ok = [];
+    const SKIP = { checkbox: 1, radio: 1, file: 1, button: 1, submit: 1, reset: 1, image: 1, hidden: 1 };
+    const setters = {
+        INPUT: Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set,
+        TEXTAREA: Object.getOwnPropertyDescriptor(HTMLTextAreaElement.prototype, 'value').set
+    };
+    for (const op of ops) {
+        let el = null;
+        try {
+            el = window.__weaverXp(op.xpath);
+        } catch (e) {}
+        const setter = el && setters[el.tagName];
+        if (!setter || el.readOnly || el.disabled || (el.tagName === 'INPUT' && SKIP[(el.type || '').toLowerCase()])) {
+            ok.push(false);
+            continue;
+        }
+        if (el.value === op.value) {
+            ok.push(true);  // 已是目标值，不再派发事件
+            continue;
+        }
+        try {
+            el.focus();
+            setter.call(el, op.value);
+            el.dispatchEvent(new InputEvent('input', { bubbles: true, inputType: 'insertFromPaste', data: op.value }));
+            el.dispatchEvent(new Event('change', { bubbles: true }));
+            el.dispatchEvent(new FocusEvent('blur'));
+            el.dispatchEvent(new FocusEvent('focusout', { bubbles: true }));
+            ok.push(true);
+        } catch (e) {
+            ok.push(false);
+        }
+    }
+    return { ok: ok };
+    """
+    _FILL_ROW_INSTALL_JS = _XPATH_CACHE_JS + "window.__weaverFillRow = function() {\n" + _FILL_ROW_JS + "\n};"
+    _FILL_ROW_CALL_JS = "return window.__weaverFillRow ? window.__weaverFillRow(arguments[0]) : '__weaver_missing__';"
+    
+    @staticmethod
+    def _fill_row_batch(tab, ops):
+        """
+        一次 run_js 填充整行字段
+        
+        页内函数按页面注入一次，之后只发送调用桩（与加载检测相同的注入方式）。
+        
+        Args:
+            tab: DrissionPage tab 对象
+            ops: [{'xpath': str, 'value': str}, ...]
+            
+        Returns:
+            list | None: 与 ops 等长的布尔列表；批量填充失败返回 None
+        """
+        if not ops:
+            return []
+        payload = {'ops': ops}
+        try:
+            result = tab.run_js(SmartFormFiller._FILL_ROW_CALL_JS, payload)
+            if result == SmartFormFiller._MISSING:
+                tab.run_js(SmartFormFiller._FILL_ROW_INSTALL_JS)
+                result = tab.run_js(SmartFormFiller._FILL_ROW_CALL_JS, payload)
+        except Exception:
+            return None
+        ok = result.get('ok') if isinstance(result, dict) else None
+        if not isinstance(ok, list) or len(ok) != len(ops):
+            return None
+        return ok
+    
+    @staticmethod
+    def _flatten_fingerprint(fingerprint):
+        """
+        将指纹的定位信息展开为普通字典（每个映射只解析一次）
+        
+        xpath_by_row: 下标为网页行号的 XPath 元组，
+        0 → 主元素，N → related_inputs[N-1]；超出长度的行没有对应输入框。
+        
+        Returns:
+            dict: {'xpath_by_row', 'has_related', 'css', 'frame_path'}
+        """
+        selectors = getattr(fingerprint, 'selectors', None) or {}
+        raw_data = getattr(fingerprint, 'raw_data', None) or {}
+        
+        # 获取 XPath（优先 selectors，回退 raw_data）
+        main_xpath = selectors.get('xpath') or raw_data.get('xpath')
+        
+        # 获取 related_inputs（批量输入列表）
+        related = getattr(fingerprint, 'related_inputs', None)
+        if related is None:
+            related = raw_data.get('related_inputs', [])
+        
+        xpath_by_row = [main_xpath]
+        for inp in related or ():
+            if isinstance(inp, dict):
+                xpath_by_row.append(inp.get('xpath', ''))
+            elif hasattr(inp, 'xpath'):
+                xpath_by_row.append(inp.xpath)
+            else:
+                xpath_by_row.append(str(inp) if inp else None)
+        
+        frame_info = getattr(fingerprint, 'frame_info', None) or {}
+        
+        return {
+            'xpath_by_row': tuple(xpath_by_row),
+            'has_related': len(xpath_by_row) > 1,
+            'css': selectors.get('css'),
+            'frame_path': frame_info.get('frame_path', '') or raw_data.get('frame_path', ''),
+        }
+    
+    @staticmethod
+    def _resolve_target_xpath(resolved, target_row_idx):
+        """
+        计算映射在目标网页行上的 XPath
+        
+        有 related_inputs（批量输入列表）时：行 0 → 主元素，行 N → related_inputs[N-1]；
+        否则只有行 0 有对应输入框。
+        
+        Args:
+            resolved: _flatten_fingerprint 的结果
+            target_row_idx: 目标网页行
+            
+        Returns:
+            str | None: 目标 XPath，无对应输入框时返回 None
+        """
+        xpath_by_row = resolved['xpath_by_row']
+        if target_row_idx < len(xpath_by_row):
+            return xpath_by_row[target_row_idx]
+        
+        # 批量模式超出范围时提示；非批量模式后续行无对应输入框不是错误
+        if resolved['has_related']:
+            logger.debug("  ⚠️ 索引 %d 超出可用输入框范围 (共 %d 个)", target_row_idx, len(xpath_by_row))
+        return None
+    
+    @staticmethod
+    def _fill_targets(target, targets):
+        """
+        在同一文档（tab 或 iframe）内填充一组字段
+        
+        1. 一次 run_js 填充全部文本类字段
+        2. 剩余字段一次 run_js 批量定位（失败时回退逐个查找）
+        3. 逐字段 clear/input，定位不到时尝试 CSS 选择器
+        
+        Args:
+            target: DrissionPage tab 或 ChromiumFrame 对象
+            targets: [(excel_col, resolved, value, target_xpath), ...]
+            
+        Returns:
+            int: 成功填充的字段数
+        """
+        filled_fields = 0
+        
+        filled = SmartFormFiller._fill_row_batch(
+            target, [{'xpath': t[3], 'value': t[2]} for t in targets]
+        )
+        if filled is not None:
+            batch_filled = sum(1 for ok in filled if ok)
+            if batch_filled:
+                logger.debug("  ⚡ 批量填充 %d 个字段", batch_filled)
+            filled_fields += batch_filled
+            targets = [t for t, ok in zip(targets, filled) if not ok]
+        
+        located = SmartFormFiller._locate_batch(target, [t[3] for t in targets])
+        
+        for pos, (excel_col, resolved, value, target_xpath) in enumerate(targets):
+            try:
+                logger.debug("  填充字段 '%s' -> '%.20s...' (XPath: %.50s...)", excel_col, value, target_xpath)
+                
+                if located is not None:
+                    ele = located[pos]
+                else:
+                    ele = target.ele(f'xpath:{target_xpath}', timeout=0.2)
+                if ele:
+                    ele.clear()
+                    ele.input(value)
+                    filled_fields += 1
+                    continue
+                
+                # 尝试 CSS 选择器
+                css_selector = resolved['css']
+                if css_selector:
+                    ele = target.ele(css_selector, timeout=0.1)
+                    if ele:
+                        ele.clear()
+                        ele.input(value)
+                        filled_fields += 1
+            except Exception as e:
+                print(f"  ⚠️ 字段 [{excel_col}] 填充失败: {e}")
+        
+        return filled_fields
+    
+    @staticmethod
+    def _frame_target(tab, frame_path, frames=None):
+        """
+        取得 frame_path 对应的填充目标
+        
+        DrissionPage 4 的 ChromiumFrame 可直接 run_js / ele，无需切换上下文；
+        传入 frames 字典时同一次填充内按 frame_path 复用 frame 对象。
+        
+        Args:
+            tab: DrissionPage tab 对象
+            frame_path: 扫描时记录的路径，如 "iframe[0]" 或 "iframe[0]iframe[1]->"
+            frames: 可选的 {frame_path: target} 缓存
+            
+        Returns:
+            ChromiumFrame 或 tab（无 frame_path 或获取失败时）
+        """
+        if not frame_path:
+            return tab
+        if frames is not None and frame_path in frames:
+            return frames[frame_path]
+        
+        target = tab
+        try:
+            for match in _IFRAME_INDEX_RE.finditer(frame_path):
+                # 扫描记录的索引从 0 开始，DrissionPage 序号从 1 开始
+                frame = target.get_frame(int(match.group(1)) + 1)
+                if not frame:
+                    raise LookupError(frame_path)
+                target = frame
+        except Exception as e:
+            print(f"   ⚠️ 获取 iframe 失败: {e}")
+            target = tab
+        
+        if frames is not None:
+            frames[frame_path] = target
+        return target
+    
     @staticmethod
     def execute_queue(tab, fill_queue, fingerprint_mappings, fill_mode='single_form', 
                       progress_callback=None) -> dict:
@@ -475,6 +1190,8 @@ class SmartFormFiller:
         """
         from app.core.fill_queue import FillQueue
         
+        progress_callback = ProgressThrottle(progress_callback)
+        
         # 快速加载检测
         SmartFormFiller._wait_for_loading_complete(tab, timeout=1)
         
@@ -493,6 +1210,15 @@ class SmartFormFiller:
         success_count = 0
         error_count = 0
         
+        # 每个映射的定位信息只解析一次，行循环中直接查表
+        frame_targets = {}
+        resolved_mappings = {}
+        for excel_col, fingerprint in fingerprint_mappings.items():
+            try:
+                resolved_mappings[excel_col] = SmartFormFiller._flatten_fingerprint(fingerprint)
+            except Exception as e:
+                print(f"  ⚠️ 字段 [{excel_col}] 指纹解析失败: {e}")
+        
         for task_idx, task in enumerate(tasks):
             if task.status != 'pending':
                 continue
@@ -505,9 +1231,9 @@ class SmartFormFiller:
             target_row_idx = task.web_row_idx
             
             if task.anchor_value:
-                print(f"\n--- 填写第 {row_num} 行 (锚点定位到网页行 {target_row_idx + 1}) ---")
+                logger.debug("--- 填写第 %d 行 (锚点定位到网页行 %d) ---", row_num, target_row_idx + 1)
             else:
-                print(f"\n--- 填写第 {row_num} 行 (对应网页第 {target_row_idx + 1} 个输入框) ---")
+                logger.debug("--- 填写第 %d 行 (对应网页第 %d 个输入框) ---", row_num, target_row_idx + 1)
             
             try:
                 if progress_callback:
@@ -516,92 +1242,35 @@ class SmartFormFiller:
                 
                 filled_fields = 0
                 
-                for excel_col, fingerprint in fingerprint_mappings.items():
+                # 1. 计算本行各字段的目标 XPath
+                targets = []  # [(excel_col, resolved, value, target_xpath)]
+                for excel_col, resolved in resolved_mappings.items():
                     if excel_col not in task.row_data:
-                        print(f"  [DEBUG] 列 '{excel_col}' 不在 row_data 中")
+                        logger.debug("  列 '%s' 不在 row_data 中", excel_col)
                         continue
                     
                     value = str(task.row_data.get(excel_col, ''))
                     if not value.strip():
                         continue
                     
-                    try:
-                        # 获取 XPath（优先 selectors，回退 raw_data）
-                        main_xpath = None
-                        if hasattr(fingerprint, 'selectors') and fingerprint.selectors:
-                            main_xpath = fingerprint.selectors.get('xpath')
-                        if not main_xpath and hasattr(fingerprint, 'raw_data'):
-                            main_xpath = fingerprint.raw_data.get('xpath')
-                        
-                        # 获取 related_inputs（批量输入列表）
-                        related = None
-                        if hasattr(fingerprint, 'related_inputs'):
-                            related = fingerprint.related_inputs
-                        elif hasattr(fingerprint, 'raw_data'):
-                            related = fingerprint.raw_data.get('related_inputs', [])
-                        
-                        # 计算目标 XPath
-                        if related and len(related) > 0:
-                            # 批量模式：有 related_inputs
-                            # Excel 行 0 → 主元素
-                            # Excel 行 1 → related_inputs[0]
-                            # Excel 行 N → related_inputs[N-1]
-                            if target_row_idx == 0:
-                                target_xpath = main_xpath
-                            elif target_row_idx - 1 < len(related):
-                                inp = related[target_row_idx - 1]
-                                if isinstance(inp, dict):
-                                    target_xpath = inp.get('xpath', '')
-                                elif hasattr(inp, 'xpath'):
-                                    target_xpath = inp.xpath
-                                else:
-                                    target_xpath = str(inp) if inp else None
-                            else:
-                                # 超出范围，跳过
-                                print(f"  ⚠️ 索引 {target_row_idx} 超出可用输入框范围 (共 {1 + len(related)} 个)")
-                                target_xpath = None
-                        else:
-                            # 非批量模式：只有一个输入框，只能填第一行
-                            if target_row_idx == 0:
-                                target_xpath = main_xpath
-                            else:
-                                # 非批量模式下，后续行无法填充到此字段
-                                # 这不是错误，只是该字段在这一行没有对应的输入框
-                                target_xpath = None
-                        
-                        if not target_xpath:
-                            print(f"  [DEBUG] 字段 '{excel_col}' 无有效 XPath")
-                            continue
-                        
-                        print(f"  填充字段 '{excel_col}' -> '{value[:20]}...' (XPath: {target_xpath[:50]}...)")
-                        
-                        # 尝试填充
-                        success = False
-                        ele = tab.ele(f'xpath:{target_xpath}', timeout=0.2)
-                        if ele:
-                            ele.clear()
-                            ele.input(value)
-                            success = True
-                            filled_fields += 1
-                        
-                        if not success:
-                            # 尝试 CSS 选择器
-                            css_selector = None
-                            if hasattr(fingerprint, 'selectors') and fingerprint.selectors:
-                                css_selector = fingerprint.selectors.get('css')
-                            if css_selector:
-                                ele = tab.ele(css_selector, timeout=0.1)
-                                if ele:
-                                    ele.clear()
-                                    ele.input(value)
-                                    filled_fields += 1
-                    except Exception as e:
-                        print(f"  ⚠️ 字段 [{excel_col}] 填充失败: {e}")
+                    target_xpath = SmartFormFiller._resolve_target_xpath(resolved, target_row_idx)
+                    if not target_xpath:
+                        logger.debug("  字段 '%s' 无有效 XPath", excel_col)
+                        continue
+                    targets.append((excel_col, resolved, value, target_xpath))
+                
+                # 2. 按所在 iframe 分组，每组在同一 frame 对象上批量填充（不切换上下文）
+                groups = {}
+                for t in targets:
+                    groups.setdefault(t[1]['frame_path'], []).append(t)
+                for frame_path, group in groups.items():
+                    target = SmartFormFiller._frame_target(tab, frame_path, frame_targets)
+                    filled_fields += SmartFormFiller._fill_targets(target, group)
                 
                 if filled_fields > 0:
                     task.mark_success()
                     success_count += 1
-                    print(f"  ✅ 第{row_num}行完成，填充 {filled_fields} 个字段")
+                    logger.debug("  ✅ 第%d行完成，填充 %d 个字段", row_num, filled_fields)
                 else:
                     task.mark_error("未能填充任何字段")
                     error_count += 1
@@ -611,6 +1280,8 @@ class SmartFormFiller:
                 error_count += 1
                 print(f"  ❌ 第{row_num}行失败: {e}")
         
+        progress_callback.flush()
+        
         # 更新队列指针
         fill_queue.advance(len(tasks))
         
@@ -626,7 +1297,7 @@ class SmartFormFiller:
         return result
     
     @staticmethod
-    def _fill_with_fallback(tab, fingerprint, value):
+    def _fill_with_fallback(tab, fingerprint, value, frames=None, skip_js=False):
         """
         使用备用选择器填充（优先级顺序）+ 完整事件模拟
         
@@ -634,73 +1305,414 @@ class SmartFormFiller:
             tab: tab对象
             fingerprint: 元素指纹
             value: 要填充的值
+            frames: 可选的 {frame_path: frame} 缓存，连续填充同一 iframe 时复用
+            skip_js: 已经批量尝试过 JS 事件填充时跳过，直接走原生方法
             
         Returns:
             bool: 是否成功
         """
-        # ===== 新增: Iframe 上下文切换（政府级 Vue 站点专用）=====
-        in_iframe = False
+        # ===== Iframe 上下文（政府级 Vue 站点专用）=====
         frame_path = getattr(fingerprint, 'frame_info', {}).get('frame_path', '')
+        target = SmartFormFiller._frame_target(tab, frame_path, frames)
         
-        if frame_path:
-            try:
-                # 从 frame_path（如 "iframe[0]"）提取索引
-                import re
-                match = re.search(r'iframe\[(\d+)\]', frame_path)
-                if match:
-                    frame_index = int(match.group(1))
-                    tab.to_frame(frame_index)
-                    in_iframe = True
-            except Exception as e:
-                print(f"   ⚠️ 切换到 iframe 失败: {e}")
+        # 获取元素信息
+        elem_id = fingerprint.raw_data.get('id', '')
+        xpath = fingerprint.selectors.get('xpath', '')
+        css_selector = fingerprint.selectors.get('css', '')
+        fallbacks = fingerprint.get_fallback_selectors()
         
-        try:
-            # 获取元素信息
-            elem_id = fingerprint.raw_data.get('id', '')
-            xpath = fingerprint.selectors.get('xpath', '')
-            css_selector = fingerprint.selectors.get('css', '')
-            elem_type = fingerprint.features.get('type', 'text')
-            tag_name = fingerprint.features.get('tag', 'input')
-            
-            # 优先使用 JS 事件模拟（更可靠）
-            js_result = SmartFormFiller._fill_with_js_events(
-                tab, elem_id, xpath, css_selector, str(value), elem_type, tag_name
-            )
-        
-            if js_result:
+        # 优先使用 JS 事件模拟（更可靠）；备选选择器一并交给页内尝试
+        if not skip_js:
+            job = SmartFormFiller._selector_job(elem_id, xpath, css_selector, str(value))
+            job['fallbacks'] = [[t, sel] for t, sel in fallbacks]
+            js_result = SmartFormFiller._run_fill_one(target, job)
+            
+            if js_result and js_result.get('success'):
                 return True
+            if js_result and js_result.get('error') == 'element_not_found':
+                return False  # 所有选择器都已在页内确认失效，无需再探测
             
             # JS 失败时回退到原生方法
-            print(f"  ⚠️ JS填充失败，尝试原生方法...")
-            
-            # 按优先级尝试所有选择器
-            for selector_type, selector in fingerprint.get_fallback_selectors():
-                try:
-                    if selector_type == 'id':
-                        elem = tab.ele(selector, timeout=0.2)
-                    elif selector_type == 'xpath':
-                        elem = tab.ele(f'xpath:{selector}', timeout=0.2)
-                    elif selector_type == 'css':
-                        elem = tab.ele(f'css:{selector}', timeout=0.2)
-                    else:
-                        elem = tab.ele(selector, timeout=0.2)
-                    
-                    if elem:
-                        elem.clear()
-                        elem.input(value)
-                        return True
-                except:
-                    continue
-            
-            return False
+            logger.debug("  ⚠️ JS填充失败，尝试原生方法...")
+        
+        # 一次 run_js 探测哪个备选选择器能命中，只对命中的调用 tab.ele
+        # （逐个尝试时每个失效选择器都要等满超时）
+        first_hit = SmartFormFiller._probe_selectors(target, fallbacks)
+        if first_hit is not None:
+            if first_hit < 0:
+                return False
+            fallbacks = fallbacks[first_hit:]
+        
+        # 按优先级尝试选择器
+        for selector_type, selector in fallbacks:
+            try:
+                if selector_type == 'id':
+                    elem = target.ele(selector, timeout=0.2)
+                elif selector_type == 'xpath':
+                    elem = target.ele(f'xpath:{selector}', timeout=0.2)
+                elif selector_type == 'css':
+                    elem = target.ele(f'css:{selector}', timeout=0.2)
+                else:
+                    elem = target.ele(selector, timeout=0.2)
+                
+                if elem:
+                    elem.clear()
+                    elem.input(value)
+                    return True
+            except:
+                continue
+        
+        return False
+    
+    # 备选选择器探测：返回第一个能命中元素的下标，全部失效返回 -1
+    _PROBE_SELECTORS_JS = """
+    const list = arguments[0].selectors;
+    for (let i = 0; i < list.length; i++) {
+        const type = list[i][0], sel = list[i][1];
+        try {
+            let el = null;
+            if (type === 'id') {
+                el = document.getElementById(sel.replace(/^#/, ''));
+            } else if (type === 'xpath') {
+                el = document.evaluate(sel, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+            } else if (type === 'css') {
+                el = document.querySelector(sel);
+            } else {
+                return i;  // 其他定位语法交给 DrissionPage 处理
+            }
+            if (el) return i;
+        } catch (e) {}
+    }
+    return -1;
+    """
+    
+    @staticmethod
+    def _probe_selectors(target, fallbacks):
+        """
+        单次 run_js 探测备选选择器
+        
+        Args:
+            target: DrissionPage tab 或 ChromiumFrame 对象
+            fallbacks: [(selector_type, selector_string), ...]
             
-        finally:
-            # ===== 确保切回主框架 =====
-            if in_iframe:
-                try:
-                    tab.to_main()
-                except:
-                    pass
+        Returns:
+            int | None: 第一个命中的下标，全部失效为 -1；探测失败返回 None
+        """
+        if not fallbacks:
+            return -1
+        try:
+            result = target.run_js(
+                SmartFormFiller._PROBE_SELECTORS_JS,
+                {'selectors': [[t, s] for t, s in fallbacks]}
+            )
+        except Exception:
+            return None
+        return result if isinstance(result, int) and not isinstance(result, bool) else None
+    
+    # 完整用户行为填充（已定位元素）: Focus -> Set Value -> Input -> Change -> Blur
+    _FILL_EL_JS = """
+    const el = arguments[0];
+    const value = arguments[1];
+    
+    // 结果只带成功标志；仅在需要核对时 (arguments[3]) 回传 el.value，避免长文本经 CDP 回传
+    const verify = arguments[3];
+    const done = unchanged => {
+        const r = { success: true };
+        if (unchanged) r.unchanged = true;
+        if (verify) r.value = el.value;
+        return r;
+    };
+    
+    try {
+        const tagName = el.tagName.toLowerCase();
+        const inputType = (el.type || 'text').toLowerCase();
+        const isCheck = inputType === 'checkbox' || inputType === 'radio';
+        
+        // 目标状态先算好：已是目标值时跳过整条事件链（避免触发框架监听/校验）
+        let option = null;
+        let shouldCheck = false;
+        if (tagName === 'select') {
+            // 下拉框：选项索引缓存在元素上（选项数变化时重建），先按值/文本精确查找，再模糊匹配
+            let idx = el.__weaverOptIdx;
+            if (!idx || idx.count !== el.options.length) {
+                idx = { count: el.options.length, byVal: new Map(), byText: new Map() };
+                for (const opt of el.options) {
+                    if (!idx.byVal.has(opt.value)) idx.byVal.set(opt.value, opt);
+                    if (!idx.byText.has(opt.text)) idx.byText.set(opt.text, opt);
+                }
+                el.__weaverOptIdx = idx;
+            }
+            option = idx.byVal.get(value) || idx.byText.get(value) || null;
+            if (!option) {
+                for (const opt of el.options) {
+                    if (opt.text.includes(value) || value.includes(opt.text)) {
+                        option = opt;
+                        break;
+                    }
+                }
+            }
+            if (option && el.value === option.value) {
+                return done(true);
+            }
+        } else if (isCheck) {
+            shouldCheck = value.toLowerCase() === 'true' || value === '1' || value === '是';
+            if (el.checked === shouldCheck) {
+                return done(true);
+            }
+        } else if (el.value === value) {
+            return done(true);
+        }
+        
+        // ===== 0. 预处理 (Element UI / AntD 兼容) =====
+        // 移除 readonly 属性以便强行赋值 (针对 Vue/React 的模拟输入框)
+        // 很多 UI 库的 Select 其实是 readonly 的 input，需要移除才能触发 input 事件
+        if (el.hasAttribute('readonly')) {
+            el.removeAttribute('readonly');
+        }
+        // 暂时不移除 disabled，因为 disabled 通常表示业务逻辑上不可填
+        
+        // 隐藏域不可聚焦，只派发 input/change（省去焦点样式重算与自动滚动）
+        const minimal = inputType === 'hidden';
+        
+        // ===== 1. Focus 阶段 =====
+        if (!minimal) {
+            el.focus();
+            el.dispatchEvent(new FocusEvent('focusin', { bubbles: true, cancelable: true }));
+            el.dispatchEvent(new FocusEvent('focus', { bubbles: false, cancelable: true }));
+        }
+        
+        // ===== 2. 清空并设置值 =====
+        if (tagName === 'select') {
+            if (option) el.value = option.value;
+        } else if (isCheck) {
+            // 复选框/单选框
+            el.click(); // 优先尝试点击，触发完整事件链
+            if (el.checked !== shouldCheck) {
+                el.checked = shouldCheck; // 回退到直接赋值
+            }
+        } else {
+            // 文本输入框 / textarea / el-input
+            // 原生 setter 赋值：绕过 React 受控组件对 value 属性的拦截，单个 input 事件即可被感知
+            const setter = window.__weaverNativeSetters[el.tagName];
+            if (setter) {
+                setter.call(el, value);
+            } else {
+                el.value = value;
+            }
+        }
+        
+        // ===== 3. 触发 Input 事件 (Vue/React 监听，只派发一次) =====
+        let inputEvent;
+        try {
+            inputEvent = new InputEvent('input', {
+                bubbles: true,
+                cancelable: true,
+                data: value,
+                inputType: 'insertFromPaste'
+            });
+        } catch(e) {
+            // 旧浏览器兼容
+            inputEvent = new Event('input', { bubbles: true, cancelable: true });
+        }
+        el.dispatchEvent(inputEvent);
+        
+        // ===== 4. 触发 Change 事件 (验证/级联) =====
+        // 批量合并模式下只登记元素，由调用方在所有字段赋值后统一派发
+        const deferred = arguments[2];
+        if (deferred) {
+            deferred.push(el);
+        } else {
+            el.dispatchEvent(new Event('change', { bubbles: true, cancelable: true }));
+        }
+        
+        // ===== 5. Blur 阶段 (触发校验) =====
+        if (!minimal) {
+            el.dispatchEvent(new FocusEvent('blur', { bubbles: false, cancelable: true }));
+            el.dispatchEvent(new FocusEvent('focusout', { bubbles: true, cancelable: true }));
+            el.blur();
+        }
+        
+        return done(false);
+        
+    } catch (e) {
+        return { success: false, error: String(e && e.message || e).slice(0, 200) };
+    }
+    """
+    
+    # 按选择器定位后填充（单个元素），参数通过 arguments[0] 传入，无需拼接转义
+    _FILL_ONE_JS = """
+    const a = arguments[0];
+    const value = a.value;
+    
+    // 已解析元素缓存：重试/复核同一字段时跳过重新查询（节点脱离文档即失效）
+    const cache = window.__weaverElCache;
+    const key = [a.id, a.css, a.xpath].join('|');
+    let el = cache ? cache.get(key) : null;
+    if (el && !el.isConnected) el = null;
+    
+    // 多选择器定位元素：上次命中的选择器 (a.prefer) 优先，其余按 id -> css -> xpath
+    const lookups = {
+        id: () => a.id ? document.getElementById(a.id) : null,
+        css: () => a.css ? document.querySelector(a.css) : null,
+        xpath: () => a.xpath ? window.__weaverXp(a.xpath) : null
+    };
+    let by = el ? 'cache' : '';
+    for (const kind of [a.prefer, 'id', 'css', 'xpath']) {
+        if (el) break;
+        if (!lookups[kind]) continue;
+        try { el = lookups[kind](); } catch(e) {}
+        if (el) by = kind;
+    }
+    
+    // 备选选择器 (get_fallback_selectors) 也在页内依次尝试；全部失效时 Python 侧无需再探测
+    let untried = false;
+    for (const f of (el ? [] : a.fallbacks || [])) {
+        const type = f[0], sel = f[1];
+        try {
+            if (type === 'id') el = document.getElementById(sel.replace(/^#/, ''));
+            else if (type === 'xpath') el = window.__weaverXp(sel);
+            else if (type === 'css') el = document.querySelector(sel);
+            else untried = true;  // 其他定位语法只能由 DrissionPage 处理
+        } catch(e) {}
+        if (el) {
+            by = 'fallback';
+            break;
+        }
+    }
+    
+    if (!el) {
+        return { success: false, error: untried ? 'element_not_found_in_page' : 'element_not_found' };
+    }
+    if (cache) cache.set(key, el);
+    
+    const result = window.__weaverFillEl(el, value, arguments[1], a.verify);
+    result.by = by;
+    return result;
+    """
+    
+    # 自愈定位脚本：锚点文本作为 arguments[0] 传入，无需拼接转义；返回元素或 null
+    _HEAL_BY_LABEL_JS = """
+    // textContent 不触发布局（innerText 会），for...of 命中即停，不生成数组
+    const text = arguments[0];
+    for (const label of document.querySelectorAll('label')) {
+        if (!label.textContent.includes(text)) continue;
+        
+        // 查找关联的input
+        const forId = label.getAttribute('for');
+        if (forId) {
+            const byFor = document.getElementById(forId);
+            if (byFor) return byFor;
+        }
+        
+        // 查找label内的input
+        return label.querySelector('input, select, textarea');
+    }
+    return null;
+    """
+    
+    # 附近文本 → 元素索引：一次遍历建立 Map<规范化文本, 父元素[]>，缓存在 window 上；
+    # DOM 变化时只标记失效，下次自愈时再重建，连续自愈多个字段不再重复遍历文本节点
+    _HEAL_BY_NEARBY_JS = r"""
+    const norm = s => s.replace(/\s+/g, ' ').trim().toLowerCase();
+    let idx = window.__weaverTextIndex;
+    if (!idx) {
+        idx = window.__weaverTextIndex = { map: null };
+        new MutationObserver(() => { idx.map = null; }).observe(document.documentElement, {
+            childList: true, subtree: true, characterData: true
+        });
+    }
+    if (!idx.map) {
+        const map = new Map();
+        const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT);
+        let node;
+        while (node = walker.nextNode()) {
+            const t = norm(node.textContent);
+            if (!t || !node.parentElement) continue;
+            const list = map.get(t);
+            if (list) list.push(node.parentElement);
+            else map.set(t, [node.parentElement]);
+        }
+        idx.map = map;
+    }
+    
+    // 先精确命中，再退回包含匹配（与原 includes 语义一致）
+    const want = norm(arguments[0]);
+    if (!want) return null;
+    let hits = idx.map.get(want);
+    if (!hits) {
+        hits = [];
+        for (const [t, parents] of idx.map) {
+            if (t.includes(want)) hits.push(...parents);
+        }
+    }
+    for (const p of hits) {
+        let input = p.querySelector('input, select, textarea');
+        if (!input && p.nextElementSibling) {
+            input = p.nextElementSibling.querySelector('input, select, textarea');
+        }
+        if (input) return input;
+    }
+    return null;
+    """
+    
+    # 自愈并填充：依次按 label、附近文本定位，找到后在页内直接完成填充，不再回到 Python
+    _HEAL_JS = """
+    const a = arguments[0];
+    // 由便宜到昂贵：原 id/css 直接查询 → label 扫描 → 附近文本索引
+    const bySelector = () => {
+        let el = a.id ? document.getElementById(a.id) : null;
+        if (!el && a.css) el = document.querySelector(a.css);
+        return el;
+    };
+    const finders = [
+        ['selector', a.id || a.css, bySelector],
+        ['label', a.label, window.__weaverFindByLabel],
+        ['nearby_text', a.nearby_text, window.__weaverFindByNearby]
+    ];
+    for (const [by, text, find] of finders) {
+        if (!text) continue;
+        let el = null;
+        try { el = find(text); } catch (e) {}
+        if (el) {
+            const result = window.__weaverFillEl(el, a.value);
+            result.matchedBy = by;
+            return result;
+        }
+    }
+    return { success: false, error: 'anchor_not_found' };
+    """
+    
+    # 注入填充/自愈函数及元素缓存；DOM 结构变化（增删节点）时整体清空缓存，避免复用错位的行
+    _FILL_ONE_INSTALL_JS = _XPATH_CACHE_JS + """
+    window.__weaverElCache = new Map();
+    new MutationObserver(records => {
+        for (const r of records) {
+            if (r.addedNodes.length || r.removedNodes.length) {
+                window.__weaverElCache.clear();
+                return;
+            }
+        }
+    }).observe(document.documentElement, { childList: true, subtree: true });
+    window.__weaverNativeSetters = {
+        INPUT: Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set,
+        TEXTAREA: Object.getOwnPropertyDescriptor(HTMLTextAreaElement.prototype, 'value').set
+    };
+    window.__weaverFillEl = function() {
+    """ + _FILL_EL_JS + """
+    };
+    window.__weaverFillOne = function() {
+    """ + _FILL_ONE_JS + """
+    };
+    window.__weaverFindByLabel = function() {
+    """ + _HEAL_BY_LABEL_JS + """
+    };
+    window.__weaverFindByNearby = function() {
+    """ + _HEAL_BY_NEARBY_JS + """
+    };
+    window.__weaverHealAndFill = function() {
+    """ + _HEAL_JS + "\n};"
+    _FILL_ONE_CALL_JS = "return window.__weaverFillOne ? window.__weaverFillOne(arguments[0]) : '__weaver_missing__';"
+    _HEAL_CALL_JS = "return window.__weaverHealAndFill ? window.__weaverHealAndFill(arguments[0]) : '__weaver_missing__';"
     
     @staticmethod
     def _fill_with_js_events(tab, elem_id, xpath, css_selector, value, elem_type, tag_name):
@@ -708,6 +1720,7 @@ class SmartFormFiller:
         使用 JS 模拟完整用户行为填充元素
         
         行为链: Focus -> Clear -> Set Value -> Input Event -> Change Event -> Blur
+        填充函数按页面注入一次，之后每个字段只发送调用桩和参数。
         
         Args:
             tab: DrissionPage tab 对象
@@ -721,138 +1734,130 @@ class SmartFormFiller:
         Returns:
             bool: 是否成功
         """
-        # 转义特殊字符
-        value_escaped = value.replace('\\', '\\\\').replace("'", "\\'").replace('\n', '\\n')
-        elem_id_escaped = elem_id.replace("'", "\\'") if elem_id else ''
-        xpath_escaped = xpath.replace("'", "\\'").replace('"', '\\"') if xpath else ''
-        css_escaped = css_selector.replace("'", "\\'") if css_selector else ''
+        args = SmartFormFiller._selector_job(elem_id, xpath, css_selector, value)
+        result = SmartFormFiller._run_fill_one(tab, args)
+        return bool(result and result.get('success'))
+    
+    @staticmethod
+    def _run_fill_one(tab, job):
+        """
+        执行页内单字段填充
         
-        js_fill = f"""
-        (function() {{
-            let el = null;
+        Args:
+            tab: DrissionPage tab 或 ChromiumFrame 对象
+            job: _selector_job 构造的参数，可附带 'fallbacks': [[type, selector], ...]
             
-            // 多选择器定位元素
-            if (!el && '{elem_id_escaped}') {{
-                el = document.getElementById('{elem_id_escaped}');
-            }}
-            if (!el && '{css_escaped}') {{
-                try {{ el = document.querySelector('{css_escaped}'); }} catch(e) {{}}
-            }}
-            if (!el && '{xpath_escaped}') {{
-                try {{
-                    let result = document.evaluate("{xpath_escaped}", document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null);
-                    el = result.singleNodeValue;
-                }} catch(e) {{}}
-            }}
-            
-            if (!el) {{
-                return {{ success: false, error: 'element_not_found' }};
-            }}
-            
-            try {{
-                // ===== 0. 预处理 (Element UI / AntD 兼容) =====
-                // 移除 readonly/disabled 属性以便强行赋值 (针对 Vue/React 的模拟输入框)
-                // 很多 UI 库的 Select 其实是 readonly 的 input，需要移除才能触发 input 事件
-                if (el.hasAttribute('readonly')) {{
-                    el.removeAttribute('readonly');
-                }}
-                // 暂时不移除 disabled，因为 disabled 通常表示业务逻辑上不可填
-                
-                // ===== 1. Focus 阶段 =====
-                el.focus();
-                el.dispatchEvent(new FocusEvent('focusin', {{ bubbles: true, cancelable: true }}));
-                el.dispatchEvent(new FocusEvent('focus', {{ bubbles: false, cancelable: true }}));
-                
-                // ===== 2. 清空并设置值 =====
-                let tagName = el.tagName.toLowerCase();
-                let inputType = (el.type || 'text').toLowerCase();
-                
-                if (tagName === 'select') {{
-                    // 下拉框：尝试按值或文本匹配
-                    let matched = false;
-                    for (let opt of el.options) {{
-                        if (opt.value === '{value_escaped}' || opt.text === '{value_escaped}') {{
-                            el.value = opt.value;
-                            matched = true;
-                            break;
-                        }}
-                    }}
-                    if (!matched && el.options.length > 0) {{
-                        // 模糊匹配
-                        for (let opt of el.options) {{
-                            if (opt.text.includes('{value_escaped}') || '{value_escaped}'.includes(opt.text)) {{
-                                el.value = opt.value;
-                                matched = true;
-                                break;
-                            }}
-                        }}
-                    }}
-                }} else if (inputType === 'checkbox' || inputType === 'radio') {{
-                    // 复选框/单选框
-                    let shouldCheck = '{value_escaped}'.toLowerCase() === 'true' || 
-                                     '{value_escaped}' === '1' || 
-                                     '{value_escaped}' === '是';
-                    if (el.checked !== shouldCheck) {{
-                        el.click(); // 优先尝试点击，触发完整事件链
-                        if (el.checked !== shouldCheck) {{
-                             el.checked = shouldCheck; // 回退到直接赋值
-                        }}
-                    }}
-                }} else {{
-                    // 文本输入框 / textarea / el-input
-                    el.value = '';  // 先清空
-                    el.value = '{value_escaped}';
-                }}
-                
-                // ===== 3. 触发 Input 事件 (Vue/React 监听) =====
-                el.dispatchEvent(new Event('input', {{ bubbles: true, cancelable: true }}));
-                // 模拟真实输入事件
-                try {{
-                    let inputEvent = new InputEvent('input', {{ 
-                        bubbles: true, 
-                        cancelable: true,
-                        data: '{value_escaped}',
-                        inputType: 'insertText'
-                    }});
-                    el.dispatchEvent(inputEvent);
-                }} catch(e) {{
-                    // 旧浏览器兼容
-                }}
-                
-                // ===== 4. 触发 Change 事件 (验证/级联) =====
-                el.dispatchEvent(new Event('change', {{ bubbles: true, cancelable: true }}));
-                
-                // ===== 5. Blur 阶段 (触发校验) =====
-                el.dispatchEvent(new FocusEvent('blur', {{ bubbles: false, cancelable: true }}));
-                el.dispatchEvent(new FocusEvent('focusout', {{ bubbles: true, cancelable: true }}));
-                el.blur();
-                
-                return {{ success: true, value: el.value }};
-                
-            }} catch (e) {{
-                return {{ success: false, error: e.toString() }};
-            }}
-        }})();
+        Returns:
+            dict | None: 页内返回的结果；调用异常返回 None
         """
-        
         try:
-            result = tab.run_js(js_fill)
-            if result and isinstance(result, dict):
-                if result.get('success'):
-                    return True
-                else:
-                    print(f"    JS填充错误: {result.get('error', 'unknown')}")
-            return False
+            result = tab.run_js(SmartFormFiller._FILL_ONE_CALL_JS, job)
+            if result == SmartFormFiller._MISSING:
+                tab.run_js(SmartFormFiller._FILL_ONE_INSTALL_JS)
+                result = tab.run_js(SmartFormFiller._FILL_ONE_CALL_JS, job)
         except Exception as e:
-            print(f"    JS执行异常: {e}")
-            return False
+            logger.debug("    JS执行异常: %s", e)
+            return None
+        if not isinstance(result, dict):
+            return None
+        if result.get('success'):
+            SmartFormFiller._remember_selector(job, result.get('by'))
+        else:
+            logger.debug("    JS填充错误: %s", result.get('error', 'unknown'))
+        return result
+    
+    # 多字段批量调用同一填充函数，结果包一层对象返回（避免逐项取值）；
+    # coalesce 时所有字段先赋值，change 事件最后统一派发，框架级联更新合并为一轮
+    _FILL_MANY_CALL_JS = """
+    if (!window.__weaverFillOne) return '__weaver_missing__';
+    const p = arguments[0];
+    const deferred = p.coalesce ? [] : null;
+    // 成功时返回命中的选择器类型（字符串），失败返回 false
+    const results = p.jobs.map(j => {
+        const r = window.__weaverFillOne(j, deferred);
+        return r.success === true ? (r.by || true) : false;
+    });
+    if (deferred) {
+        for (const el of deferred) {
+            el.dispatchEvent(new Event('change', { bubbles: true, cancelable: true }));
+        }
+    }
+    return { results: results };
+    """
+    
+    @staticmethod
+    def _fill_many_with_js_events(tab, jobs, coalesce_events=False):
+        """
+        单次 run_js 用 JS 事件模拟填充多个字段
+        
+        Args:
+            tab: DrissionPage tab 或 ChromiumFrame 对象
+            jobs: [{'id', 'xpath', 'css', 'value'}, ...]
+            coalesce_events: 所有字段赋值后再统一派发 change 事件；
+                仅适用于字段之间没有级联逻辑（如省市联动）的表单
+            
+        Returns:
+            list | None: 与 jobs 等长的布尔列表；批量调用失败返回 None
+        """
+        if not jobs:
+            return []
+        payload = {'jobs': jobs, 'coalesce': bool(coalesce_events)}
+        try:
+            result = tab.run_js(SmartFormFiller._FILL_MANY_CALL_JS, payload)
+            if result == SmartFormFiller._MISSING:
+                tab.run_js(SmartFormFiller._FILL_ONE_INSTALL_JS)
+                result = tab.run_js(SmartFormFiller._FILL_MANY_CALL_JS, payload)
+        except Exception:
+            return None
+        results = result.get('results') if isinstance(result, dict) else None
+        if not isinstance(results, list) or len(results) != len(jobs):
+            return None
+        for job, ok in zip(jobs, results):
+            SmartFormFiller._remember_selector(job, ok)
+        return [bool(ok) for ok in results]
+    
+    @staticmethod
+    def _selector_job(elem_id, xpath, css_selector, value):
+        """
+        构造页内填充参数，附带上次命中的选择器类型 (prefer)
+        
+        Returns:
+            dict: {'id', 'xpath', 'css', 'value', 'prefer'}
+        """
+        job = {
+            'id': elem_id or '',
+            'xpath': xpath or '',
+            'css': css_selector or '',
+            'value': value,
+        }
+        key = (job['id'], job['css'], job['xpath'])
+        with _SELECTOR_HITS_LOCK:
+            prefer = _SELECTOR_HITS.get(key)
+            if prefer:
+                _SELECTOR_HITS.move_to_end(key)
+        job['prefer'] = prefer or ''
+        return job
+    
+    @staticmethod
+    def _remember_selector(job, by):
+        """记录实际命中的选择器类型；元素缓存命中 ('cache') 或失败时不记录"""
+        if by not in ('id', 'css', 'xpath'):
+            return
+        key = (job['id'], job['css'], job['xpath'])
+        with _SELECTOR_HITS_LOCK:
+            _SELECTOR_HITS[key] = by
+            _SELECTOR_HITS.move_to_end(key)
+            if len(_SELECTOR_HITS) > _SELECTOR_HITS_SIZE:
+                _SELECTOR_HITS.popitem(last=False)
     
     @staticmethod
     def _try_heal_and_fill(tab, fingerprint, value):
         """
         尝试自愈并填充
         
-        逻辑：通过语义锚点（label、nearby_text）重新定位元素
+        逻辑：先用原 id/css 重新查询（元素被重新渲染的情况），
+        再通过语义锚点（label、nearby_text）重新定位元素，
+        定位与填充在同一次 run_js 中完成（与 _fill_with_js_events 共用页内填充函数）
         
         Args:
             tab: tab对象
@@ -862,64 +1867,26 @@ class SmartFormFiller:
         Returns:
             bool: 是否成功
         """
-        # 方法1: 通过Label文本定位
-        label_text = fingerprint.anchors.get('label')
-        if label_text:
-            try:
-                # 查找包含该文本的label
-                js = f"""
-                (function() {{
-                    const labels = Array.from(document.querySelectorAll('label'));
-                    const target = labels.find(l => l.innerText.includes('{label_text}'));
-                    if (!target) return null;
-                    
-                    // 查找关联的input
-                    const forId = target.getAttribute('for');
-                    if (forId) return document.getElementById(forId);
-                    
-                    // 查找label内的input
-                    return target.querySelector('input, select, textarea');
-                }})();
-                """
-                result = tab.run_js(js)
-                if result:
-                    # 成功找到，使用新的选择器
-                    elem = tab.ele('xpath://input[@id]', timeout=0.5)  # 示例
-                    if elem:
-                        elem.clear()
-                        elem.input(value)
-                        return True
-            except:
-                pass
+        args = {
+            'id': fingerprint.raw_data.get('id', '') or '',
+            'css': fingerprint.selectors.get('css', '') or '',
+            'label': str(fingerprint.anchors.get('label') or ''),
+            'nearby_text': str(fingerprint.anchors.get('nearby_text') or ''),
+            'value': str(value),
+        }
+        if not any(args[k] for k in ('id', 'css', 'label', 'nearby_text')):
+            return False
         
-        # 方法2: 通过附近文本定位
-        nearby_text = fingerprint.anchors.get('nearby_text')
-        if nearby_text:
-            try:
-                # 查找包含该文本的元素，然后找附近的input
-                js = f"""
-                (function() {{
-                    const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT);
-                    let node;
-                    while (node = walker.nextNode()) {{
-                        if (node.textContent.includes('{nearby_text}')) {{
-                            let parent = node.parentElement;
-                            let input = parent.querySelector('input, select, textarea');
-                            if (!input) {{
-                                input = parent.nextElementSibling?.querySelector('input, select, textarea');
-                            }}
-                            if (input) return input;
-                        }}
-                    }}
-                    return null;
-                }})();
-                """
-                result = tab.run_js(js)
-                if result:
-                    # 这里简化处理，实际应该返回元素的新选择器
-                    return True
-            except:
-                pass
+        try:
+            result = tab.run_js(SmartFormFiller._HEAL_CALL_JS, args)
+            if result == SmartFormFiller._MISSING:
+                tab.run_js(SmartFormFiller._FILL_ONE_INSTALL_JS)
+                result = tab.run_js(SmartFormFiller._HEAL_CALL_JS, args)
+        except Exception:
+            return False
         
+        if isinstance(result, dict) and result.get('success'):
+            logger.debug("  🩹 自愈成功 (%s)", result.get('matchedBy'))
+            return True
         return False
 
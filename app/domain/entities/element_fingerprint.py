@@ -12,7 +12,14 @@
 - Iframe 上下文
 """
 
-from typing import Dict, Any, Optional
+import re
+from typing import Dict, Any, Iterable, List, Optional
+
+
+# 行号模式（get_selector_for_row 在批量填充时按行 × 字段调用，预编译）
+# TR_INDEX_RE 也供填充层做 XPath 行号泛化: .../tr[1]/td[2] -> .../tr/td[2]
+TR_INDEX_RE = re.compile(r'tr\[\d+\]')
+_DIV_INDEX_RE = re.compile(r'div\[\d+\]')
 
 
 class ElementFingerprint:
@@ -31,6 +38,13 @@ class ElementFingerprint:
         frame_info: Iframe 上下文信息
     """
     
+    # 扫描一次会创建成百上千个实例，使用 __slots__ 省去每个实例的 __dict__；
+    # related_inputs 由编排层在映射确认后挂载
+    __slots__ = (
+        'raw_data', 'selectors', 'anchors', 'features', 'table_info',
+        'rect', 'stability_score', 'row_pattern', 'frame_info', 'related_inputs',
+    )
+    
     def __init__(self, element_data: Dict[str, Any]) -> None:
         """
         初始化元素指纹
@@ -167,6 +181,17 @@ class ElementFingerprint:
                 return self.selectors[key]
         return None
     
+    def get_fallback_selectors(self) -> List[tuple]:
+        """
+        获取备选选择器列表，用于自愈定位
+        
+        优先级: id > xpath > css
+        
+        Returns:
+            [(selector_type, selector_string), ...]
+        """
+        return [(key, self.selectors[key]) for key in ('id', 'xpath', 'css') if self.selectors.get(key)]
+    
     def to_dict(self) -> Dict[str, Any]:
         """
         转换为字典格式
@@ -255,6 +280,29 @@ class ElementFingerprint:
         
         return cls(raw_data)
     
+    @classmethod
+    def from_batch(cls, items: Iterable[Dict[str, Any]]) -> List['ElementFingerprint']:
+        """
+        批量创建 ElementFingerprint 实例
+        
+        用于扫描结果的整批转换，单个元素数据异常时静默跳过。
+        
+        Args:
+            items: 元素数据字典序列（来自 JS 扫描）
+            
+        Returns:
+            ElementFingerprint 列表
+        """
+        out = []
+        append = out.append
+        build = cls
+        for item in items:
+            try:
+                append(build(item))
+            except Exception:
+                pass
+        return out
+    
     def get_selector_for_row(self, row_index: int) -> Optional[tuple]:
         """
         获取指定行的动态选择器
@@ -267,21 +315,19 @@ class ElementFingerprint:
         Returns:
             ('xpath', selector_string) 或 ('css', selector_string) 或 None
         """
-        import re
-        
         xpath = self.selectors.get('xpath', '')
         if not xpath:
             return None
         
         # 策略1: 检查是否包含行号模式 tr[N] 或 tbody/tr[N]
-        if re.search(r'tr\[\d+\]', xpath):
+        if TR_INDEX_RE.search(xpath):
             # 替换行号 (1-based in XPath)
-            dynamic_xpath = re.sub(r'tr\[\d+\]', f'tr[{row_index + 1}]', xpath)
+            dynamic_xpath = TR_INDEX_RE.sub(f'tr[{row_index + 1}]', xpath)
             return ('xpath', dynamic_xpath)
         
         # 策略2: 检查是否包含 row 类模式 div[N] 或带有 row 的 div
-        if re.search(r'div\[\d+\]', xpath) and 'row' in xpath.lower():
-            dynamic_xpath = re.sub(r'div\[\d+\]', f'div[{row_index + 1}]', xpath)
+        if _DIV_INDEX_RE.search(xpath) and 'row' in xpath.lower():
+            dynamic_xpath = _DIV_INDEX_RE.sub(f'div[{row_index + 1}]', xpath)
             return ('xpath', dynamic_xpath)
         
         # 策略3: 使用 table_info 中的表格位置信息
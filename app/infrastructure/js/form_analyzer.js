@@ -827,5 +827,217 @@ function scanPage() {
     }
 }
 
-// 导出入口
+/**
+ * 计算扫描结果的结构签名（元素数量 + 全部 xpath 的 FNV-1a 哈希）
+ *
+ * 仅比较数量时，数量相同但元素不同的两次采样会被误判为稳定。
+ *
+ * @param {Array<Object>} elements
+ * @returns {string}
+ */
+function resultSignature(elements) {
+    let h = 0x811c9dc5;
+    for (const el of elements) {
+        const key = el.xpath || '';
+        for (let i = 0; i < key.length; i++) {
+            h ^= key.charCodeAt(i);
+            h = Math.imul(h, 0x01000193);
+        }
+        h ^= 0x1f;
+        h = Math.imul(h, 0x01000193);
+    }
+    return elements.length + ':' + (h >>> 0).toString(16);
+}
+
+/**
+ * 按类别统计扫描结果（表格单元格 / 视觉标签 / Shadow DOM）
+ *
+ * @param {Array<Object>} elements
+ * @returns {Object} { tables, visual, shadow }
+ */
+function countStats(elements) {
+    const stats = { tables: 0, visual: 0, shadow: 0 };
+    for (const el of elements) {
+        if (el.is_table_cell) stats.tables++;
+        if (el.visual_label) stats.visual++;
+        if (el.shadow_depth > 0) stats.shadow++;
+    }
+    return stats;
+}
+
+/**
+ * 判断文档是否已有实质内容（加载完成且存在输入框/表格/足量文本）
+ *
+ * @returns {boolean}
+ */
+function isContentReady() {
+    if (document.readyState !== 'complete') return false;
+    if (document.querySelector('input, select, textarea')) return true;
+    if (document.querySelector('table, .el-table, .ant-table')) return true;
+    return !!(document.body && document.body.innerText.trim().length > 50);
+}
+
+/**
+ * 页内等待渲染稳定后返回扫描结果（单次 CDP 往返）
+ *
+ * 在页面内反复执行 scanPage()，连续 streak 次结果签名（数量 + xpath 哈希）一致即认为稳定。
+ * 采样间隔从 50ms 起按 1.6 倍指数退避，上限 pollMs。
+ * 快速路径: 首次采样时文档已 complete 且元素数 >= fastCount，直接视为稳定；
+ * 或文档已 complete、无加载动画且 DOM 已静默 quietMs（MutationObserver 观测），同样视为稳定。
+ * requireContent 模式（iframe 用）: 先等 isContentReady()，就绪后扫描一次即返回，
+ * 探测与扫描合并在同一次往返内完成。
+ *
+ * @param {Object} opts - { pollMs, maxMs, streak, fastCount, quietMs, requireContent }
+ * @returns {Promise<Object>} { status: 'stable'|'timeout'|'loading', elements, stats, stable_streak, elapsed_ms, loader }
+ */
+async function scanUntilStable(opts) {
+    const pollMs = opts.pollMs || 300;
+    const maxMs = opts.maxMs || 15000;
+    const streak = opts.streak || 3;
+    const fastCount = opts.fastCount || 20;
+    const quietMs = opts.quietMs || 200;
+    const start = Date.now();
+    const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
+    // 记录最近一次 DOM 结构变化，用于"静默期"判定
+    let lastMutation = start;
+    let observer = null;
+    try {
+        observer = new MutationObserver(() => { lastMutation = Date.now(); });
+        observer.observe(document.documentElement, { childList: true, subtree: true, characterData: true });
+    } catch (e) {}
+
+    let delay = Math.min(50, pollMs);
+    let attempt = 0;
+    let lastSignature = null;
+    let stableStreak = 0;
+    let best = null;
+    let loader = null;
+
+    const stable = (elements, extra) => Object.assign({
+        status: 'stable',
+        elements: elements,
+        stats: countStats(elements),
+        stable_streak: stableStreak,
+        elapsed_ms: Date.now() - start
+    }, extra || {});
+
+    try {
+        while (true) {
+            // 内容未就绪时不做全量扫描，只等待
+            if (opts.requireContent && !isContentReady()) {
+                loader = loader || 'content';
+                if (Date.now() - start + delay > maxMs) break;
+                await sleep(delay);
+                delay = Math.min(delay * 1.6, pollMs);
+                continue;
+            }
+
+            const res = scanPage();
+            attempt++;
+
+            if (opts.requireContent && Array.isArray(res)) {
+                stableStreak = 1;
+                return stable(res);
+            }
+
+            // 脚本异常直接返回，由调用方回退
+            if (res && res.error) return res;
+
+            if (res && res.status === 'loading') {
+                loader = res.loader;
+            } else if (Array.isArray(res)) {
+                loader = null;
+                const count = res.length;
+                const signature = resultSignature(res);
+                if (count > 0 && signature === lastSignature) {
+                    stableStreak++;
+                } else {
+                    stableStreak = 1;
+                }
+                if (count > 0) best = res;  // 保存最新有效结果
+                lastSignature = signature;
+
+                const complete = document.readyState === 'complete';
+
+                // 已加载完成的页面首次即拿到足量元素，无需再等稳定
+                if (attempt === 1 && count >= fastCount && complete) {
+                    return stable(best);
+                }
+
+                // 无加载动画（scanPage 返回数组）且 DOM 已静默 quietMs，视为稳定
+                const now = Date.now();
+                if (count > 0 && complete && now - start >= quietMs && now - lastMutation >= quietMs) {
+                    return stable(best, { quiet: true });
+                }
+
+                if (count > 0 && stableStreak >= streak) {
+                    return stable(best);
+                }
+            }
+
+            if (Date.now() - start + delay > maxMs) break;
+            await sleep(delay);
+            delay = Math.min(delay * 1.6, pollMs);
+        }
+    } finally {
+        if (observer) observer.disconnect();
+    }
+
+    // 内容始终未就绪时仍扫描一次，可能已部分加载
+    if (opts.requireContent && !best) {
+        const res = scanPage();
+        if (Array.isArray(res) && res.length > 0) best = res;
+    }
+
+    return {
+        status: (loader && !best) ? 'loading' : 'timeout',
+        loader: loader,
+        elements: best || [],
+        stats: countStats(best || []),
+        stable_streak: stableStreak,
+        elapsed_ms: Date.now() - start
+    };
+}
+
+/**
+ * 将元素对象数组压缩为按键集合分组的位置数组，减少 CDP 传输与 JSON 解析的重复键名
+ *
+ * 每种键集合只在 schemas 中出现一次；每行首位是所用 schema 的下标，其后依次为值。
+ *
+ * @param {Array<Object>} elements
+ * @returns {Object} { schemas: [[key, ...], ...], rows: [[schemaIndex, value, ...], ...] }
+ */
+function packElements(elements) {
+    const schemas = [];
+    const schemaIndex = new Map();
+    const rows = elements.map(el => {
+        // undefined 值在对象序列化时会被省略，这里保持一致
+        const keys = Object.keys(el).filter(key => el[key] !== undefined);
+        const signature = keys.join('\u0001');
+        let idx = schemaIndex.get(signature);
+        if (idx === undefined) {
+            idx = schemas.length;
+            schemas.push(keys);
+            schemaIndex.set(signature, idx);
+        }
+        const row = [idx];
+        for (const key of keys) row.push(el[key]);
+        return row;
+    });
+    return { schemas: schemas, rows: rows };
+}
+
+// 导出入口: 传入 { untilStable: true, ... } 时在页内等待稳定，否则单次扫描；
+// compact 为 true 时 elements 以 packElements 格式返回
+const __weaverScanOpts = arguments[0];
+if (__weaverScanOpts && __weaverScanOpts.untilStable) {
+    const pending = scanUntilStable(__weaverScanOpts);
+    return __weaverScanOpts.compact
+        ? pending.then(res => {
+            if (res && Array.isArray(res.elements)) res.elements = packElements(res.elements);
+            return res;
+        })
+        : pending;
+}
 return scanPage();
@@ -10,6 +10,7 @@ JavaScript 脚本存储模块 - 基础设施层实现
 - ELEMENT_UI_FILLER_JS: Element UI 填充脚本
 - EVENT_SIMULATOR_JS: Vue/React 事件模拟脚本
 - FORM_ANALYZER_JS: 表单分析器脚本（外部文件）
+- FALLBACK_SCANNER: 回退扫描脚本（兼容模式）
 """
 
 from typing import Final, Optional
@@ -125,6 +126,105 @@ class ScriptStore:
     })();
     """
     
+    # ============================================================
+    # 回退扫描器（兼容模式，一次返回全部元素的属性与标签）
+    # ============================================================
+    FALLBACK_SCANNER: Final[str] = """
+    const xpathOf = (el) => {
+        const parts = [];
+        for (let node = el; node && node.nodeType === 1; node = node.parentElement) {
+            const tag = node.tagName.toLowerCase();
+            const parent = node.parentElement;
+            if (!parent) { parts.unshift(tag); break; }
+            const same = Array.from(parent.children).filter(c => c.tagName === node.tagName);
+            parts.unshift(same.length > 1 ? `${tag}[${same.indexOf(node) + 1}]` : tag);
+        }
+        return '/' + parts.join('/');
+    };
+    const textAt = (ctx, xp) => {
+        const node = document.evaluate(xp, ctx, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        return node ? (node.innerText || node.textContent || '').trim() : '';
+    };
+    // 表头按 (table, 列) 缓存：同一列的多行输入框只做一次 XPath 查询
+    const headerCache = new Map();
+    const tableLabel = (el) => {
+        const td = el.closest('td');
+        if (!td) return '';
+        let col = 0;
+        for (let sib = td.previousElementSibling; sib; sib = sib.previousElementSibling) {
+            if (sib.tagName === 'TD') col++;
+        }
+        const table = td.closest('table');
+        if (!table) return '';
+        let headers = headerCache.get(table);
+        if (!headers) { headers = []; headerCache.set(table, headers); }
+        if (headers[col] === undefined) {
+            headers[col] = textAt(table, `.//thead//tr/th[${col + 1}]`)
+                || textAt(table, `.//tr[1]/th[${col + 1}]`)
+                || textAt(table, `.//tr[1]/td[${col + 1}]`);
+        }
+        return headers[col];
+    };
+    // label[for] 一次性建表，避免逐元素 querySelector
+    const labelFor = new Map();
+    document.querySelectorAll('label[for]').forEach(lbl => {
+        const key = lbl.getAttribute('for');
+        if (!labelFor.has(key)) labelFor.set(key, (lbl.innerText || lbl.textContent || '').trim());
+    });
+        
+    // 一次遍历取全部表单控件，再按 type 集合排除非输入类 input
+    const SKIP_TYPES = new Set(['hidden', 'button', 'submit', 'reset', 'image', 'file']);
+    const elements = Array.from(document.querySelectorAll('input, select, textarea'))
+        .filter(el => el.tagName !== 'INPUT' || !SKIP_TYPES.has(el.type));
+    // 包一层对象返回：DrissionPage 对数组逐项取值（每项一次往返），对象只需一次序列化
+    const items = elements.map((el, idx) => {
+        const tag = el.tagName.toLowerCase();
+        const id = el.id || '';
+        const name = el.getAttribute('name') || '';
+        const placeholder = el.getAttribute('placeholder') || '';
+            
+        let label = '';
+        try { label = tableLabel(el); } catch (e) {}
+        if (!label && id) label = labelFor.get(id) || '';
+        label = label || placeholder || name || id;
+            
+        const rect = el.getBoundingClientRect();
+        return {
+            index: idx,
+            tagName: tag,
+            type: el.getAttribute('type') || tag,
+            name: name,
+            className: el.getAttribute('class') || '',
+            placeholder: placeholder,
+            id: id,
+            id_selector: id ? '#' + id : null,
+            xpath: xpathOf(el),
+            label_text: label,
+            nearby_text: label,
+            rect: {
+                x: Math.round(rect.x),
+                y: Math.round(rect.y),
+                width: Math.round(rect.width),
+                height: Math.round(rect.height)
+            }
+        };
+    });
+    return { items: items };
+    """
+    
+    @staticmethod
+    def get_fallback_scan_js() -> str:
+        """
+        获取回退扫描脚本
+        
+        在页面内一次性完成元素遍历、表头/label 标签查找与 XPath 生成，
+        避免逐元素的 CDP 往返。
+        
+        Returns:
+            JavaScript 代码字符串
+        """
+        return ScriptStore.FALLBACK_SCANNER
+    
     # ============================================================
     # Iframe 检测器
     # ============================================================
@@ -145,6 +245,61 @@ class ScriptStore:
     })();
     """
     
+    # ============================================================
+    # 页面内容指纹（FNV-1a 32 位）
+    # 正文内容 + 表格首行 + 前 20 个输入框的值（只覆盖主文档，不含 iframe）
+    # ============================================================
+    PAGE_HASH_FN: Final[str] = """
+    function weaverPageHash() {
+        const fields = document.querySelectorAll('input, select, textarea');
+        // 对正文内容本身取哈希：只比长度时，等长的编辑会互相碰撞
+        let source = (document.body ? document.body.innerText : '') + ':';
+        document.querySelectorAll('table tbody tr:first-child td').forEach(td => { source += td.textContent; });
+        for (let i = 0; i < fields.length && i < 20; i++) source += '|' + (fields[i].value || '');
+        let h = 0x811c9dc5;
+        for (let i = 0; i < source.length; i++) {
+            h ^= source.charCodeAt(i);
+            h = Math.imul(h, 0x01000193);
+        }
+        return (h >>> 0).toString(16);
+    }
+    """
+    
+    PAGE_HASH: Final[str] = PAGE_HASH_FN + """
+    return weaverPageHash();
+    """
+    
+    # ============================================================
+    # 可进入 Iframe 筛选器（过滤不可见/过小的广告、像素 iframe）
+    # ============================================================
+    USEFUL_IFRAMES: Final[str] = """
+    // 包一层对象返回：DrissionPage 对数组逐项取值（每项一次往返），对象只需一次序列化
+    const items = Array.from(document.querySelectorAll('iframe'))
+        .map((frame, i) => {
+            const rect = frame.getBoundingClientRect();
+            const style = getComputedStyle(frame);
+            const hidden = style.display === 'none' || style.visibility === 'hidden';
+            return { i: i, src: frame.src || '', w: rect.width, h: rect.height, hidden: hidden };
+        })
+        .filter(info => !info.hidden && info.w >= 50 && info.h >= 50);
+    return { items: items };
+    """
+    
+    # ============================================================
+    # 列文本批量读取（锚点列扫描）
+    # 按 XPath 一次取回全部单元格文本，单元格无文本时取输入框的值
+    # ============================================================
+    COLUMN_TEXTS: Final[str] = """
+    const snap = document.evaluate(arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    const texts = [];
+    for (let i = 0; i < snap.snapshotLength; i++) {
+        const el = snap.snapshotItem(i);
+        const text = (el.innerText || '').trim();
+        texts.push(text || String(el.value || el.getAttribute('value') || '').trim());
+    }
+    return { texts: texts };
+    """
+    
     # ============================================================
     # 翻页按钮检测器
     # ============================================================
@@ -11,7 +11,7 @@ JavaScript 脚本存储模块
 - EVENT_SIMULATOR_JS: Vue/React 事件模拟脚本
 """
 
-from typing import Final
+from typing import Final, Tuple
 
 
 # ============================================================
@@ -202,35 +202,42 @@ def get_element_ui_label_fill_js(label: str, value: str) -> str:
 # ============================================================
 # 通用事件模拟填充
 # ============================================================
-def get_fill_with_events_js(elem_id: str, xpath: str, css_selector: str, 
-                             value: str, elem_type: str, tag_name: str) -> str:
+def get_fill_with_events_js(strategy: Tuple[str, str], value: str,
+                             elem_type: str, tag_name: str) -> str:
     """
     生成通用的 JS 填充脚本，模拟完整用户行为
     
     行为链: Focus -> Clear -> Set Value -> Input Event -> Change Event -> Blur
+    
+    Args:
+        strategy: 定位策略 (类型, 选择器)，类型为 'id' / 'css' / 'xpath'，
+                  由调用方预先选定，JS 端只执行对应的一种查找
+        value: 要填充的值
+        elem_type: 元素类型
+        tag_name: 标签名
     """
+    kind, selector = strategy
     value_escaped = value.replace('\\', '\\\\').replace("'", "\\'").replace('\n', '\\n')
-    elem_id_escaped = elem_id.replace("'", "\\'") if elem_id else ''
-    xpath_escaped = xpath.replace("'", "\\'").replace('"', '\\"') if xpath else ''
-    css_escaped = css_selector.replace("'", "\\'") if css_selector else ''
+    
+    if kind == 'id':
+        selector_escaped = selector.replace("'", "\\'")
+        locate_js = f"el = document.getElementById('{selector_escaped}');"
+    elif kind == 'css':
+        selector_escaped = selector.replace("'", "\\'")
+        locate_js = f"try {{ el = document.querySelector('{selector_escaped}'); }} catch(e) {{}}"
+    else:
+        selector_escaped = selector.replace("'", "\\'").replace('"', '\\"')
+        locate_js = (
+            f'try {{ el = document.evaluate("{selector_escaped}", document, null, '
+            f'XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue; }} catch(e) {{}}'
+        )
     
     return f"""
     (function() {{
         let el = null;
         
-        // 多选择器定位元素
-        if (!el && '{elem_id_escaped}') {{
-            el = document.getElementById('{elem_id_escaped}');
-        }}
-        if (!el && '{css_escaped}') {{
-            try {{ el = document.querySelector('{css_escaped}'); }} catch(e) {{}}
-        }}
-        if (!el && '{xpath_escaped}') {{
-            try {{
-                let result = document.evaluate("{xpath_escaped}", document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null);
-                el = result.singleNodeValue;
-            }} catch(e) {{}}
-        }}
+        // 按预选策略定位元素
+        {locate_js}
         
         if (!el) {{
             return {{ success: false, error: 'element_not_found' }};
@@ -76,9 +76,11 @@ class WeaverLogger:
             except Exception:
                 pass  # UI 回调失败不影响日志记录
     
-    def debug(self, message: str):
-        """调试级别日志"""
-        self._log_and_callback(logging.DEBUG, message, "debug")
+    def debug(self, message: str, *args):
+        """调试级别日志（args 按 % 格式延迟拼接，未启用且无 UI 回调时不格式化）"""
+        if not self.ui_callback and not self.logger.isEnabledFor(logging.DEBUG):
+            return
+        self._log_and_callback(logging.DEBUG, message % args if args else message, "debug")
     
     def info(self, message: str):
         """信息级别日志"""
@@ -100,6 +102,10 @@ class WeaverLogger:
         """严重错误级别日志"""
         self._log_and_callback(logging.CRITICAL, message, "critical")
     
+    def is_enabled_for(self, level: int) -> bool:
+        """判断指定级别是否会被输出（用于跳过仅供日志使用的计算）"""
+        return bool(self.ui_callback) or self.logger.isEnabledFor(level)
+    
     def set_ui_callback(self, callback: Optional[Callable[[str, str], None]]):
         """设置或更新 UI 回调"""
         self.ui_callback = callback
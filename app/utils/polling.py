@@ -0,0 +1,95 @@
+"""
+轮询工具
+
+统一的"采样 - 判断 - 等待"循环，替代各处手写的 time.sleep 轮询。
+
+特性:
+- 指数退避（从 interval 起按 backoff 倍数增长，上限 max_interval）
+- 条件终止（until 谓词满足即返回）
+- 稳定性终止（stable_of 次连续采样的 key 相同即返回）
+- 等待不会越过总超时
+
+用法:
+    from app.utils.polling import poll
+
+    result = poll(lambda: tab.url, timeout=5, until=lambda url: url != old_url)
+    if result.ok:
+        print(result.value)
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+
+@dataclass
+class PollResult:
+    """轮询结果"""
+    value: Any = None       # 最后一次采样值
+    ok: bool = False        # 是否在超时前满足终止条件
+    attempts: int = 0       # 采样次数
+    elapsed: float = 0.0    # 总耗时（秒）
+
+
+def poll(
+    fn: Callable[[], Any],
+    *,
+    timeout: float,
+    interval: float = 0.1,
+    max_interval: float = 0.8,
+    backoff: float = 1.5,
+    until: Optional[Callable[[Any], bool]] = None,
+    stable_of: Optional[int] = None,
+    key: Callable[[Any], Any] = len,
+) -> PollResult:
+    """
+    轮询 fn 直到满足终止条件或超时
+
+    首次采样立即执行，之后每次等待 interval（指数退避，上限 max_interval）。
+    fn 抛出的异常直接向上传播。
+
+    Args:
+        fn: 采样函数
+        timeout: 总超时（秒）
+        interval: 初始等待间隔（秒）
+        max_interval: 等待间隔上限（秒）
+        backoff: 退避倍数，1.0 表示固定间隔
+        until: 终止谓词，返回 True 即结束
+        stable_of: 连续多少次采样 key 相同即结束
+        key: stable_of 比较所用的特征函数，默认 len
+
+    Returns:
+        PollResult: 最后一次采样值及是否成功
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    delay = interval
+    last_key = None
+    streak = 0
+    result = PollResult()
+
+    while True:
+        value = fn()
+        result.value = value
+        result.attempts += 1
+
+        if until is not None and until(value):
+            result.ok = True
+            break
+
+        if stable_of is not None:
+            current_key = key(value)
+            streak = streak + 1 if streak and current_key == last_key else 1
+            last_key = current_key
+            if streak >= stable_of:
+                result.ok = True
+                break
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        time.sleep(min(delay, remaining))
+        delay = min(delay * backoff, max_interval)
+
+    result.elapsed = time.monotonic() - start
+    return result
@@ -0,0 +1,74 @@
+"""
+进度回调节流
+
+逐行填充时每行都会触发进度回调；回调通常要切到 UI 线程刷新界面，
+行数多时回调本身会成为瓶颈。ProgressThrottle 合并高频的普通进度，
+错误、警告与最终进度仍立即转发。
+
+用法:
+    from app.utils.throttle import ProgressThrottle
+
+    progress = ProgressThrottle(progress_callback)
+    for ...:
+        progress(row_num, total, "正在填写", "info")
+    progress.flush()                                   # 补发被合并的最后一条
+    progress.emit(total, total, "完成", "success")     # 终态消息立即转发
+"""
+
+import time
+from typing import Any, Callable, Optional, Tuple
+
+
+class ProgressThrottle:
+    """
+    进度回调节流器
+
+    间隔 interval 秒内的普通进度只转发第一条，其余暂存为"最近一条"；
+    flush() 补发最后被合并的那条，保证界面停在最终状态。
+    """
+
+    __slots__ = ('_callback', '_interval', '_last_emit', '_pending')
+
+    # 立即转发的级别
+    URGENT_LEVELS = frozenset({'error', 'warning'})
+
+    def __init__(self, callback: Optional[Callable[..., Any]], interval: float = 0.1) -> None:
+        """
+        Args:
+            callback: 原始进度回调 (current, total, message, level)，None 时所有调用为空操作
+            interval: 最小转发间隔（秒）
+        """
+        self._callback = callback
+        self._interval = interval
+        self._last_emit = float('-inf')
+        self._pending: Optional[Tuple[Any, ...]] = None
+
+    def __bool__(self) -> bool:
+        return self._callback is not None
+
+    def __call__(self, current: int, total: int, message: str, level: str = 'info') -> None:
+        if self._callback is None:
+            return
+
+        now = time.monotonic()
+        if level in self.URGENT_LEVELS or current >= total or now - self._last_emit >= self._interval:
+            self._pending = None
+            self._last_emit = now
+            self._callback(current, total, message, level)
+        else:
+            self._pending = (current, total, message, level)
+
+    def emit(self, current: int, total: int, message: str, level: str = 'info') -> None:
+        """立即转发（终态消息），丢弃尚未补发的进度"""
+        if self._callback is None:
+            return
+        self._pending = None
+        self._last_emit = time.monotonic()
+        self._callback(current, total, message, level)
+
+    def flush(self) -> None:
+        """补发最后一条被合并的进度"""
+        if self._callback is not None and self._pending is not None:
+            pending, self._pending = self._pending, None
+            self._last_emit = time.monotonic()
+            self._callback(*pending)
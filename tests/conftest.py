@@ -154,7 +154,7 @@ class MockBrowserTab:
         self.js_results = {}
         self.elements = {}
     
-    def run_js(self, script):
+    def run_js(self, script, *args, **kwargs):
         """执行 JS 脚本（返回预设结果）"""
         return self.js_results.get(script, None)
     
@@ -0,0 +1,178 @@
+"""
+PaginationController 单元测试
+
+测试页面状态快照与翻页变化检测。
+"""
+
+import time
+
+from app.core.pagination_controller import PaginationController, PageState
+
+
+class TestCapturePageState:
+    """capture_page_state 测试套件"""
+    
+    def test_snapshot_single_js_call(self, mock_tab):
+        """页面状态应通过一次 JS 调用获取"""
+        mock_tab.url = 'http://example.com/list'
+        mock_tab.js_results[PaginationController._SNAPSHOT_JS] = {
+            'hash': 'page:2', 'page_hash': '1a2b3c4d', 'count': 7
+        }
+        
+        state = PaginationController(mock_tab).capture_page_state()
+        
+        assert state.url == 'http://example.com/list'
+        assert state.content_hash == 'page:2'
+        assert state.page_hash == '1a2b3c4d'
+        assert state.element_count == 7
+    
+    def test_empty_snapshot_falls_back_to_time_hash(self, mock_tab):
+        """探测不到任何特征时使用时间戳哈希"""
+        mock_tab.url = 'http://example.com/list'
+        
+        state = PaginationController(mock_tab).capture_page_state()
+        
+        assert state.content_hash.startswith('time:http://example.com/list')
+        assert state.element_count == 0
+
+
+class TestNextButtonLookup:
+    """翻页按钮查找与选择器缓存测试套件"""
+    
+    def test_cached_locator_probed_first(self, mock_tab):
+        """上次命中的定位方式应优先探测"""
+        mock_tab.url = 'http://example.com/list'
+        mock_tab.elements['xpath://button[@class="next"]'] = 'BUTTON'
+        probed = []
+        original_ele = mock_tab.ele
+        mock_tab.ele = lambda sel, timeout=None: probed.append(sel) or original_ele(sel)
+        
+        controller = PaginationController(mock_tab)
+        controller.set_next_button(selector='#next', xpath='//button[@class="next"]')
+        
+        assert controller._find_next_button() == 'BUTTON'
+        assert probed == ['#next', 'xpath://button[@class="next"]']
+        
+        probed.clear()
+        assert controller._find_next_button() == 'BUTTON'
+        assert probed == ['xpath://button[@class="next"]']
+    
+    def test_cache_evicts_least_recently_used(self, mock_tab):
+        """缓存超出容量时淘汰最久未使用的条目"""
+        controller = PaginationController(mock_tab)
+        controller._SELECTOR_CACHE_SIZE = 2
+        controller._cache_put('a', 'next_button', '#a')
+        controller._cache_put('b', 'next_button', '#b')
+        controller._cache_get('a', 'next_button')
+        controller._cache_put('c', 'next_button', '#c')
+        
+        assert controller._cache_get('b', 'next_button') is None
+        assert controller._cache_get('a', 'next_button') == '#a'
+    
+    def test_reset_clears_cache(self, mock_tab):
+        """reset 应清空选择器缓存"""
+        controller = PaginationController(mock_tab)
+        controller._cache_put('a', 'next_button', '#a')
+        controller.reset()
+        assert controller._cache_get('a', 'next_button') is None
+
+
+class TestClickNextPage:
+    """click_next_page 测试套件"""
+    
+    def test_url_change_detected_without_snapshot(self, mock_tab):
+        """URL 变化时无需再执行内容快照脚本"""
+        class Button:
+            def attr(self, name):
+                return None
+            
+            def click(self):
+                mock_tab.url = 'http://example.com/list?page=2'
+        
+        mock_tab.url = 'http://example.com/list?page=1'
+        mock_tab.elements['#next'] = Button()
+        snapshots = []
+        mock_tab.run_js = lambda script, *args, **kwargs: snapshots.append(script) and None
+        
+        controller = PaginationController(mock_tab)
+        controller.set_next_button(selector='#next')
+        
+        assert controller.click_next_page(wait_after=0) is True
+        assert controller.current_page == 2
+        assert controller.last_page_state.url == 'http://example.com/list?page=2'
+        # 仅点击前的一次快照（及禁用检测），翻页检测本身不再调用快照
+        assert snapshots.count(PaginationController._SNAPSHOT_JS) == 1
+    
+    def test_same_url_content_change_detected_before_wait_after(self, mock_tab):
+        """同 URL 的 SPA 翻页在 URL 窗口过后即比较内容，不等满 wait_after"""
+        mock_tab.url = 'http://example.com/list'
+        mock_tab.js_results[PaginationController._SNAPSHOT_JS] = {
+            'hash': 'page:2', 'page_hash': '2b3c4d5e', 'count': 7
+        }
+        old_state = PageState(url='http://example.com/list', content_hash='page:1', page_hash='1a2b3c4d')
+        controller = PaginationController(mock_tab)
+        
+        start = time.monotonic()
+        new_state = controller._wait_for_page_change(old_state, wait_after=1.5, max_wait=2)
+        
+        assert new_state is not None and new_state.content_hash == 'page:2'
+        assert time.monotonic() - start < 1.5
+    
+    def test_timeout_waits_for_in_flight_probe(self, mock_tab, monkeypatch):
+        """超时返回前等待进行中的探测结束，之后后台线程不再探测"""
+        calls = []
+        
+        def slow_probe(old_state, url_only):
+            calls.append('start')
+            time.sleep(1.3)
+            calls.append('end')
+            return None
+        
+        controller = PaginationController(mock_tab)
+        monkeypatch.setattr(controller, '_probe_page_change', slow_probe)
+        
+        assert controller._wait_for_page_change(PageState(), wait_after=0, max_wait=0.05) is None
+        assert calls == ['start', 'end']
+        time.sleep(0.3)
+        assert calls == ['start', 'end']
+
+
+class TestCheckButtonDisabled:
+    """_check_button_disabled 测试套件"""
+    
+    def test_falls_back_to_class_regex_when_js_fails(self, mock_tab):
+        """JS 检测失败时按禁用类名判断"""
+        class Button:
+            def __init__(self, cls):
+                self.cls = cls
+            
+            def attr(self, name):
+                return self.cls if name == 'class' else None
+        
+        def broken_run_js(script, *args, **kwargs):
+            raise RuntimeError('context lost')
+        
+        mock_tab.run_js = broken_run_js
+        controller = PaginationController(mock_tab)
+        
+        assert controller._check_button_disabled(Button('ant-pagination-next ant-pagination-disabled')) is True
+        assert controller._check_button_disabled(Button('btn IS-DISABLED')) is True
+        assert controller._check_button_disabled(Button('ant-pagination-next')) is False
+
+
+class TestDetectPageChange:
+    """detect_page_change 测试套件"""
+    
+    def test_same_state_not_changed(self, mock_tab):
+        """URL 与内容哈希都相同时视为未翻页"""
+        controller = PaginationController(mock_tab)
+        old = PageState(url='u', content_hash='page:1')
+        new = PageState(url='u', content_hash='page:1')
+        assert controller.detect_page_change(old, new) is False
+    
+    def test_hash_changed(self, mock_tab):
+        """内容哈希变化视为翻页"""
+        controller = PaginationController(mock_tab)
+        old = PageState(url='u', content_hash='page:1')
+        new = PageState(url='u', content_hash='page:2')
+        assert controller.detect_page_change(old, new) is True
@@ -0,0 +1,236 @@
+"""
+SmartFormAnalyzer 单元测试
+
+测试分析脚本的注入与调用。
+"""
+
+from app.core import smart_form_analyzer
+from app.core.smart_form_analyzer import SmartFormAnalyzer
+from app.infrastructure.js.script_store import ScriptStore
+
+
+class RecordingTab:
+    """记录 run_js / run_cdp 调用的模拟 tab"""
+    
+    def __init__(self, installed=False):
+        self.installed = installed
+        self.scripts = []
+        self.cdp_calls = []
+    
+    def run_cdp(self, cmd, **kwargs):
+        self.cdp_calls.append(cmd)
+    
+    def run_js(self, script, *args, **kwargs):
+        self.scripts.append(script)
+        if script == SmartFormAnalyzer.get_install_js():
+            self.installed = True
+            return None
+        return ['element'] if self.installed else SmartFormAnalyzer._MISSING
+
+
+class TestRunAnalysis:
+    """run_analysis 测试套件"""
+    
+    def test_installs_once_when_missing(self):
+        """当前文档未注入时先注入再重试，之后只发送调用桩"""
+        tab = RecordingTab()
+        
+        assert SmartFormAnalyzer.run_analysis(tab) == ['element']
+        assert SmartFormAnalyzer.run_analysis(tab) == ['element']
+        
+        assert tab.cdp_calls == ['Page.addScriptToEvaluateOnNewDocument']
+        assert tab.scripts.count(SmartFormAnalyzer.get_install_js()) == 1
+        assert tab.scripts[-1] == SmartFormAnalyzer._SCAN_CALL_JS
+    
+    def test_already_installed_sends_only_stub(self):
+        """已注入时不重复传输分析脚本"""
+        tab = RecordingTab(installed=True)
+        
+        SmartFormAnalyzer.run_analysis(tab)
+        
+        assert tab.scripts == [SmartFormAnalyzer._SCAN_CALL_JS]
+
+
+class ScanTab:
+    """按脚本返回预设结果的模拟 tab，统计分析脚本调用次数"""
+    
+    def __init__(self, page_hash='abc123'):
+        self.url = 'http://example.com/form'
+        self.page_hash = page_hash
+        self.scans = 0
+        self.iframe_scans = 0
+    
+    def run_cdp(self, cmd, **kwargs):
+        pass
+    
+    def run_js(self, script, *args, **kwargs):
+        if script == ScriptStore.PAGE_HASH:
+            return self.page_hash
+        if script == ScriptStore.USEFUL_IFRAMES:
+            self.iframe_scans += 1
+            return {'items': []}
+        if script == SmartFormAnalyzer._SCAN_CALL_JS:
+            self.scans += 1
+            return {
+                'status': 'stable',
+                'elements': [{'id_selector': '#name', 'tagName': 'input', 'label_text': '姓名'}],
+                'stable_streak': 3,
+                'elapsed_ms': 10,
+            }
+        return None
+
+
+class TestDeepScanCache:
+    """deep_scan_page 结果缓存测试套件"""
+    
+    def setup_method(self):
+        smart_form_analyzer._SCAN_CACHE.clear()
+    
+    def test_unchanged_page_reuses_previous_scan(self):
+        """URL 与内容哈希未变化时不重新扫描"""
+        tab = ScanTab()
+        
+        first = SmartFormAnalyzer.deep_scan_page(tab)
+        second = SmartFormAnalyzer.deep_scan_page(tab)
+        
+        assert tab.scans == 1
+        assert len(first) == len(second) == 1
+    
+    def test_cache_hit_returns_fresh_fingerprints(self):
+        """命中缓存时返回新的指纹对象，不带回上次会话的修改"""
+        tab = ScanTab()
+        
+        first = SmartFormAnalyzer.deep_scan_page(tab)
+        first[0].stability_score = 100
+        first[0].related_inputs = ['#other']
+        second = SmartFormAnalyzer.deep_scan_page(tab)
+        
+        assert second[0] is not first[0]
+        assert second[0].stability_score != 100
+        assert getattr(second[0], 'related_inputs', None) is None
+    
+    def test_cache_hit_still_rescans_iframes(self):
+        """内容哈希只覆盖主文档，命中缓存后 iframe 仍重新扫描"""
+        tab = ScanTab()
+        
+        SmartFormAnalyzer.deep_scan_page(tab)
+        SmartFormAnalyzer.deep_scan_page(tab)
+        
+        assert tab.scans == 1
+        assert tab.iframe_scans == 2
+    
+    def test_changed_hash_triggers_rescan(self):
+        """内容哈希变化后重新扫描"""
+        tab = ScanTab()
+        
+        SmartFormAnalyzer.deep_scan_page(tab)
+        tab.page_hash = 'def456'
+        SmartFormAnalyzer.deep_scan_page(tab)
+        
+        assert tab.scans == 2
+
+
+class FakeDriver:
+    """模拟的 CDP 连接"""
+
+
+class DriverTarget:
+    """带 DrissionPage 风格私有属性的模拟 tab / frame"""
+    
+    def __init__(self, parent=None, diff_domain=True):
+        self._driver = FakeDriver()
+        if parent is not None:
+            self._target_page = parent
+            self._is_diff_domain = diff_domain
+
+
+class TestDriverLock:
+    """_driver_lock 测试套件"""
+    
+    def test_same_origin_frame_shares_tab_lock(self):
+        """同源 frame 经所在页面的 Driver 发送 CDP，与 tab 共用一把锁"""
+        tab = DriverTarget()
+        frame = DriverTarget(parent=tab, diff_domain=False)
+        nested = DriverTarget(parent=frame, diff_domain=False)
+        
+        assert smart_form_analyzer._driver_lock(frame) is smart_form_analyzer._driver_lock(tab)
+        assert smart_form_analyzer._driver_lock(nested) is smart_form_analyzer._driver_lock(tab)
+    
+    def test_cross_origin_frame_has_own_lock(self):
+        """跨域 frame 有独立 Driver，可与 tab 并发"""
+        tab = DriverTarget()
+        frame = DriverTarget(parent=tab, diff_domain=True)
+        
+        assert smart_form_analyzer._driver_lock(frame) is not smart_form_analyzer._driver_lock(tab)
+
+
+class TestRegisterOnNewDocument:
+    """_register_on_new_document 测试套件"""
+    
+    def test_same_origin_frames_register_once_on_tab(self):
+        """同源 frame（每次跳转都会重建）只在所在 tab 上注册一次"""
+        class Target(DriverTarget):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.cdp_calls = []
+            
+            def run_cdp(self, cmd, **kwargs):
+                self.cdp_calls.append(cmd)
+        
+        tab = Target()
+        for _ in range(3):
+            SmartFormAnalyzer._register_on_new_document(Target(parent=tab, diff_domain=False))
+        cross = Target(parent=tab, diff_domain=True)
+        SmartFormAnalyzer._register_on_new_document(cross)
+        
+        assert tab.cdp_calls == ['Page.addScriptToEvaluateOnNewDocument']
+        assert cross.cdp_calls == ['Page.addScriptToEvaluateOnNewDocument']
+
+
+class TestUnpackElements:
+    """_unpack_elements 测试套件"""
+    
+    def test_restores_rows_by_schema(self):
+        """按 schema 下标还原为字典，不同键集合互不影响"""
+        packed = {
+            'schemas': [['tagName', 'id_selector'], ['tagName', 'label_text', 'rect']],
+            'rows': [
+                [0, 'input', '#a'],
+                [1, 'select', '科室', {'x': 1}],
+                [0, 'textarea', None],
+            ],
+        }
+        
+        result = SmartFormAnalyzer._unpack_elements(packed)
+        
+        assert result == [
+            {'tagName': 'input', 'id_selector': '#a'},
+            {'tagName': 'select', 'label_text': '科室', 'rect': {'x': 1}},
+            {'tagName': 'textarea', 'id_selector': None},
+        ]
+    
+    def test_plain_list_passes_through(self):
+        """未压缩的列表原样返回"""
+        items = [{'tagName': 'input'}]
+        
+        assert SmartFormAnalyzer._unpack_elements(items) is items
+        assert SmartFormAnalyzer._unpack_elements(None) == []
+
+
+class TestSuggestDataTransformation:
+    """suggest_data_transformation 测试套件"""
+    
+    def test_date_slashes_converted(self):
+        """日期控件的斜杠分隔转换为短横线"""
+        assert SmartFormAnalyzer.suggest_data_transformation(' 2024/01/15 ', 'date') == '2024-01-15'
+        assert SmartFormAnalyzer.suggest_data_transformation('2024/01/15', 'text') == '2024/01/15'
+    
+    def test_equal_values_of_different_types_not_confused(self):
+        """缓存按类型区分（True 与 1 哈希相同）"""
+        assert SmartFormAnalyzer.suggest_data_transformation(1, 'text') == '1'
+        assert SmartFormAnalyzer.suggest_data_transformation(True, 'text') == 'True'
+    
+    def test_unhashable_value_bypasses_cache(self):
+        """不可哈希的值直接转换"""
+        assert SmartFormAnalyzer.suggest_data_transformation(['a'], 'text') == "['a']"
+        assert SmartFormAnalyzer.suggest_data_transformation(None, 'text') == ''
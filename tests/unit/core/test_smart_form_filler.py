@@ -0,0 +1,608 @@
+"""
+SmartFormFiller 单元测试
+
+测试加载遮罩等待逻辑。
+"""
+
+import pytest
+
+from app.core import smart_form_filler
+from app.core.smart_form_filler import SmartFormFiller
+from app.infrastructure.js.script_store import ScriptStore
+
+
+class TestWaitForLoadingComplete:
+    """_wait_for_loading_complete 测试套件"""
+    
+    def test_no_loader_returns_true(self, mock_tab):
+        """页面无加载遮罩时直接返回 True"""
+        mock_tab.js_results[SmartFormFiller._LOADING_CALL_JS] = {'loading': False}
+        
+        assert SmartFormFiller._wait_for_loading_complete(mock_tab, timeout=1) is True
+    
+    def test_loader_still_present_returns_false(self, mock_tab):
+        """超时后遮罩仍在返回 False"""
+        mock_tab.js_results[SmartFormFiller._LOADING_CALL_JS] = {'loading': True, 'type': 'ant-spin'}
+        
+        assert SmartFormFiller._wait_for_loading_complete(mock_tab, timeout=1) is False
+    
+    def test_script_failure_returns_false(self):
+        """脚本执行异常时不抛出"""
+        class BrokenTab:
+            def run_js(self, *args, **kwargs):
+                raise RuntimeError('disconnected')
+        
+        assert SmartFormFiller._wait_for_loading_complete(BrokenTab(), timeout=1) is False
+    
+    def test_installs_check_function_once_per_page(self):
+        """检测函数缺失时注入一次，之后只发送调用桩"""
+        class RecordingTab:
+            def __init__(self):
+                self.installed = False
+                self.scripts = []
+            
+            def run_js(self, script, *args, **kwargs):
+                self.scripts.append(script)
+                if script == SmartFormFiller._LOADING_INSTALL_JS:
+                    self.installed = True
+                    return None
+                return {'loading': False} if self.installed else SmartFormFiller._MISSING
+        
+        tab = RecordingTab()
+        
+        assert SmartFormFiller._wait_for_loading_complete(tab, timeout=1) is True
+        assert SmartFormFiller._wait_for_loading_complete(tab, timeout=1) is True
+        
+        assert tab.scripts.count(SmartFormFiller._LOADING_INSTALL_JS) == 1
+        assert tab.scripts[-1] == SmartFormFiller._LOADING_CALL_JS
+
+
+class FakeElement:
+    """记录输入值的模拟元素"""
+    
+    def __init__(self):
+        self.value = None
+    
+    def clear(self):
+        self.value = ''
+    
+    def input(self, value):
+        self.value = value
+
+
+class LocateTab:
+    """按 XPath 批量定位的模拟 tab，统计逐个查找次数"""
+    
+    def __init__(self, elements, batch_ok=True, fillable=()):
+        self.elements = elements
+        self.batch_ok = batch_ok
+        self.fillable = set(fillable)
+        self.fill_installed = False
+        self.single_lookups = 0
+    
+    def run_js(self, script, *args, **kwargs):
+        if script == SmartFormFiller._FILL_ROW_INSTALL_JS:
+            self.fill_installed = True
+            return None
+        if script == SmartFormFiller._FILL_ROW_CALL_JS:
+            if not self.fill_installed:
+                return SmartFormFiller._MISSING
+            ok = []
+            for op in args[0]['ops']:
+                ele = self.elements.get(op['xpath']) if op['xpath'] in self.fillable else None
+                if ele:
+                    ele.value = op['value']
+                ok.append(bool(ele))
+            return {'ok': ok}
+        if script == SmartFormFiller._LOCATE_BATCH_JS:
+            if not self.batch_ok:
+                raise RuntimeError('context lost')
+            return {'hits': [xp in self.elements for xp in args[0]['xpaths']]}
+        return {'loading': False}
+    
+    def ele(self, selector, timeout=None):
+        self.single_lookups += 1
+        return self.elements.get(selector.replace('xpath:', '', 1))
+
+
+class TestExecuteQueue:
+    """execute_queue 批量定位测试套件"""
+    
+    @staticmethod
+    def _run(tab):
+        from app.core.element_fingerprint import ElementFingerprint
+        from app.core.fill_queue import FillQueue
+        from app.domain.entities.fill_task import FillTask
+        
+        mappings = {
+            '姓名': ElementFingerprint({'xpath': '//input[1]'}),
+            '科室': ElementFingerprint({'xpath': '//input[2]'}),
+        }
+        queue = FillQueue([FillTask(0, 0, {'姓名': '张三', '科室': '内科'})])
+        return SmartFormFiller.execute_queue(tab, queue, mappings), queue
+    
+    def test_row_located_in_one_batch(self):
+        """整行元素一次批量判断是否存在，只对命中的字段取元素"""
+        name, dept = FakeElement(), FakeElement()
+        tab = LocateTab({'//input[1]': name, '//input[2]': dept})
+        
+        _, queue = self._run(tab)
+        
+        assert name.value == '张三'
+        assert dept.value == '内科'
+        assert tab.single_lookups == 2
+        assert queue.tasks[0].status == 'success'
+    
+    def test_missing_field_not_looked_up(self):
+        """批量判断未命中的字段不再逐个查找"""
+        name = FakeElement()
+        tab = LocateTab({'//input[1]': name})
+        
+        self._run(tab)
+        
+        assert name.value == '张三'
+        assert tab.single_lookups == 1
+    
+    def test_text_fields_filled_in_one_call(self):
+        """文本类字段整行一次填充，其余字段回退逐个填充"""
+        name, dept = FakeElement(), FakeElement()
+        tab = LocateTab({'//input[1]': name, '//input[2]': dept}, fillable={'//input[1]'})
+        
+        _, queue = self._run(tab)
+        
+        assert name.value == '张三'
+        assert dept.value == '内科'
+        assert tab.fill_installed
+        assert queue.tasks[0].status == 'success'
+    
+    def test_falls_back_to_single_lookup(self):
+        """批量定位失败时逐个查找"""
+        name = FakeElement()
+        tab = LocateTab({'//input[1]': name}, batch_ok=False)
+        
+        self._run(tab)
+        
+        assert name.value == '张三'
+        assert tab.single_lookups == 2
+
+
+class TestResolveTargetXpath:
+    """_flatten_fingerprint / _resolve_target_xpath 测试套件"""
+    
+    def test_related_inputs_map_to_following_rows(self):
+        """行 0 使用主元素，后续行依次使用 related_inputs"""
+        from app.core.element_fingerprint import ElementFingerprint
+        
+        fp = ElementFingerprint({'xpath': '//input[1]', 'css_selector': '#a'})
+        fp.related_inputs = [{'xpath': '//input[2]'}, {'xpath': '//input[3]'}]
+        resolved = SmartFormFiller._flatten_fingerprint(fp)
+        
+        assert resolved['css'] == '#a'
+        assert [SmartFormFiller._resolve_target_xpath(resolved, i) for i in range(4)] == [
+            '//input[1]', '//input[2]', '//input[3]', None,
+        ]
+    
+    def test_single_input_only_fills_first_row(self):
+        """无 related_inputs 时只有第一行有目标"""
+        from app.core.element_fingerprint import ElementFingerprint
+        
+        resolved = SmartFormFiller._flatten_fingerprint(ElementFingerprint({'xpath': '//input[1]'}))
+        
+        assert SmartFormFiller._resolve_target_xpath(resolved, 0) == '//input[1]'
+        assert SmartFormFiller._resolve_target_xpath(resolved, 1) is None
+
+
+class TestPrefillTableRow:
+    """_prefill_table_row 测试套件"""
+    
+    def test_dynamic_row_filled_in_one_call(self):
+        """表格模式按目标行号生成 XPath，整行文本字段一次填充"""
+        from app.core.element_fingerprint import ElementFingerprint
+        
+        mappings = {
+            '编号': ElementFingerprint({'xpath': '//tbody/tr[1]/td[1]//input'}),
+            '姓名': ElementFingerprint({'xpath': '//tbody/tr[1]/td[2]//input'}),
+            '科室': ElementFingerprint({'xpath': '//tbody/tr[1]/td[3]//select'}),
+        }
+        resolved = {col: SmartFormFiller._flatten_fingerprint(fp) for col, fp in mappings.items()}
+        values = {'编号': ['A1', 'A2'], '姓名': ['张三', '李四'], '科室': ['内科', None]}
+        name = FakeElement()
+        tab = LocateTab({'//tbody/tr[3]/td[2]//input': name}, fillable={'//tbody/tr[3]/td[2]//input'})
+        
+        result = SmartFormFiller._prefill_table_row(
+            tab, mappings, resolved, values, 1, 1, 2, '编号', 'batch_table'
+        )
+        
+        assert result == {'姓名': True}
+        assert name.value == '李四'
+        assert tab.single_lookups == 0
+
+
+class AnchorTab:
+    """返回固定锚点列文本的模拟 tab，统计列扫描次数"""
+    
+    def __init__(self, texts):
+        self.texts = texts
+        self.dom_gen = 'p1:0'
+        self.scans = 0
+    
+    def run_js(self, script, *args, **kwargs):
+        if script == SmartFormFiller._DOM_GEN_JS:
+            return self.dom_gen
+        if script == ScriptStore.COLUMN_TEXTS:
+            self.scans += 1
+            return {'texts': [t.strip() for t in self.texts]}
+        return None
+
+
+class TestScanAnchorColumn:
+    """_scan_anchor_column 缓存测试套件"""
+    
+    def setup_method(self):
+        smart_form_filler._ANCHOR_CACHE.clear()
+    
+    def test_unchanged_dom_reuses_map(self):
+        """DOM 代数未变时复用上次的锚点索引"""
+        tab = AnchorTab(['A001', ' ', 'A002'])
+        
+        first = SmartFormFiller._scan_anchor_column(tab, '//tr/td[1]')
+        second = SmartFormFiller._scan_anchor_column(tab, '//tr/td[1]')
+        
+        assert first == second == {'A001': 0, 'A002': 2}
+        assert tab.scans == 1
+    
+    def test_dom_change_triggers_rescan(self):
+        """DOM 变动后重新扫描"""
+        tab = AnchorTab(['A001'])
+        
+        SmartFormFiller._scan_anchor_column(tab, '//tr/td[1]')
+        tab.dom_gen = 'p1:5'
+        tab.texts = ['B001']
+        
+        assert SmartFormFiller._scan_anchor_column(tab, '//tr/td[1]') == {'B001': 0}
+        assert tab.scans == 2
+
+
+class FrameTab:
+    """按序号返回子 frame 的模拟 tab/frame，统计 get_frame 调用次数"""
+    
+    def __init__(self, name='main', counter=None):
+        self.name = name
+        self.counter = counter if counter is not None else []
+    
+    def get_frame(self, index):
+        self.counter.append(index)
+        return FrameTab(f'{self.name}/{index}', self.counter)
+
+
+class TestFrameTarget:
+    """_frame_target 测试套件"""
+    
+    def test_nested_path_walks_each_level(self):
+        """嵌套路径逐层进入，扫描索引 0 对应 DrissionPage 序号 1"""
+        tab = FrameTab()
+        
+        target = SmartFormFiller._frame_target(tab, 'iframe[0]iframe[2]->')
+        
+        assert target.name == 'main/1/3'
+    
+    def test_same_path_reuses_frame(self):
+        """同一次填充内相同 frame_path 只获取一次"""
+        tab = FrameTab()
+        frames = {}
+        
+        first = SmartFormFiller._frame_target(tab, 'iframe[1]', frames)
+        second = SmartFormFiller._frame_target(tab, 'iframe[1]', frames)
+        
+        assert first is second
+        assert tab.counter == [2]
+        assert SmartFormFiller._frame_target(tab, '', frames) is tab
+
+
+class ProbeTab:
+    """按预设探测结果返回的模拟 tab，记录 ele 查找的选择器"""
+    
+    def __init__(self, first_hit, elements=None):
+        self.first_hit = first_hit
+        self.elements = elements or {}
+        self.lookups = []
+    
+    def run_js(self, script, *args, **kwargs):
+        if script == SmartFormFiller._PROBE_SELECTORS_JS:
+            return self.first_hit
+        return None
+    
+    def ele(self, selector, timeout=None):
+        self.lookups.append(selector)
+        return self.elements.get(selector)
+
+
+class TestFillWithFallbackProbe:
+    """_fill_with_fallback 选择器探测测试套件"""
+    
+    @staticmethod
+    def _fingerprint():
+        from app.core.element_fingerprint import ElementFingerprint
+        return ElementFingerprint({
+            'id_selector': '#stale', 'xpath': '//input[1]', 'css_selector': 'input.name',
+        })
+    
+    def test_no_hit_skips_all_lookups(self):
+        """全部选择器失效时不再逐个等待超时"""
+        tab = ProbeTab(-1)
+        
+        assert SmartFormFiller._fill_with_fallback(tab, self._fingerprint(), '张三') is False
+        assert tab.lookups == []
+    
+    def test_starts_from_first_hit(self):
+        """从第一个命中的选择器开始查找"""
+        ele = FakeElement()
+        tab = ProbeTab(1, {'xpath://input[1]': ele})
+        
+        assert SmartFormFiller._fill_with_fallback(tab, self._fingerprint(), '张三') is True
+        assert tab.lookups == ['xpath://input[1]']
+        assert ele.value == '张三'
+    
+    def test_page_side_not_found_skips_probe(self):
+        """备选选择器随 JS 填充一并在页内尝试；确认全部失效时不再探测"""
+        class NotFoundTab(ProbeTab):
+            def run_js(self, script, *args, **kwargs):
+                if script == SmartFormFiller._FILL_ONE_CALL_JS:
+                    self.job = args[0]
+                    return {'success': False, 'error': 'element_not_found'}
+                raise AssertionError('unexpected script')
+        
+        tab = NotFoundTab(None)
+        
+        assert SmartFormFiller._fill_with_fallback(tab, self._fingerprint(), '张三') is False
+        assert tab.job['fallbacks'] == [['id', '#stale'], ['xpath', '//input[1]'], ['css', 'input.name']]
+        assert tab.lookups == []
+
+
+class TestFillWithJsEvents:
+    """_fill_with_js_events 测试套件"""
+    
+    def test_installs_once_and_passes_raw_value(self):
+        """填充函数缺失时注入一次；值作为参数原样传入，无需转义"""
+        class RecordingTab:
+            def __init__(self):
+                self.installed = False
+                self.calls = []
+            
+            def run_js(self, script, *args, **kwargs):
+                if script == SmartFormFiller._FILL_ONE_INSTALL_JS:
+                    self.installed = True
+                    return None
+                self.calls.append(args)
+                return {'success': True} if self.installed else SmartFormFiller._MISSING
+        
+        tab = RecordingTab()
+        value = "O'Brien\\n\"x\""
+        
+        assert SmartFormFiller._fill_with_js_events(tab, 'a', '//input', '', value, 'text', 'input')
+        assert SmartFormFiller._fill_with_js_events(tab, 'a', '//input', '', value, 'text', 'input')
+        
+        assert len(tab.calls) == 3
+        assert tab.calls[-1][0]['value'] == value
+    
+    def test_failure_result_returns_false(self):
+        """页内返回失败时返回 False"""
+        class FailTab:
+            def run_js(self, script, *args, **kwargs):
+                return {'success': False, 'error': 'element_not_found'}
+        
+        assert SmartFormFiller._fill_with_js_events(FailTab(), '', '//x', '', 'v', 'text', 'input') is False
+
+    
+    def test_remembers_matched_selector(self):
+        """记住实际命中的选择器类型，下次页内优先尝试"""
+        smart_form_filler._SELECTOR_HITS.clear()
+        
+        class HitTab:
+            def run_js(self, script, *args, **kwargs):
+                self.job = args[0]
+                return {'success': True, 'by': 'xpath'}
+        
+        tab = HitTab()
+        SmartFormFiller._fill_with_js_events(tab, 'stale-id', '//input[9]', '', 'v', 'text', 'input')
+        assert tab.job['prefer'] == ''
+        
+        SmartFormFiller._fill_with_js_events(tab, 'stale-id', '//input[9]', '', 'v', 'text', 'input')
+        assert tab.job['prefer'] == 'xpath'
+    
+    def test_fill_many_single_round_trip(self):
+        """多字段一次 run_js 完成，返回逐字段结果"""
+        class ManyTab:
+            def __init__(self):
+                self.calls = 0
+            
+            def run_js(self, script, *args, **kwargs):
+                self.calls += 1
+                assert script == SmartFormFiller._FILL_MANY_CALL_JS
+                return {'results': [job['value'] == 'ok' for job in args[0]['jobs']]}
+        
+        tab = ManyTab()
+        jobs = [{'id': '', 'xpath': '//a', 'css': '', 'value': v} for v in ('ok', 'bad', 'ok')]
+        
+        assert SmartFormFiller._fill_many_with_js_events(tab, jobs) == [True, False, True]
+        assert tab.calls == 1
+    
+    def test_coalesce_flag_passed_to_page(self):
+        """coalesce_events 由单据模式行预填充透传到页内调用"""
+        from app.core.element_fingerprint import ElementFingerprint
+        
+        class ManyTab:
+            def run_js(self, script, *args, **kwargs):
+                self.payload = args[0]
+                return {'results': [True] * len(args[0]['jobs'])}
+        
+        mappings = {'姓名': ElementFingerprint({'xpath': '//input[1]'})}
+        resolved = {'姓名': {'has_related': False, 'frame_path': ''}}
+        tab = ManyTab()
+        
+        for coalesce in (False, True):
+            result = SmartFormFiller._prefill_row_with_js(
+                tab, mappings, resolved, {'姓名': ['张三']}, 0, None, {}, coalesce
+            )
+            assert result == {'姓名': True}
+            assert tab.payload['coalesce'] is coalesce
+    
+    def test_fill_many_malformed_result_returns_none(self):
+        """结果长度不符时返回 None，交给逐字段流程"""
+        class BadTab:
+            def run_js(self, script, *args, **kwargs):
+                return {'results': [True]}
+        
+        jobs = [{'id': '', 'xpath': '//a', 'css': '', 'value': 'x'}] * 2
+        assert SmartFormFiller._fill_many_with_js_events(BadTab(), jobs) is None
+
+
+class TestCountTableRows:
+    """_count_table_rows 测试套件"""
+    
+    def test_returns_probed_count(self):
+        """按页内探测结果返回行数，并传入行数上限"""
+        class CountTab:
+            def run_js(self, script, *args, **kwargs):
+                assert script == SmartFormFiller._COUNT_ROWS_JS
+                self.args = args[0]
+                return 3
+        
+        tab = CountTab()
+        
+        assert SmartFormFiller._count_table_rows(tab, ['//tr[1]/td[2]//input'], 10) == 3
+        assert tab.args == {'templates': ['//tr[1]/td[2]//input'], 'limit': 10}
+    
+    def test_no_templates_skips_probe(self):
+        """没有 tr[N] 模板时不探测"""
+        assert SmartFormFiller._count_table_rows(object(), [], 10) is None
+
+
+class TestFillFormParallel:
+    """fill_form_parallel 测试套件"""
+    
+    class Frame:
+        """只提供行数与行号的最小 DataFrame 替身"""
+        def __init__(self, n):
+            self.index = list(range(n))
+        
+        def __len__(self):
+            return len(self.index)
+    
+    def test_rows_split_into_contiguous_ranges(self, monkeypatch):
+        """各 tab 分到连续行区间，结果合并"""
+        calls = []
+        
+        def fake_fill(tab, excel_data, mappings, **kwargs):
+            calls.append((tab, kwargs['start_row_idx'], kwargs['end_row_idx']))
+            return {'total': 5, 'success': 1, 'error': 0, 'healed': 0,
+                    'errors': [], 'next_row_idx': kwargs['end_row_idx'] or 5}
+        
+        monkeypatch.setattr(SmartFormFiller, 'fill_form_with_healing', staticmethod(fake_fill))
+        
+        result = SmartFormFiller.fill_form_parallel(['t1', 't2'], self.Frame(5), {}, key_column='编号')
+        
+        assert sorted(calls) == [('t1', 0, 3), ('t2', 3, None)]
+        assert result['success'] == 2
+        assert result['next_row_idx'] == 5
+    
+    def test_resume_from_first_unfinished_range(self, monkeypatch):
+        """某段提前停止时从该段续填，而非取各段最大值"""
+        def fake_fill(tab, excel_data, mappings, **kwargs):
+            start = kwargs['start_row_idx']
+            # t1 负责 0-2，只填到第 1 行；t2 负责 3-5，全部完成
+            next_row_idx = 2 if tab == 't1' else 6
+            return {'total': 6, 'success': next_row_idx - start, 'error': 0, 'healed': 0,
+                    'errors': [], 'next_row_idx': next_row_idx}
+        
+        monkeypatch.setattr(SmartFormFiller, 'fill_form_with_healing', staticmethod(fake_fill))
+        
+        result = SmartFormFiller.fill_form_parallel(['t1', 't2'], self.Frame(6), {})
+        
+        assert result['next_row_idx'] == 2
+    
+    def test_empty_tabs_rejected(self):
+        """未提供 tab 时明确报错"""
+        with pytest.raises(ValueError):
+            SmartFormFiller.fill_form_parallel([], self.Frame(5), {})
+    
+    def test_progress_forwarded_on_calling_thread(self, monkeypatch):
+        """工作线程的进度只在调用线程中转发"""
+        import threading
+        
+        def fake_fill(tab, excel_data, mappings, **kwargs):
+            kwargs['progress_callback'](1, 5, tab, 'error')
+            return {'total': 5, 'success': 1, 'error': 0, 'healed': 0,
+                    'errors': [], 'next_row_idx': 5}
+        
+        monkeypatch.setattr(SmartFormFiller, 'fill_form_with_healing', staticmethod(fake_fill))
+        seen = []
+        
+        SmartFormFiller.fill_form_parallel(
+            ['t1', 't2'], self.Frame(5), {},
+            progress_callback=lambda *args: seen.append((threading.current_thread(), args[2]))
+        )
+        
+        assert sorted(msg for _, msg in seen) == ['t1', 't2']
+        assert all(thread is threading.current_thread() for thread, _ in seen)
+    
+    def test_single_form_uses_one_tab(self, monkeypatch):
+        """单据模式不并发"""
+        calls = []
+        monkeypatch.setattr(SmartFormFiller, 'fill_form_with_healing',
+                            staticmethod(lambda tab, *a, **k: calls.append(tab) or {}))
+        
+        SmartFormFiller.fill_form_parallel(['t1', 't2'], self.Frame(5), {}, fill_mode='single_form')
+        
+        assert calls == ['t1']
+
+
+class TestTryHealAndFill:
+    """_try_heal_and_fill 测试套件"""
+    
+    def test_find_and_fill_in_one_call(self):
+        """锚点与值原样作为参数传入，定位与填充一次 run_js 完成"""
+        from app.core.element_fingerprint import ElementFingerprint
+        
+        class HealTab:
+            def __init__(self):
+                self.installed = False
+                self.calls = []
+            
+            def run_js(self, script, *args, **kwargs):
+                if script == SmartFormFiller._FILL_ONE_INSTALL_JS:
+                    self.installed = True
+                    return None
+                self.calls.append(args)
+                if not self.installed:
+                    return SmartFormFiller._MISSING
+                return {'success': True, 'matchedBy': 'label'}
+        
+        fp = ElementFingerprint({'xpath': '//input[1]'})
+        fp.anchors['label'] = "患者's 姓名"
+        tab = HealTab()
+        
+        assert SmartFormFiller._try_heal_and_fill(tab, fp, '张三') is True
+        assert tab.calls[-1] == ({
+            'id': '', 'css': '', 'label': "患者's 姓名", 'nearby_text': '', 'value': '张三',
+        },)
+        assert len(tab.calls) == 2
+    
+    def test_no_anchor_skips_page_call(self):
+        """没有原选择器和锚点时不调用页面"""
+        from app.core.element_fingerprint import ElementFingerprint
+        
+        assert SmartFormFiller._try_heal_and_fill(object(), ElementFingerprint({'xpath': '//a'}), 'x') is False
+    
+    def test_not_found_returns_false(self):
+        """页内定位失败时返回 False"""
+        from app.core.element_fingerprint import ElementFingerprint
+        
+        class EmptyTab:
+            def run_js(self, script, *args, **kwargs):
+                return {'success': False, 'error': 'anchor_not_found'}
+        
+        fp = ElementFingerprint({'xpath': '//input[1]'})
+        fp.anchors.update({'label': '姓名', 'nearby_text': '姓名'})
+        
+        assert SmartFormFiller._try_heal_and_fill(EmptyTab(), fp, 'x') is False
@@ -150,6 +150,12 @@ class TestElementFingerprintBestSelector:
         
         best = fp.get_best_selector()
         assert best is None
+    
+    def test_fallback_selectors_in_priority_order(self):
+        """备选选择器按 id > xpath > css 排列，跳过空值"""
+        fp = ElementFingerprint({'id_selector': '#a', 'css_selector': 'input.a'})
+        
+        assert fp.get_fallback_selectors() == [('id', '#a'), ('css', 'input.a')]
 
 
 class TestElementFingerprintTableInfo:
@@ -227,6 +233,44 @@ class TestElementFingerprintSerialization:
         assert recreated.anchors['label'] == original.anchors['label']
 
 
+class TestElementFingerprintBatch:
+    """批量创建测试"""
+    
+    def test_from_batch_builds_all_items(self, sample_element_data, table_element_data):
+        """from_batch 应按顺序创建所有指纹"""
+        result = ElementFingerprint.from_batch([sample_element_data, table_element_data])
+        
+        assert len(result) == 2
+        assert result[0].selectors['id'] == '#username'
+        assert result[1].table_info['is_table_cell'] is True
+    
+    def test_from_batch_skips_invalid_items(self, sample_element_data):
+        """无效元素数据应被静默跳过"""
+        result = ElementFingerprint.from_batch([None, sample_element_data])
+        
+        assert len(result) == 1
+
+
+class TestElementFingerprintSlots:
+    """__slots__ 布局测试"""
+    
+    def test_related_inputs_defaults_missing(self, fingerprint):
+        """未挂载 related_inputs 时 getattr 默认值生效"""
+        assert getattr(fingerprint, 'related_inputs', None) is None
+        
+        fingerprint.related_inputs = ['#a']
+        assert fingerprint.related_inputs == ['#a']
+    
+    def test_copy_keeps_attributes(self, fingerprint):
+        """浅拷贝保留全部槽位属性"""
+        import copy
+        
+        clone = copy.copy(fingerprint)
+        
+        assert clone.selectors is fingerprint.selectors
+        assert clone.stability_score == fingerprint.stability_score
+
+
 class TestElementFingerprintRowSelector:
     """行选择器测试"""
     
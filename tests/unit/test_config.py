@@ -7,7 +7,7 @@ import pytest
 from app.config import (
     ScannerConfig, MatcherConfig, FillerConfig, PaginationConfig, UIConfig,
     scanner_config, matcher_config, filler_config,
-    _get_env_float, _get_env_int, reload_config
+    _get_env_float, _get_env_int, _get_env_bool, reload_config
 )
 
 
@@ -35,6 +35,7 @@ class TestConfigDataclasses:
         
         assert config.element_timeout == 0.3
         assert config.retry_count == 3
+        assert config.coalesce_change_events is False
     
     def test_configs_are_mutable(self):
         """配置应可修改"""
@@ -79,6 +80,16 @@ class TestEnvironmentVariables:
         
         result = _get_env_int('TEST_INT', 50)
         assert result == 50
+    
+    def test_get_env_bool(self, monkeypatch):
+        """布尔环境变量：1/true 为真，其余为假，缺失返回默认值"""
+        monkeypatch.setenv('TEST_BOOL', '1')
+        assert _get_env_bool('TEST_BOOL', False) is True
+        
+        monkeypatch.setenv('TEST_BOOL', 'off')
+        assert _get_env_bool('TEST_BOOL', True) is False
+        
+        assert _get_env_bool('NONEXISTENT_KEY_12345', True) is True
 
 
 class TestGlobalConfigs:
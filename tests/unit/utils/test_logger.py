@@ -59,6 +59,23 @@ class TestWeaverLogger:
         
         captured = capsys.readouterr()
         assert 'Error message' in captured.out
+    
+    def test_debug_formats_args_lazily(self, capsys):
+        """debug 参数按 % 格式拼接，未启用时不格式化"""
+        class Boom:
+            def __str__(self):
+                raise AssertionError('should not format')
+        
+        setup_logging(level=logging.INFO)
+        logger = WeaverLogger('test')
+        logger.debug('value: %s', Boom())
+        assert not logger.is_enabled_for(logging.DEBUG)
+        
+        setup_logging(level=logging.DEBUG)
+        logger.debug('count: %d', 3)
+        
+        captured = capsys.readouterr()
+        assert 'count: 3' in captured.out
 
 
 class TestUICallback:
@@ -0,0 +1,58 @@
+"""
+轮询工具单元测试
+"""
+
+import pytest
+
+from app.utils.polling import poll
+
+
+class TestPoll:
+    """poll 测试"""
+
+    def test_until_stops_on_first_match(self):
+        """满足 until 即返回"""
+        values = iter([1, 2, 3, 4])
+
+        result = poll(lambda: next(values), timeout=1, interval=0, until=lambda v: v == 3)
+
+        assert result.ok is True
+        assert result.value == 3
+        assert result.attempts == 3
+
+    def test_timeout_returns_last_value(self):
+        """超时返回最后一次采样值"""
+        result = poll(lambda: 'x', timeout=0.05, interval=0.01, until=lambda v: False)
+
+        assert result.ok is False
+        assert result.value == 'x'
+        assert result.elapsed >= 0.05
+
+    def test_stable_of_requires_consecutive_equal_keys(self):
+        """连续 stable_of 次 key 相同才视为稳定"""
+        samples = iter([[1], [1, 2], [1, 2], [1, 2, 3], [1, 2, 3], [1, 2, 3]])
+
+        result = poll(lambda: next(samples), timeout=1, interval=0, stable_of=3)
+
+        assert result.ok is True
+        assert result.value == [1, 2, 3]
+        assert result.attempts == 6
+
+    def test_backoff_capped_by_max_interval(self, monkeypatch):
+        """等待间隔指数增长且不超过上限"""
+        import app.utils.polling as polling
+
+        sleeps = []
+        clock = [0.0]
+        monkeypatch.setattr(polling.time, 'monotonic', lambda: clock[0])
+
+        def fake_sleep(seconds):
+            sleeps.append(round(seconds, 4))
+            clock[0] += seconds
+
+        monkeypatch.setattr(polling.time, 'sleep', fake_sleep)
+
+        poll(lambda: None, timeout=2, interval=0.1, max_interval=0.3, backoff=2, until=lambda v: False)
+
+        assert sleeps[:4] == [0.1, 0.2, 0.3, 0.3]
+        assert sum(sleeps) == pytest.approx(2)
@@ -0,0 +1,42 @@
+"""
+进度回调节流单元测试
+"""
+
+from app.utils.throttle import ProgressThrottle
+
+
+class TestProgressThrottle:
+    """ProgressThrottle 测试"""
+
+    def test_coalesces_info_within_interval(self):
+        """间隔内的普通进度只转发第一条，flush 补发最后一条"""
+        calls = []
+        progress = ProgressThrottle(lambda *a: calls.append(a), interval=60)
+
+        for i in range(1, 6):
+            progress(i, 10, f'row {i}', 'info')
+        progress.flush()
+
+        assert calls == [(1, 10, 'row 1', 'info'), (5, 10, 'row 5', 'info')]
+
+    def test_errors_and_final_row_pass_through(self):
+        """错误、警告与最终进度立即转发"""
+        calls = []
+        progress = ProgressThrottle(lambda *a: calls.append(a), interval=60)
+
+        progress(1, 3, 'a', 'info')
+        progress(2, 3, 'b', 'error')
+        progress(2, 3, 'c', 'warning')
+        progress(3, 3, 'd', 'success')
+        progress.flush()
+
+        assert [c[2] for c in calls] == ['a', 'b', 'c', 'd']
+
+    def test_none_callback_is_noop(self):
+        """未传回调时为空操作且为假值"""
+        progress = ProgressThrottle(None)
+
+        assert not progress
+        progress(1, 2, 'x')
+        progress.emit(2, 2, 'y')
+        progress.flush()